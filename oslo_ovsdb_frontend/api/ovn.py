@@ -79,6 +79,20 @@ class API(object):
         :returns:        :class:`Command` with no result
         """
 
+    @abc.abstractmethod
+    def set_lswitch(self, name, if_exists=True, **columns):
+        """Create a command to set OVN lswitch fields
+
+        :param name:         The name of the lswitch
+        :type name:          string
+        :param if_exists:    Do not fail if the lswitch does not exist
+        :type if_exists:     bool
+        :param columns:      Dictionary of lswitch columns
+                             Supported columns: external_ids
+        :type columns:       dictionary
+        :returns:            :class:`Command` with no result
+        """
+
     @abc.abstractmethod
     def delete_lswitch(self, name=None, ext_id=None, if_exists=True):
         """Create a command to delete an OVN lswitch
@@ -109,6 +123,26 @@ class API(object):
         :returns:             :class:`Command` with no result
         """
 
+    @abc.abstractmethod
+    def create_lports(self, lswitch_name, lports, may_exist=True):
+        """Create a command to add OVN lports to a lswitch
+
+        The lswitch is looked up once and its ports are updated once for all
+        the lports, instead of once per lport as with create_lport.
+
+        :param lswitch_name:  The name of the lswitch the lports are created
+                              on
+        :type lswitch_name:   string
+        :param lports:        The lports, as (name, columns) pairs where
+                              columns is a dictionary of port columns as
+                              for create_lport
+        :type lports:         list of (string, dictionary) pairs
+        :param may_exist:     Do not fail if lports already exist, existing
+                              lports are skipped
+        :type may_exist:      bool
+        :returns:             :class:`Command` with no result
+        """
+
     @abc.abstractmethod
     def set_lport(self, lport_name, if_exists=True, **columns):
         """Create a command to set OVN lport fields
@@ -140,6 +174,20 @@ class API(object):
         :returns:         :class:`Command` with no result
         """
 
+    @abc.abstractmethod
+    def delete_lports(self, lswitch_name, lport_names, if_exists=True):
+        """Create a command to delete OVN lports of a lswitch
+
+        :param lswitch_name: The name of the lswitch
+        :type lswitch_name:  string
+        :param lport_names:  The names of the lports
+        :type lport_names:   list of strings
+        :param if_exists:    Do not fail if the lswitch or some lports do not
+                             exist
+        :type if_exists:     bool
+        :returns:            :class:`Command` with no result
+        """
+
     @abc.abstractmethod
     def get_all_logical_switches_ids(self):
         """Returns all logical switches names and external ids
@@ -286,3 +334,145 @@ class API(object):
         :is_add_acl:                  If updating is caused by adding acl
         :type is_add_acl:             bool
         """
+
+    @abc.abstractmethod
+    def create_address_set(self, name, may_exist=True, **columns):
+        """Create an address set
+
+        ACLs can match against all the addresses of an address set, e.g.
+        'ip4.src == $<name>', see utils.ovn_addrset_match, so that a
+        membership change is a single update of the address set.
+
+        :param name:       The name of the address set
+        :type name:        string
+        :param may_exist:  Do not fail if the address set already exists
+        :type may_exist:   bool
+        :param columns:    Dictionary of address set columns
+                           Supported columns: addresses, external_ids
+        :type columns:     dictionary
+        :returns:          :class:`Command` with no result
+        """
+
+    @abc.abstractmethod
+    def create_address_sets(self, address_sets, may_exist=True):
+        """Create address sets
+
+        :param address_sets: The address sets, as (name, columns) pairs
+                             where columns is a dictionary of address set
+                             columns as for create_address_set
+        :type address_sets:  list of (string, dictionary) pairs
+        :param may_exist:    Do not fail if address sets already exist,
+                             existing address sets are skipped
+        :type may_exist:     bool
+        :returns:            :class:`Command` with no result
+        """
+
+    @abc.abstractmethod
+    def delete_address_set(self, name, if_exists=True):
+        """Delete an address set
+
+        :param name:       The name of the address set
+        :type name:        string
+        :param if_exists:  Do not fail if the address set does not exist
+        :type if_exists:   bool
+        :returns:          :class:`Command` with no result
+        """
+
+    @abc.abstractmethod
+    def update_address_set(self, name, addrs_add=None, addrs_remove=None,
+                           if_exists=True):
+        """Add and remove addresses of an address set
+
+        :param name:          The name of the address set
+        :type name:           string
+        :param addrs_add:     The addresses to add
+        :type addrs_add:      list of strings
+        :param addrs_remove:  The addresses to remove
+        :type addrs_remove:   list of strings
+        :param if_exists:     Do not fail if the address set does not exist
+        :type if_exists:      bool
+        :returns:             :class:`Command` with no result
+        """
+
+    @abc.abstractmethod
+    def update_address_sets(self, updates, if_exists=True):
+        """Add and remove addresses of several address sets
+
+        :param updates:    (addresses to add, addresses to remove) pairs
+                           indexed by address set name
+        :type updates:     dictionary
+        :param if_exists:  Do not fail if an address set does not exist
+        :type if_exists:   bool
+        :returns:          :class:`Command` with no result
+        """
+
+    @abc.abstractmethod
+    def get_all_address_sets(self):
+        """Return all the address sets
+
+        :returns: dictionary of {'addresses': list, 'external_ids': dict}
+                  indexed by address set name
+        """
+
+    @abc.abstractmethod
+    def prepare(self, template):
+        """Prepare a database command template to run repeatedly
+
+        See :meth:`oslo_ovsdb_frontend.api.ovs.API.prepare`, for the
+        Northbound tables.
+        """
+
+
+@six.add_metaclass(abc.ABCMeta)
+class SbAPI(object):
+
+    @abc.abstractmethod
+    def __init__(self, notify_target=None):
+        """Initializes the OVSDB API wrapper for OVN SB Database.
+
+           :notify_target: an object that will receive notifications of the
+                port bindings, through its set_port_status_up and
+                set_port_status_down methods
+        """
+
+    @abc.abstractmethod
+    def get_all_chassis(self):
+        """Return all the chassis
+
+        :returns: dictionary of {'hostname': string, 'external_ids': dict}
+                  indexed by chassis name
+        """
+
+    @abc.abstractmethod
+    def get_chassis_for_port(self, lport_name):
+        """Return the name of the chassis a logical port is bound to
+
+        :param lport_name:  The name of the logical port
+        :type lport_name:   string
+        :returns:           The chassis name, or None if the port is not
+                            bound
+        """
+
+    @abc.abstractmethod
+    def get_port_bindings(self, chassis=None):
+        """Return the chassis of the logical ports
+
+        :param chassis:  Only return the ports bound to this chassis
+        :type chassis:   string
+        :returns:        dictionary of chassis names, or None for the
+                         unbound ports, indexed by logical port name
+        """
+
+    @abc.abstractmethod
+    def wait_for(self, table, conditions=None, events=None, timeout=None):
+        """Block until a row of the table matches the conditions
+
+        :param table:      The name of the table, e.g. 'Port_Binding'
+        :param conditions: (column, operation, value) tuples the row must
+                           match
+        :param events:     The events to wait for, defaults to row creations
+                           and updates
+        :param timeout:    Seconds to wait
+        :returns:          The matching row
+        :raises:           exceptions.TimeoutException
+        """
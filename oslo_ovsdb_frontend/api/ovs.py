@@ -17,9 +17,59 @@ import abc
 from oslo_config import cfg
 from oslo_utils import importutils
 import six
+from six.moves import collections_abc
 
 from oslo_ovsdb_frontend import config
 
+RECONCILE_CHUNK_SIZE = 100
+
+
+def _as_list(value):
+    # ovs-vsctl and get_column_value return sets of one item as the item
+    if isinstance(value, list):
+        return value
+    if value is None:
+        return []
+    return [value]
+
+
+def _column_update(current, desired):
+    """Return the value to set for a column to match desired, or None
+
+    Maps are compared key by key: only the desired keys which differ are
+    returned, to be set one by one so that the keys managed by others are
+    kept.
+    """
+    if isinstance(desired, collections_abc.Mapping):
+        current = current or {}
+        changed = dict((k, v) for k, v in desired.items()
+                       if current.get(k) != v)
+        return changed or None
+    if isinstance(desired, list):
+        if sorted(_as_list(current)) == sorted(desired):
+            return None
+        return desired
+    if isinstance(current, list) and len(current) == 1:
+        current = current[0]
+    if current == desired:
+        return None
+    return desired
+
+
+def _columns_updates(current, desired):
+    """Return the (column, key, value) to set for a row to match desired"""
+    updates = []
+    for column, value in desired.items():
+        update = _column_update(current.get(column), value)
+        if update is None:
+            continue
+        if isinstance(value, collections_abc.Mapping):
+            updates += [(column, key, val)
+                        for key, val in sorted(update.items())]
+        else:
+            updates.append((column, None, update))
+    return updates
+
 
 @six.add_metaclass(abc.ABCMeta)
 class API(object):
@@ -138,6 +188,27 @@ class API(object):
         :returns:          :class:`Command` with no result
         """
 
+    @abc.abstractmethod
+    def prepare(self, template):
+        """Prepare a database command template to run repeatedly
+
+        The template is parsed and validated once, then bind(**params)
+        creates the command for the parameters at a lower cost than the
+        db_* methods, e.g.:
+
+            set_id = api.prepare(
+                "set Interface {name} external_ids:iface-id={id}")
+            txn.add(set_id.bind(name='tap0', id=port_id))
+
+        :param template: An ovs-vsctl set, get, clear or destroy database
+                         command, with {name} placeholders for the record,
+                         the map keys and the values
+        :type template:  string
+        :returns:        :class:`prepared.PreparedCommand`, whose bind()
+                         returns a :class:`Command` with the result of the
+                         db_* method of the verb
+        """
+
     @abc.abstractmethod
     def db_set(self, table, record, *col_values):
         """Create a command to set fields in a record
@@ -155,6 +226,60 @@ class API(object):
         # doesn't matter. Though that would break the assert_called_once_with
         # unit tests
 
+    @abc.abstractmethod
+    def db_set_keys(self, table, record, *col_key_values):
+        """Create a command to set columns and map keys of a record
+
+        As with ovs-vsctl set, setting a map key leaves the other keys of
+        the map unchanged.
+
+        :param table:          The OVS table containing the record
+        :type table:           string
+        :param record:         The record id (name/uuid) to be modified
+        :type record:          string
+        :param col_key_values: The columns, map keys and values to set
+        :type col_key_values:  Tuples of (column, key, value), key being
+                               None to set the whole column as db_set does
+        :returns:              :class:`Command` with no result
+        """
+
+    @abc.abstractmethod
+    def db_create_many(self, table, rows):
+        """Create a command to create many records
+
+        :param table:  The OVS table containing the records to be created
+        :type table:   string
+        :param rows:   The columns and their values of each record
+        :type rows:    list of dictionaries of column names and values
+        :returns:      :class:`Command` with the list of the created records
+                       result
+        """
+
+    @abc.abstractmethod
+    def db_destroy_many(self, table, records, if_exists=False):
+        """Create a command to destroy many records
+
+        :param table:     The OVS table containing the records
+        :type table:      string
+        :param records:   The records to be destroyed
+        :type records:    list of record ids (names/uuids)
+        :param if_exists: Do not fail if a record does not exist
+        :type if_exists:  bool
+        :returns:         :class:`Command` with no result
+        """
+
+    @abc.abstractmethod
+    def db_set_many(self, table, updates):
+        """Create a command to set the values of columns of many records
+
+        :param table:   The OVS table containing the records
+        :type table:    string
+        :param updates: The records and the columns and values to set on
+                        them, as for db_set
+        :type updates:  list of (record id, list of (column, value)) pairs
+        :returns:       :class:`Command` with no result
+        """
+
     @abc.abstractmethod
     def db_clear(self, table, record, column):
         """Create a command to clear a field's value in a record
@@ -182,7 +307,25 @@ class API(object):
         """
 
     @abc.abstractmethod
-    def db_list(self, table, records=None, columns=None, if_exists=False):
+    def db_get_many(self, table, records, columns, if_exists=False):
+        """Create a command to return the values of columns of many records
+
+        :param table:     The OVS table containing the records
+        :type table:      string
+        :param records:   The records to get the values from
+        :type records:    list of record ids (names/uuids)
+        :param columns:   The columns to return
+        :type columns:    list of column names
+        :param if_exists: Do not fail if a record does not exist, it is
+                          missing from the result
+        :type if_exists:  bool
+        :returns:         :class:`Command` with {record: {column: value}}
+                          result, values being returned as for db_get
+        """
+
+    @abc.abstractmethod
+    def db_list(self, table, records=None, columns=None, if_exists=False,
+                limit=None, offset=0, row_views=False, columnar=False):
         """Create a command to return a list of OVSDB records
 
         :param table:     The OVS table to query
@@ -193,9 +336,36 @@ class API(object):
         :type columns:    list of column names or None
         :param if_exists: Do not fail if the record does not exist
         :type if_exists:  bool
+        :param limit:     Return at most limit records, None means all
+        :type limit:      int or None
+        :param offset:    Skip the first offset records
+        :type offset:     int
+        :param row_views: Return read-only mappings converting the columns
+                          when they are accessed, rather than dictionaries
+                          of all the columns. They have a to_dict() method.
+        :type row_views:  bool
+        :param columnar:  Return {'column': [value, ...]} with the values of
+                          the records, in the same order for each column,
+                          rather than a dictionary per record. With NumPy
+                          installed, the numeric columns are NumPy arrays.
+        :type columnar:   bool
         :returns:         :class:`Command` with [{'column', value}, ...] result
         """
 
+    @abc.abstractmethod
+    def db_list_iter(self, table, records=None, columns=None, if_exists=False,
+                     limit=None, offset=0, row_views=False):
+        """Create a command to iterate over OVSDB records
+
+        Same as db_list, but the records are converted as the result is
+        consumed rather than all at once, so that memory stays flat on
+        large tables. The native backend reads them from the cache at that
+        time.
+
+        :returns:         :class:`Command` with an iterator of
+                          {'column', value} result
+        """
+
     @abc.abstractmethod
     def db_find(self, table, *conditions, **kwargs):
         """Create a command to return find OVSDB records matching conditions
@@ -214,9 +384,28 @@ class API(object):
                           See the ovs-vsctl man page for more operations
         :param columns:   Limit results to only columns, None means all columns
         :type columns:    list of column names or None
+        :param limit:     Return at most limit records, None means all
+        :type limit:      int or None
+        :param offset:    Skip the first offset matching records
+        :type offset:     int
+        :param row_views: Return read-only mappings as db_list does
+        :type row_views:  bool
+        :param columnar:  Return one list of values per column as db_list
+                          does
+        :type columnar:   bool
         :returns:         :class:`Command` with [{'column', value}, ...] result
         """
 
+    @abc.abstractmethod
+    def db_find_iter(self, table, *conditions, **kwargs):
+        """Create a command to iterate over OVSDB records matching conditions
+
+        Same as db_find, see db_list_iter.
+
+        :returns:         :class:`Command` with an iterator of
+                          {'column', value} result
+        """
+
     @abc.abstractmethod
     def set_controller(self, bridge, controllers):
         """Create a command to set an OVS bridge's OpenFlow controllers
@@ -300,3 +489,117 @@ class API(object):
         :type bridge:  string
         :returns:      :class:`Command` with list of interfaces names result
         """
+
+    def _execute_chunked(self, commands, chunk_size):
+        for i in range(0, len(commands), chunk_size):
+            with self.transaction(check_error=True) as txn:
+                for command in commands[i:i + chunk_size]:
+                    txn.add(command)
+
+    def reconcile(self, bridges, prune_ports=False,
+                  chunk_size=RECONCILE_CHUNK_SIZE):
+        """Make the bridges and their ports match a desired state
+
+        The current state is read in a single transaction and compared with
+        the desired one in one pass, then only the differences are applied,
+        in transactions of at most chunk_size commands. Bridges which are
+        not in the desired state are left alone.
+
+        Each port is expected to have a single interface with the same name,
+        as created by add_port. Map columns are merged: only the given keys
+        are compared and set.
+
+        :param bridges:     The desired bridges, e.g.
+                            {'br-int': {
+                                'columns': {'fail_mode': 'secure'},
+                                'ports': {'tap1': {
+                                    'port': {'tag': 1},
+                                    'interface': {'external_ids': {
+                                        'iface-id': 'xxx'}}}}}}
+                            where 'columns', 'ports', 'port' and
+                            'interface' are optional
+        :type bridges:      dictionary
+        :param prune_ports: Delete the ports of the desired bridges which are
+                            not in the desired state, but their bridge
+                            internal port
+        :type prune_ports:  bool
+        :param chunk_size:  The maximum number of commands per transaction
+        :type chunk_size:   int
+        :returns:           dictionary of the added bridges and ports, the
+                            deleted ports and the updated (table, record)
+        """
+        bridge_columns, port_columns, iface_columns = set(), set(), set()
+        for bridge in bridges.values():
+            bridge_columns.update(bridge.get('columns', {}))
+            for port in bridge.get('ports', {}).values():
+                port_columns.update(port.get('port', {}))
+                iface_columns.update(port.get('interface', {}))
+
+        with self.transaction(check_error=True) as txn:
+            bridges_list = txn.add(self.db_list(
+                'Bridge', columns=['name', 'ports'] + sorted(bridge_columns)))
+            ports_list = txn.add(self.db_list(
+                'Port', columns=['_uuid', 'name'] + sorted(port_columns)))
+            ifaces_list = txn.add(self.db_list(
+                'Interface', columns=['name'] + sorted(iface_columns)))
+        current_bridges = dict((row['name'], row)
+                               for row in bridges_list.result or [])
+        current_ports = dict((row['name'], row)
+                             for row in ports_list.result or [])
+        current_ifaces = dict((row['name'], row)
+                              for row in ifaces_list.result or [])
+        port_bridge = {}
+        for row in current_bridges.values():
+            for port_uuid in _as_list(row['ports']):
+                port_bridge[port_uuid] = row['name']
+
+        report = {'added_bridges': [], 'added_ports': [],
+                  'deleted_ports': [], 'updated': []}
+        # New rows only get their columns set once they exist
+        creates, updates = [], []
+
+        def update(table, record, current, desired):
+            col_values = _columns_updates(current, desired)
+            if col_values:
+                updates.append(self.db_set_keys(table, record, *col_values))
+                report['updated'].append((table, record))
+
+        for name, bridge in bridges.items():
+            columns = bridge.get('columns', {})
+            ports = bridge.get('ports', {})
+            if name in current_bridges:
+                update('Bridge', name, current_bridges[name], columns)
+            else:
+                creates.append(self.add_br(name))
+                report['added_bridges'].append(name)
+                update('Bridge', name, {}, columns)
+            for port_name, port in sorted(ports.items()):
+                current = current_ports.get(port_name)
+                if (current is not None and
+                        port_bridge.get(current['_uuid']) != name):
+                    creates.append(self.del_port(port_name))
+                    current = None
+                if current is None:
+                    # Not may_exist, the port may be deleted in the same
+                    # transaction
+                    creates.append(self.add_port(name, port_name,
+                                                 may_exist=False))
+                    report['added_ports'].append((name, port_name))
+                    update('Port', port_name, {}, port.get('port', {}))
+                    update('Interface', port_name, {},
+                           port.get('interface', {}))
+                    continue
+                update('Port', port_name, current, port.get('port', {}))
+                update('Interface', port_name,
+                       current_ifaces.get(port_name, {}),
+                       port.get('interface', {}))
+            if prune_ports and name in current_bridges:
+                for port_name, current in sorted(current_ports.items()):
+                    if (port_bridge.get(current['_uuid']) == name and
+                            port_name != name and port_name not in ports):
+                        creates.append(self.del_port(port_name, name))
+                        report['deleted_ports'].append((name, port_name))
+
+        self._execute_chunked(creates, chunk_size)
+        self._execute_chunked(updates, chunk_size)
+        return report
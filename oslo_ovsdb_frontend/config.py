@@ -47,6 +47,9 @@ ovn_opts = [
     cfg.StrOpt('ovsdb_connection',
                default='tcp:127.0.0.1:6640',
                help=_('The connection string for the native OVSDB backend')),
+    cfg.StrOpt('ovn_sb_connection',
+               default='tcp:127.0.0.1:6642',
+               help=_('The connection string for the OVN_Southbound OVSDB')),
     cfg.IntOpt('ovsdb_connection_timeout',
                default=60,
                help=_('Timeout in seconds for the OVSDB '
@@ -65,6 +68,85 @@ ovn_opts = [
                       ' create resources found in Neutron but not in OVN.'
                       ' Also remove resources from OVN'
                       ' that are no longer in Neutron.')),
+    cfg.FloatOpt('notify_batch_window',
+                 default=0,
+                 help=_('Time in seconds during which OVN NB notifications '
+                        'are collected and coalesced by row before being '
+                        'delivered in a batch to the matching row events. '
+                        '0 disables batching and delivers every '
+                        'notification as soon as it is received.')),
+    cfg.IntOpt('notify_workers',
+               default=1,
+               min=1,
+               help=_('Number of workers running the OVN NB row event '
+                      'handlers. Notifications for the same row are always '
+                      'handled in order by the same worker.')),
+    cfg.StrOpt('notify_runtime',
+               default='auto',
+               choices=('auto', 'eventlet', 'threading', 'asyncio'),
+               help=_('The concurrency runtime running the OVN NB '
+                      'notification pipeline. auto uses eventlet when the '
+                      'thread module is monkey patched and native threads '
+                      'otherwise. asyncio is only available on Python 3.')),
+    cfg.IntOpt('notify_queue_size',
+               default=0,
+               min=0,
+               help=_('Maximum number of OVN NB notifications waiting to be '
+                      'handled. 0 means unbounded. With several '
+                      'notify_workers, the notifications handed to the '
+                      'workers are bounded separately by the same size, '
+                      'shared by all the workers, so that up to twice '
+                      'notify_queue_size notifications may be buffered.')),
+    cfg.StrOpt('notify_queue_policy',
+               default='block',
+               choices=('block', 'merge', 'drop-oldest'),
+               help=_('What to do when the OVN NB notification queue is '
+                      'full. block - block the OVSDB connection thread '
+                      'until there is room. merge - merge the notification '
+                      'with the queued notification of the same row, or '
+                      'block if there is none. drop-oldest - drop the '
+                      'oldest notification and let the plugin resync the '
+                      'row through its resync_dropped_notification '
+                      'method, if any.')),
+    cfg.BoolOpt('notify_row_snapshots',
+                default=False,
+                help=_('Hand read-only snapshots of the OVN NB rows to the '
+                       'notification handlers instead of the live rows. The '
+                       'snapshots only hold the columns the handlers '
+                       'declare, so they are cheaper to keep around and '
+                       'safe to use from any thread.')),
+    cfg.BoolOpt('bulk_initial_sync',
+                default=False,
+                help=_('Hand the state of the OVN NB logical ports to the '
+                       'plugin in a single call once the initial dump is '
+                       'received on startup, instead of one create event '
+                       'per logical port.')),
+    cfg.IntOpt('event_lock_shards',
+               default=1,
+               min=1,
+               help=_('Number of shards the OVN NB rows are split in for '
+                      'handling their events. Each shard is protected by '
+                      'its own OVSDB lock, so the events are handled by all '
+                      'the servers rather than by the single owner of the '
+                      'event lock, and the shards of a server that dies '
+                      'are taken over by the others.')),
+    cfg.IntOpt('event_lock_servers',
+               default=2,
+               min=1,
+               help=_('Expected number of servers handling the OVN NB '
+                      'events when event_lock_shards is greater than 1. '
+                      'On startup, a server owning less than '
+                      'event_lock_shards / event_lock_servers shards steals '
+                      'the missing ones from the other servers.')),
+    cfg.FloatOpt('notify_metrics_interval',
+                 default=0,
+                 min=0,
+                 help=_('Interval in seconds at which the OVN NB notification '
+                        'pipeline metrics (per event counters, match, queue '
+                        'wait and run latencies, queue depths) are exported '
+                        'through the plugin export_notify_metrics method, or '
+                        'logged if the plugin has none. 0 disables the '
+                        'metrics.')),
     cfg.StrOpt("vhost_sock_dir",
                default="/var/run/openvswitch",
                help=_("The directory in which vhost virtio socket "
@@ -78,5 +160,53 @@ def get_ovn_ovsdb_connection():
     return cfg.CONF.ovn.ovsdb_connection
 
 
+def get_ovn_sb_connection():
+    return cfg.CONF.ovn.ovn_sb_connection
+
+
 def get_ovn_ovsdb_timeout():
     return cfg.CONF.ovn.ovsdb_connection_timeout
+
+
+def get_ovn_neutron_sync_mode():
+    return cfg.CONF.ovn.neutron_sync_mode
+
+
+def get_ovn_notify_batch_window():
+    return cfg.CONF.ovn.notify_batch_window
+
+
+def get_ovn_notify_workers():
+    return cfg.CONF.ovn.notify_workers
+
+
+def get_ovn_notify_runtime():
+    return cfg.CONF.ovn.notify_runtime
+
+
+def get_ovn_notify_queue_size():
+    return cfg.CONF.ovn.notify_queue_size
+
+
+def get_ovn_notify_queue_policy():
+    return cfg.CONF.ovn.notify_queue_policy
+
+
+def get_ovn_notify_row_snapshots():
+    return cfg.CONF.ovn.notify_row_snapshots
+
+
+def get_ovn_bulk_initial_sync():
+    return cfg.CONF.ovn.bulk_initial_sync
+
+
+def get_ovn_event_lock_shards():
+    return cfg.CONF.ovn.event_lock_shards
+
+
+def get_ovn_event_lock_servers():
+    return cfg.CONF.ovn.event_lock_servers
+
+
+def get_ovn_notify_metrics_interval():
+    return cfg.CONF.ovn.notify_metrics_interval
@@ -50,3 +50,7 @@ class OvsDbFrontendException(Exception):
 
 class RowNotFound(OvsDbFrontendException):
     message = _("Cannot find %(table)s with %(col)s=%(match)s")
+
+
+class TimeoutException(OvsDbFrontendException):
+    message = _("Timed out waiting for %(table)s to match %(conditions)s")
@@ -13,13 +13,17 @@
 #    under the License.
 
 import collections
+import itertools
 
 from oslo_log import log as logging
 from oslo_utils import excutils
+from ovs.db import types
 
 from oslo_ovsdb_frontend._i18n import _, _LE
 from oslo_ovsdb_frontend import api
 from oslo_ovsdb_frontend.impl.native import idlutils
+from oslo_ovsdb_frontend.impl import prepared
+from oslo_ovsdb_frontend.impl import utils
 
 LOG = logging.getLogger(__name__)
 
@@ -68,8 +72,7 @@ class AddBridgeCommand(BaseCommand):
         row.name = self.name
         if self.datapath_type:
             row.datapath_type = self.datapath_type
-        self.api._ovs.verify('bridges')
-        self.api._ovs.bridges = self.api._ovs.bridges + [row]
+        idlutils.add_to_set(self.api._ovs, 'bridges', row)
 
         # Add the internal bridge port
         cmd = AddPortCommand(self.api, self.name, self.name, self.may_exist)
@@ -97,14 +100,11 @@ class DelBridgeCommand(BaseCommand):
                 msg = _("Bridge %s does not exist") % self.name
                 LOG.error(msg)
                 raise RuntimeError(msg)
-        self.api._ovs.verify('bridges')
         for port in br.ports:
             cmd = DelPortCommand(self.api, port.name, self.name,
                                  if_exists=True)
             cmd.run_idl(txn)
-        bridges = self.api._ovs.bridges
-        bridges.remove(br)
-        self.api._ovs.bridges = bridges
+        idlutils.remove_from_set(self.api._ovs, 'bridges', br)
         self.api._tables['Bridge'].rows[br.uuid].delete()
 
 
@@ -148,9 +148,7 @@ class BrSetExternalIdCommand(BaseCommand):
 
     def run_idl(self, txn):
         br = idlutils.row_by_value(self.api.idl, 'Bridge', 'name', self.name)
-        external_ids = getattr(br, 'external_ids', {})
-        external_ids[self.field] = self.value
-        br.external_ids = external_ids
+        idlutils.set_map_key(br, 'external_ids', self.field, self.value)
 
 
 class DbCreateCommand(BaseCommand):
@@ -195,6 +193,71 @@ class DbSetCommand(BaseCommand):
             setattr(record, col, val)
 
 
+class DbSetKeysCommand(BaseCommand):
+    """Set columns and map keys of a record, as ovs-vsctl set does"""
+
+    def __init__(self, api, table, record, col_key_values):
+        super(DbSetKeysCommand, self).__init__(api)
+        self.table = table
+        self.record = record
+        self.col_key_values = col_key_values
+
+    def run_idl(self, txn):
+        record = idlutils.row_by_record(self.api.idl, self.table, self.record)
+        for col, key, val in self.col_key_values:
+            if key is None:
+                setattr(record, col, val)
+            else:
+                idlutils.set_map_key(record, col, key, val)
+
+
+class DbCreateManyCommand(BaseCommand):
+    def __init__(self, api, table, rows):
+        super(DbCreateManyCommand, self).__init__(api)
+        self.table = table
+        self.rows = rows
+
+    def run_idl(self, txn):
+        self.result = []
+        for columns in self.rows:
+            row = txn.insert(self.api._tables[self.table])
+            for col, val in columns.items():
+                setattr(row, col, val)
+            self.result.append(row)
+
+
+class DbDestroyManyCommand(BaseCommand):
+    def __init__(self, api, table, records, if_exists):
+        super(DbDestroyManyCommand, self).__init__(api)
+        self.table = table
+        self.records = records
+        self.if_exists = if_exists
+
+    def run_idl(self, txn):
+        rows = idlutils.rows_by_records(self.api.idl, self.table,
+                                        self.records, self.if_exists)
+        for row in rows.values():
+            row.delete()
+
+
+class DbSetManyCommand(BaseCommand):
+    def __init__(self, api, table, updates):
+        super(DbSetManyCommand, self).__init__(api)
+        self.table = table
+        self.updates = updates
+
+    def run_idl(self, txn):
+        rows = idlutils.rows_by_records(
+            self.api.idl, self.table,
+            [record for record, _col_values in self.updates])
+        for record, col_values in self.updates:
+            row = rows[record]
+            for col, val in col_values:
+                if isinstance(val, collections.OrderedDict):
+                    val = dict(val)
+                setattr(row, col, val)
+
+
 class DbClearCommand(BaseCommand):
     def __init__(self, api, table, record, column):
         super(DbClearCommand, self).__init__(api)
@@ -229,6 +292,29 @@ class DbGetCommand(BaseCommand):
             self.result = result
 
 
+class DbGetManyCommand(BaseCommand):
+    def __init__(self, api, table, records, columns, if_exists):
+        super(DbGetManyCommand, self).__init__(api)
+        self.table = table
+        self.records = records
+        self.columns = columns
+        self.if_exists = if_exists
+
+    def run_idl(self, txn):
+        rows = idlutils.rows_by_records(self.api.idl, self.table,
+                                        self.records, self.if_exists)
+        self.result = {}
+        for record, row in rows.items():
+            values = {}
+            for column in self.columns:
+                # Single results of set columns, as for DbGetCommand
+                value = idlutils.get_column_value(row, column)
+                if isinstance(value, list) and len(value) == 1:
+                    value = value[0]
+                values[column] = value
+            self.result[record] = values
+
+
 class SetControllerCommand(BaseCommand):
     def __init__(self, api, bridge, targets):
         super(SetControllerCommand, self).__init__(api)
@@ -295,17 +381,12 @@ class AddPortCommand(BaseCommand):
                 return
         port = txn.insert(self.api._tables['Port'])
         port.name = self.port
-        br.verify('ports')
-        ports = getattr(br, 'ports', [])
-        ports.append(port)
-        br.ports = ports
+        idlutils.add_to_set(br, 'ports', port)
 
         iface = txn.insert(self.api._tables['Interface'])
         iface.name = self.port
-        port.verify('interfaces')
-        ifaces = getattr(port, 'interfaces', [])
-        ifaces.append(iface)
-        port.interfaces = ifaces
+        # The port is new, so its interfaces are set outright
+        port.interfaces = [iface]
 
 
 class DelPortCommand(BaseCommand):
@@ -339,10 +420,7 @@ class DelPortCommand(BaseCommand):
             LOG.error(msg)
             raise RuntimeError(msg)
 
-        br.verify('ports')
-        ports = br.ports
-        ports.remove(port)
-        br.ports = ports
+        idlutils.remove_from_set(br, 'ports', port)
 
         # Also remove port/interface directly for indexing?
         port.verify('interfaces')
@@ -404,13 +482,57 @@ class InterfaceToBridgeCommand(BaseCommand):
         self.result = next(br.name for br in bridges if pname in br.ports)
 
 
+def _paginate(rows, limit, offset):
+    return itertools.islice(rows, offset,
+                            None if limit is None else offset + limit)
+
+
+def _page_rows(table_schema, row_uuids):
+    # The page is the UUIDs taken within the transaction, its rows are
+    # converted as they are consumed when iterating
+    return (table_schema.rows[uuid] for uuid in row_uuids
+            # Rows deleted since, when iterating
+            if uuid in table_schema.rows)
+
+
+def _row_result(row, columns, row_views):
+    if row_views:
+        return idlutils.RowView(row, columns)
+    return {c: idlutils.get_column_value(row, c) for c in columns}
+
+
+def _numeric_columns(table_schema, columns):
+    numeric = set()
+    for col in columns:
+        column = table_schema.columns.get(col)
+        if (column is not None and column.type.is_scalar() and
+                column.type.key.type in (types.IntegerType, types.RealType)):
+            numeric.add(col)
+    return numeric
+
+
+def _rows_result(command, table_schema, rows, columns):
+    if command.columnar:
+        return utils.to_columnar(columns, rows, idlutils.get_column_value,
+                                 _numeric_columns(table_schema, columns))
+    results = (_row_result(row, columns, command.row_views) for row in rows)
+    return results if command.iterate else list(results)
+
+
 class DbListCommand(BaseCommand):
-    def __init__(self, api, table, records, columns, if_exists):
+    def __init__(self, api, table, records, columns, if_exists,
+                 limit=None, offset=0, iterate=False, row_views=False,
+                 columnar=False):
         super(DbListCommand, self).__init__(api)
         self.table = table
         self.columns = columns
         self.if_exists = if_exists
         self.records = records
+        self.limit = limit
+        self.offset = offset
+        self.iterate = iterate
+        self.row_views = row_views
+        self.columnar = columnar
 
     def run_idl(self, txn):
         table_schema = self.api._tables[self.table]
@@ -437,13 +559,9 @@ class DbListCommand(BaseCommand):
                           })
         else:
             row_uuids = table_schema.rows.keys()
-        self.result = [
-            {
-                c: idlutils.get_column_value(table_schema.rows[uuid], c)
-                for c in columns
-            }
-            for uuid in row_uuids
-        ]
+        row_uuids = list(_paginate(row_uuids, self.limit, self.offset))
+        self.result = _rows_result(
+            self, table_schema, _page_rows(table_schema, row_uuids), columns)
 
 
 class DbFindCommand(BaseCommand):
@@ -453,13 +571,76 @@ class DbFindCommand(BaseCommand):
         self.conditions = conditions
         self.columns = (kwargs.get('columns') or
                         list(self.table.columns.keys()) + ['_uuid'])
+        self.limit = kwargs.get('limit')
+        self.offset = kwargs.get('offset', 0)
+        self.iterate = kwargs.get('iterate', False)
+        self.row_views = kwargs.get('row_views', False)
+        self.columnar = kwargs.get('columnar', False)
 
     def run_idl(self, txn):
-        self.result = [
-            {
-                c: idlutils.get_column_value(r, c)
-                for c in self.columns
-            }
-            for r in self.table.rows.values()
-            if idlutils.row_match(r, self.conditions)
-        ]
+        matching = (r.uuid for r in self.table.rows.values()
+                    if idlutils.row_match(r, self.conditions))
+        row_uuids = list(_paginate(matching, self.limit, self.offset))
+        self.result = _rows_result(
+            self, self.table, _page_rows(self.table, row_uuids),
+            self.columns)
+
+
+_ATOM_CONVERTERS = {
+    types.IntegerType: int,
+    types.RealType: float,
+    types.BooleanType: lambda value: value == 'true',
+    types.StringType: lambda value: '' if value == '""' else value,
+}
+
+
+def _atom_converter(base_type):
+    return _ATOM_CONVERTERS.get(base_type.type, lambda value: value)
+
+
+class PreparedDbCommand(prepared.PreparedCommand):
+    """Prepared command validated against the schema of the IDL
+
+    The literal values of the template are converted once to the types of
+    their columns.
+    """
+
+    def _validate_table(self):
+        if self.table not in self.api._tables:
+            self._invalid(_("no table %s") % self.table)
+        self._table_schema = self.api._tables[self.table]
+
+    def _validate_column(self, column, has_key):
+        schema = self._table_schema.columns.get(column)
+        if schema is None:
+            self._invalid(_("no column %(column)s in %(table)s") % {
+                'column': column, 'table': self.table})
+        if has_key and not schema.type.is_map():
+            self._invalid(_("column %s is not a map") % column)
+
+    def _converter(self, column, has_key):
+        col_type = self._table_schema.columns[column].type
+        if has_key:
+            return _atom_converter(col_type.value)
+        if col_type.is_map():
+            # Left to a placeholder rather than parsing the vsctl syntax
+            self._invalid(_("map values of %s must be placeholders") %
+                          column)
+        convert = _atom_converter(col_type.key)
+        if col_type.is_scalar():
+            return convert
+
+        def convert_set(value):
+            if value == '[]':
+                return []
+            return [convert(item) for item in value.split(',')]
+        return convert_set
+
+    def _command(self, record, args):
+        if self.verb == 'set':
+            return DbSetKeysCommand(self.api, self.table, record, args)
+        if self.verb == 'get':
+            return DbGetCommand(self.api, self.table, record, args[0][0])
+        if self.verb == 'clear':
+            return DbClearCommand(self.api, self.table, record, args[0][0])
+        return DbDestroyCommand(self.api, self.table, record)
@@ -21,8 +21,11 @@ from ovs import poller
 import retrying
 from six.moves import queue as Queue
 
+from oslo_ovsdb_frontend import exceptions
 from oslo_ovsdb_frontend.impl.native import helpers
 from oslo_ovsdb_frontend.impl.native import idlutils
+from oslo_ovsdb_frontend.impl.native import row_event
+from oslo_ovsdb_frontend.impl.native import table_digest
 
 
 class TransactionQueue(Queue.Queue, object):
@@ -50,6 +53,17 @@ class TransactionQueue(Queue.Queue, object):
         return self.alertin.fileno()
 
 
+class EventIdl(idl.Idl):
+    """Idl handing its notifications to the waiters of Connection.wait_for"""
+
+    def __init__(self, remote, schema):
+        super(EventIdl, self).__init__(remote, schema)
+        self.wait_handler = row_event.RowEventHandler()
+
+    def notify(self, event, row, updates=None):
+        self.wait_handler.notify(event, row, updates)
+
+
 class Connection(object):
     def __init__(self, connection, timeout, schema_name):
         self.idl = None
@@ -58,50 +72,118 @@ class Connection(object):
         self.txns = TransactionQueue(1)
         self.lock = threading.Lock()
         self.schema_name = schema_name
+        self._digests = {}
 
     def start(self):
         with self.lock:
             if self.idl is not None:
                 return
 
-            try:
-                helper = idlutils.get_schema_helper(self.connection,
-                                                    self.schema_name)
-            except Exception:
-                # We may have failed do to set-manager not being called
-                helpers.enable_connection_uri(self.connection)
-
-                # There is a small window for a race, so retry up to a second
-                @retrying.retry(wait_exponential_multiplier=10,
-                                stop_max_delay=1000)
-                def do_get_schema_helper():
-                    return idlutils.get_schema_helper(self.connection,
-                                                      self.schema_name)
-                helper = do_get_schema_helper()
-
+            helper = self.get_schema_helper()
             helper.register_all()
-            self.idl = idl.Idl(self.connection, helper)
+            self.idl = EventIdl(self.connection, helper)
             idlutils.wait_for_change(self.idl, self.timeout)
             self.poller = poller.Poller()
             self.thread = threading.Thread(target=self.run)
             self.thread.setDaemon(True)
             self.thread.start()
 
+    def get_schema_helper(self):
+        try:
+            return idlutils.get_schema_helper(self.connection,
+                                              self.schema_name)
+        except Exception:
+            # We may have failed do to set-manager not being called
+            helpers.enable_connection_uri(self.connection)
+
+            # There is a small window for a race, so retry up to a second
+            @retrying.retry(wait_exponential_multiplier=10,
+                            stop_max_delay=1000)
+            def do_get_schema_helper():
+                return idlutils.get_schema_helper(self.connection,
+                                                  self.schema_name)
+            return do_get_schema_helper()
+
     def run(self):
         while True:
             self.idl.wait(self.poller)
             self.poller.fd_wait(self.txns.alert_fileno, poller.POLLIN)
             self.poller.block()
-            self.idl.run()
-            txn = self.txns.get_nowait()
-            if txn is not None:
-                try:
-                    txn.results.put(txn.do_commit())
-                except Exception as ex:
-                    er = idlutils.ExceptionResult(ex=ex,
-                                                  tb=traceback.format_exc())
-                    txn.results.put(er)
-                self.txns.task_done()
+            # The IDL changes its rows and sends its notifications while
+            # running, wait_for holds the lock to look at a consistent table
+            with self.lock:
+                self.idl.run()
+                txn = self.txns.get_nowait()
+                if txn is not None:
+                    try:
+                        txn.results.put(txn.do_commit())
+                    except Exception as ex:
+                        er = idlutils.ExceptionResult(
+                            ex=ex, tb=traceback.format_exc())
+                        txn.results.put(er)
+                    self.txns.task_done()
 
     def queue_txn(self, txn):
         self.txns.put(txn)
+
+    def wait_for(self, table, conditions=None, events=None, timeout=None):
+        """Block until a row of the table matches the conditions
+
+        The current content of the table is checked first, so the call
+        returns at once if a row already matches. Otherwise it waits for the
+        IDL to be notified of a matching change. The check and the watch
+        happen under the lock held by the connection thread while it runs
+        the IDL, so no change is seen half applied or missed in between.
+
+        :param table:      The name of the table
+        :param conditions: (column, operation, value) tuples the row must
+                           match, see idlutils.row_match
+        :param events:     The events to wait for, defaults to row creations
+                           and updates
+        :param timeout:    Seconds to wait, defaults to the connection timeout
+        :returns:          The matching row
+        :raises:           exceptions.TimeoutException
+        """
+        if events is None:
+            events = (row_event.RowEvent.ROW_CREATE,
+                      row_event.RowEvent.ROW_UPDATE)
+        conditions = conditions or ()
+        event = row_event.WaitEvent(events, table, conditions)
+        with self.lock:
+            self.idl.wait_handler.watch_event(event)
+            if row_event.RowEvent.ROW_CREATE in events:
+                for row in self.idl.tables[table].rows.values():
+                    if idlutils.row_match(row, conditions):
+                        self.idl.wait_handler.unwatch_event(event)
+                        return row
+        try:
+            if not event.wait(self.timeout if timeout is None else timeout):
+                raise exceptions.TimeoutException(table=table,
+                                                  conditions=conditions)
+            return event.row
+        finally:
+            self.idl.wait_handler.unwatch_event(event)
+
+    def table_digest(self, table, key_column, columns,
+                     buckets=table_digest.DEFAULT_BUCKETS):
+        """Return the rolling digests of the columns of a table
+
+        The digests are maintained from the IDL notifications from the first
+        call on, later calls with the same arguments share them.
+
+        :param table:      The name of the table
+        :param key_column: The column identifying the rows, which decides
+                           their bucket
+        :param columns:    The digested columns
+        :param buckets:    The number of buckets
+        :returns:          :class:`table_digest.TableDigest`
+        """
+        key = (table, key_column, tuple(columns), buckets)
+        with self.lock:
+            digest = self._digests.get(key)
+            if digest is None:
+                digest = table_digest.TableDigest(table, key_column, columns,
+                                                  buckets)
+                digest.start(self.idl)
+                self._digests[key] = digest
+            return digest
@@ -0,0 +1,129 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import abc
+import threading
+
+from oslo_log import log as logging
+import six
+from six.moves import queue as Queue
+
+from oslo_ovsdb_frontend._i18n import _LE
+from oslo_ovsdb_frontend.impl.native import runtime as runtime_
+
+LOG = logging.getLogger(__name__)
+
+
+@six.add_metaclass(abc.ABCMeta)
+class Executor(object):
+    """Runs the work submitted by a notify handler
+
+    Work submitted with the same key must run in submission order.
+    """
+
+    def shard(self, key):
+        """Return the index of the worker handling the given key"""
+        return 0
+
+    @abc.abstractmethod
+    def submit(self, key, func, *args):
+        """Schedule func(*args) to run after the work queued for key"""
+
+    def shutdown(self):
+        """Stop the workers once the submitted work is done"""
+
+    def depth(self):
+        """Return the amount of submitted work waiting to run"""
+        return 0
+
+    def wait(self):
+        """Block until all the submitted work is done"""
+
+
+class InlineExecutor(Executor):
+    """Runs the work in the thread submitting it"""
+
+    def submit(self, key, func, *args):
+        try:
+            func(*args)
+        except Exception:
+            LOG.exception(_LE('Unexpected exception in %s'), func)
+
+
+class ShardedExecutor(Executor):
+    """Runs the work on a pool of workers, sharded by key
+
+    Every key is always handled by the same worker, so the work for a given
+    key runs in order while the work for different keys runs concurrently.
+
+    When queue_size is set, the workers share that many slots of queued
+    work and submit() blocks while all of them are taken, so that the caller
+    does not take more work than the workers can hold.
+    """
+
+    STOP = object()
+
+    def __init__(self, workers, runtime=None, queue_size=0):
+        self.runtime = runtime or runtime_.get_runtime()
+        # A slot is taken by submit() and given back once a worker dequeues
+        # the work, whatever the worker queue it went to
+        self.slots = threading.Semaphore(queue_size) if queue_size else None
+        self.queues = [Queue.Queue() for _i in range(workers)]
+        for queue in self.queues:
+            self.runtime.spawn(self._worker, queue)
+
+    def shard(self, key):
+        return hash(key) % len(self.queues)
+
+    def submit(self, key, func, *args):
+        if self.slots is not None:
+            self.slots.acquire()
+        self.queues[self.shard(key)].put((func, args))
+
+    def shutdown(self):
+        for queue in self.queues:
+            queue.put(ShardedExecutor.STOP)
+
+    def wait(self):
+        for queue in self.queues:
+            queue.join()
+
+    def depth(self):
+        return sum(queue.qsize() for queue in self.queues)
+
+    def _worker(self, queue):
+        while True:
+            item = queue.get()
+            try:
+                if item is ShardedExecutor.STOP:
+                    break
+                if self.slots is not None:
+                    self.slots.release()
+                func, args = item
+                func(*args)
+            except Exception:
+                # If any unexpected exception happens we don't want the
+                # worker to exit.
+                LOG.exception(_LE('Unexpected exception in %s'), item[0])
+            finally:
+                queue.task_done()
+
+
+def get_executor(workers, runtime=None, queue_size=0):
+    """Return the executor for the requested number of workers
+
+    :param queue_size: Maximum amount of work queued for the workers, 0
+                       means unbounded
+    """
+    if workers > 1:
+        return ShardedExecutor(workers, runtime, queue_size)
+    return InlineExecutor()
@@ -0,0 +1,160 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import random
+
+from oslo_log import log as logging
+from ovs import jsonrpc
+
+from oslo_ovsdb_frontend._i18n import _LW
+
+LOG = logging.getLogger(__name__)
+
+
+class ShardedLock(object):
+    """Set of OVSDB locks sharing out the rows between the servers
+
+    The rows are split in shards by UUID, each shard being protected by its
+    own OVSDB lock. Every server queues for all the locks, so when a server
+    dies the ovsdb-server hands its shards over to the others.
+
+    The first server to start gets all the locks. Once its requests are
+    answered, a server owning less than its fair share of the shards, about
+    the number of shards divided by the number of servers, steals the
+    missing ones from the other servers. It does so once per session, so
+    that the servers do not keep stealing the shards from each other; the
+    shards it loses later on are taken back when their owner dies, as it
+    stays queued for their locks.
+
+    ovs.db.idl.Idl only handles a single lock, so the locks are requested
+    on a session of their own. run() and wait() are meant to be called
+    along with the ones of the Idl.
+    """
+
+    def __init__(self, remote, name, shards, servers=1):
+        """
+        :param servers: Expected number of servers sharing the locks, giving
+                        the fair share of the shards of every server
+        """
+        self.names = ["%s_%d" % (name, i) for i in range(shards)]
+        self.fair_share = -(-shards // max(servers, 1))
+        self._session = jsonrpc.Session.open(remote)
+        self._last_seqno = None
+        self._requests = {}
+        self._owned = set()
+        self._contended = set()
+        self._stolen = False
+
+    def shard(self, row_uuid):
+        """Return the name of the lock protecting the row"""
+        return self.names[row_uuid.int % len(self.names)]
+
+    def owns(self, row_uuid):
+        """Return whether this server handles the row
+
+        As with a single lock, the row is handled until the ovsdb-server
+        answers that the lock is owned by another server.
+        """
+        name = self.shard(row_uuid)
+        return name in self._owned or name not in self._contended
+
+    def owned_shards(self):
+        return set(self._owned)
+
+    def _request(self, method, name):
+        msg = jsonrpc.Message.create_request(method, [name])
+        self._requests[msg.id] = (method, name)
+        self._session.send(msg)
+
+    def _lock_all(self):
+        self._stolen = False
+        self._requests.clear()
+        self._owned.clear()
+        self._contended.clear()
+        for name in self.names:
+            self._request("lock", name)
+
+    def _set_owned(self, name, owned):
+        if owned:
+            LOG.info("Got the event lock %s", name)
+            self._owned.add(name)
+            self._contended.discard(name)
+        else:
+            self._owned.discard(name)
+            self._contended.add(name)
+
+    def _maybe_steal(self):
+        if (self._stolen or self._requests or
+                self._last_seqno is None or
+                not self._session.is_connected()):
+            return
+        self._stolen = True
+        missing = min(self.fair_share - len(self._owned),
+                      len(self._contended))
+        if missing <= 0:
+            return
+        names = random.sample(sorted(self._contended), missing)
+        LOG.info("Owning %(owned)d event locks out of a fair share of "
+                 "%(share)d, stealing %(names)s",
+                 {'owned': len(self._owned), 'share': self.fair_share,
+                  'names': ', '.join(names)})
+        for name in names:
+            self._request("steal", name)
+
+    def _process(self, msg):
+        if (msg.type == jsonrpc.Message.T_REPLY and
+                msg.id in self._requests):
+            _method, name = self._requests.pop(msg.id)
+            locked = (isinstance(msg.result, dict) and
+                      msg.result.get("locked") is True)
+            self._set_owned(name, locked)
+        elif (msg.type == jsonrpc.Message.T_ERROR and
+                msg.id in self._requests):
+            method, name = self._requests.pop(msg.id)
+            LOG.warning(_LW("The %(method)s request of the event lock "
+                            "%(name)s failed: %(error)s"),
+                        {'method': method, 'name': name, 'error': msg.error})
+            if method == "lock":
+                # Not queued for the lock, leave the shard to the others
+                self._set_owned(name, False)
+        elif (msg.type == jsonrpc.Message.T_NOTIFY and
+                msg.method in ("locked", "stolen") and
+                msg.params and msg.params[0] in self.names):
+            name = msg.params[0]
+            self._set_owned(name, msg.method == "locked")
+            if msg.method == "stolen":
+                # Still queued for the lock, the shard is handed back to
+                # this server if the thief dies
+                LOG.info("The event lock %s was stolen", name)
+
+    def run(self):
+        self._session.run()
+        for _i in range(50):
+            if not self._session.is_connected():
+                break
+            seqno = self._session.get_seqno()
+            if seqno != self._last_seqno:
+                self._last_seqno = seqno
+                self._lock_all()
+                break
+            msg = self._session.recv()
+            if msg is None:
+                break
+            self._process(msg)
+        self._maybe_steal()
+
+    def wait(self, poller):
+        self._session.wait(poller)
+        self._session.recv_wait(poller)
+
+    def close(self):
+        self._session.close()
@@ -0,0 +1,105 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import bisect
+import threading
+
+# Upper bounds, in seconds, of the latency histogram buckets
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+
+class Histogram(object):
+    """Latency histogram with fixed bucket upper bounds
+
+    Each bucket counts the values between its bound and the previous one,
+    the last bucket counts the values above all the bounds.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def to_dict(self):
+        bounds = self.buckets + (float('inf'),)
+        return {'count': self.count,
+                'sum': self.sum,
+                'buckets': list(zip(bounds, self.counts))}
+
+
+class EventMetrics(object):
+    """Counters and latency histograms of the notification pipeline
+
+    The metrics are kept by event name. For each of them:
+
+    - matched: notifications the event matched
+    - runs: calls of run() or run_batch()
+    - errors: calls which raised an exception
+    - match_time: time spent in matches()
+    - queue_wait: time between the notification being queued and the
+                  event starting to run
+    - run_time: time spent in run() or run_batch()
+    """
+
+    COUNTERS = ('matched', 'runs', 'errors')
+    HISTOGRAMS = ('match_time', 'queue_wait', 'run_time')
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._events = {}
+        self._lock = threading.Lock()
+
+    def _event(self, name):
+        metrics = self._events.get(name)
+        if metrics is None:
+            metrics = dict((counter, 0) for counter in self.COUNTERS)
+            metrics.update((histogram, Histogram(self.buckets))
+                           for histogram in self.HISTOGRAMS)
+            self._events[name] = metrics
+        return metrics
+
+    def increment(self, name, counter, value=1):
+        with self._lock:
+            self._event(name)[counter] += value
+
+    def observe(self, name, histogram, value):
+        with self._lock:
+            self._event(name)[histogram].observe(value)
+
+    def snapshot(self):
+        """Return a copy of the metrics as plain data
+
+        :returns: {event name: {counter: int, histogram: {'count': int,
+                  'sum': float, 'buckets': [(upper bound, count), ...]}}}
+        """
+        with self._lock:
+            result = {}
+            for name, metrics in self._events.items():
+                result[name] = dict(
+                    (key, value.to_dict() if isinstance(value, Histogram)
+                     else value)
+                    for key, value in metrics.items())
+            return result
+
+
+def add_rates(snapshot, previous, interval):
+    """Add to each event of a snapshot its runs per second since previous"""
+    for name, metrics in snapshot.items():
+        runs = metrics['runs'] - previous.get(name, {}).get('runs', 0)
+        metrics['run_rate'] = runs / float(interval) if interval else 0.0
+    return snapshot
@@ -21,6 +21,7 @@ from ovs.db import idl
 from ovs import jsonrpc
 from ovs import poller
 from ovs import stream
+from six.moves import collections_abc
 
 from oslo_ovsdb_frontend._i18n import _
 from oslo_ovsdb_frontend import exceptions
@@ -44,6 +45,9 @@ _LOOKUP_TABLE = {
 
 _NO_DEFAULT = object()
 
+# The OVN commands catch the lookup errors as idlutils.RowNotFound
+RowNotFound = exceptions.RowNotFound
+
 
 def row_by_value(idl_, table, column, match, default=_NO_DEFAULT):
     """Lookup an IDL row in a table by column/value"""
@@ -85,6 +89,213 @@ def row_by_record(idl_, table, record):
     return row
 
 
+def rows_by_records(idl_, table, records, if_exists=False):
+    """Lookup many IDL rows by record, as row_by_record does
+
+    The records which are not UUIDs are resolved with a single pass over
+    the table holding their lookup column, rather than one per record.
+
+    :param if_exists: Skip the missing records instead of raising
+                      RowNotFound
+    :returns:         dictionary of rows indexed by record
+    """
+    t = idl_.tables[table]
+    result = {}
+    by_value = []
+    for record in records:
+        try:
+            uuid_ = (record if isinstance(record, uuid.UUID)
+                     else uuid.UUID(record))
+        except ValueError:
+            # Not a UUID string, continue lookup by other means
+            by_value.append(record)
+            continue
+        if uuid_ in t.rows:
+            result[record] = t.rows[uuid_]
+        elif not if_exists:
+            raise exceptions.RowNotFound(table=table, col='uuid',
+                                         match=record)
+    if not by_value:
+        return result
+
+    rl = _LOOKUP_TABLE.get(table, RowLookup(table, get_index_column(t), None))
+    # no table means uuid only, no column is just SSL which we don't need
+    if rl.table is None:
+        raise ValueError(_("Table %s can only be queried by UUID") % table)
+    if rl.column is None:
+        raise NotImplementedError(_("'.' searches are not implemented"))
+    wanted = set(by_value)
+    index = {}
+    for row in idl_.tables[rl.table].rows.values():
+        value = getattr(row, rl.column)
+        if value in wanted and value not in index:
+            index[value] = row
+    for record in by_value:
+        row = index.get(record)
+        if row is not None and rl.uuid_column:
+            rows = getattr(row, rl.uuid_column)
+            row = rows[0] if len(rows) == 1 else None
+        if row is not None:
+            result[record] = row
+        elif not if_exists:
+            raise exceptions.RowNotFound(table=table, col=rl.column,
+                                         match=record)
+    return result
+
+
+# Partial set and map updates, sent as OVSDB mutate operations, appeared in
+# ovs 2.6 (maps) and 2.7 (sets). Older versions rewrite the whole column.
+_HAS_SET_MUTATIONS = hasattr(idl.Row, 'addvalue')
+_HAS_MAP_MUTATIONS = hasattr(idl.Row, 'setkey')
+
+
+def _ref_key(value):
+    return getattr(value, 'uuid', value)
+
+
+def add_to_set(row, column, *values):
+    """Add values to a set column of a row within a transaction
+
+    The values are inserted with a mutation when the ovs library supports
+    it, so that the transaction neither carries the whole set nor fails
+    when another client changed it. Otherwise the column is verified and
+    rewritten.
+
+    :param values: Rows, UUIDs or atoms to add
+    """
+    if _HAS_SET_MUTATIONS:
+        for value in values:
+            row.addvalue(column, value)
+        return
+    row.verify(column)
+    setattr(row, column, getattr(row, column, []) + list(values))
+
+
+def remove_from_set(row, column, *values):
+    """Remove values from a set column of a row within a transaction
+
+    See add_to_set, removing a value missing from the set is a no-op.
+
+    :param values: Rows, UUIDs or atoms to remove
+    """
+    if _HAS_SET_MUTATIONS:
+        for value in values:
+            row.delvalue(column, value)
+        return
+    row.verify(column)
+    removed = set(_ref_key(value) for value in values)
+    setattr(row, column, [value for value in getattr(row, column, [])
+                          if _ref_key(value) not in removed])
+
+
+def set_map_key(row, column, key, value):
+    """Set a key of a map column of a row within a transaction
+
+    See add_to_set, the key is set with a mutation when supported.
+    """
+    if _HAS_MAP_MUTATIONS:
+        row.setkey(column, key, value)
+        return
+    row.verify(column)
+    mapping = getattr(row, column, {})
+    mapping[key] = value
+    setattr(row, column, mapping)
+
+
+def has_pending_change(row, column):
+    """Return whether the transaction in progress changes a column"""
+    if column in (row._changes or {}):
+        return True
+    # Partial updates, see add_to_set
+    mutations = row.__dict__.get('_mutations') or {}
+    return any(column in columns for columns in mutations.values())
+
+
+class RowSnapshot(object):
+    """Read-only copy of some of the columns of an IDL row
+
+    Snapshots only keep the uuid, the table schema and the copied column
+    values, so they do not keep the live row, nor the rows it references,
+    alive: references are stored as UUIDs. Use snapshot_row() to create
+    them, it returns instances of subclasses with a slot per column.
+    """
+
+    __slots__ = ('uuid', '_table', '_columns')
+
+    def __init__(self, uuid_, table, values):
+        setter = super(RowSnapshot, self).__setattr__
+        setter('uuid', uuid_)
+        setter('_table', table)
+        setter('_columns', tuple(values))
+        for column, value in values.items():
+            setter(column, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(_("Row snapshots are read-only"))
+
+    def __delattr__(self, name):
+        raise AttributeError(_("Row snapshots are read-only"))
+
+    @property
+    def _data(self):
+        return {column: getattr(self, column) for column in self._columns}
+
+    def __eq__(self, other):
+        return (isinstance(other, RowSnapshot) and
+                self.uuid == other.uuid and self._data == other._data)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.uuid)
+
+    def __repr__(self):
+        return "%s(%s, %s)" % (self._table.name, self.uuid, self._data)
+
+
+_SNAPSHOT_CLASSES = {}
+
+
+def _snapshot_class(columns):
+    cls = _SNAPSHOT_CLASSES.get(columns)
+    if cls is None:
+        cls = type('RowSnapshot', (RowSnapshot,),
+                   {'__slots__': tuple(str(c) for c in columns)})
+        _SNAPSHOT_CLASSES[columns] = cls
+    return cls
+
+
+def create_snapshot(uuid_, table, values):
+    """Create a snapshot of a row from its column values"""
+    cls = _snapshot_class(tuple(sorted(values)))
+    return cls(uuid_, table, values)
+
+
+def snapshot_row(row, columns=None):
+    """Return a read-only snapshot of the row
+
+    :param row:     An IDL row, or a snapshot
+    :param columns: The columns to copy, None means all the columns the row
+                    holds. The old row of an update only holds the columns
+                    changed by the update.
+    :type columns:  iterable of column names or None
+    :returns:       :class:`RowSnapshot`
+    """
+    if row is None:
+        return None
+    data = row._data
+    if columns is None:
+        columns = data.keys()
+    if isinstance(row, RowSnapshot):
+        values = {c: data[c] for c in columns if c in data}
+    else:
+        # Keep the referenced rows as UUIDs, see _uuid_to_row in ovs.db.idl
+        values = {c: data[c].to_python(lambda atom, base: atom)
+                  for c in columns if c in data}
+    return create_snapshot(row.uuid, row._table, values)
+
+
 class ExceptionResult(object):
     def __init__(self, ex, tb):
         self.ex = ex
@@ -138,6 +349,39 @@ def get_column_value(row, col):
     return val
 
 
+class RowView(collections_abc.Mapping):
+    """Read-only mapping of the columns of an IDL row
+
+    The view references the cached row and converts a column, as
+    get_column_value does, only when it is accessed, so listing wide
+    tables does not copy every column of every row. It reads the row as
+    it is in the cache at that time. Use to_dict() for a copy.
+    """
+
+    __slots__ = ('_row', '_columns')
+
+    def __init__(self, row, columns):
+        self._row = row
+        self._columns = columns
+
+    def __getitem__(self, column):
+        if column not in self._columns:
+            raise KeyError(column)
+        return get_column_value(self._row, column)
+
+    def __iter__(self):
+        return iter(self._columns)
+
+    def __len__(self):
+        return len(self._columns)
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __repr__(self):
+        return "RowView(%s)" % self.to_dict()
+
+
 def condition_match(row, condition):
     """Return whether a condition matches a row
 
@@ -13,11 +13,13 @@
 #    under the License.
 
 import abc
+import threading
 
 from oslo_log import log as logging
 from ovs.db import idl
 import six
 
+from oslo_ovsdb_frontend._i18n import _LE
 from oslo_ovsdb_frontend.impl.native import idlutils
 
 LOG = logging.getLogger(__name__)
@@ -30,11 +32,30 @@ class RowEvent(object):
     ROW_DELETE = idl.ROW_DELETE
     ONETIME = False
 
-    def __init__(self, events, table, conditions, old_conditions=None):
+    def __init__(self, events, table, conditions, old_conditions=None,
+                 columns=None, update_columns=None):
+        """Watch for changes of the rows of a table
+
+        :param events:         ROW_CREATE, ROW_UPDATE and/or ROW_DELETE
+        :param table:          The name of the watched table
+        :param conditions:     Conditions the row must match
+        :param old_conditions: Conditions the old row of an update must match
+        :param columns:        The columns run() reads, which are the only
+                               ones copied in row snapshots along with the
+                               columns of the conditions. None means all of
+                               them.
+        :type columns:         iterable of column names or None
+        :param update_columns: ROW_UPDATE only matches when the update
+                               changed one of these columns. None means any
+                               update matches.
+        :type update_columns:  iterable of column names or None
+        """
         self.table = table
         self.events = events
         self.conditions = conditions
         self.old_conditions = old_conditions
+        self.columns = columns
+        self.update_columns = update_columns
         self.event_name = 'RowEvent'
 
     def _key(self):
@@ -46,11 +67,32 @@ class RowEvent(object):
     def __eq__(self, other):
         return self._key() == other._key()
 
+    def snapshot_columns(self):
+        """Return the columns to copy in the snapshots of matching rows"""
+        if self.columns is None:
+            return None
+        columns = set(self.columns)
+        for conditions in (self.conditions, self.old_conditions):
+            columns.update(cond[0] for cond in conditions or ())
+        return columns
+
+    def changes_watched_columns(self, old):
+        """Return whether an update changed the columns the event watches
+
+        :param old: The old row of the update, holding the changed columns
+        """
+        if self.update_columns is None or old is None:
+            return True
+        return any(column in old._data for column in self.update_columns)
+
     def matches(self, event, row, old=None):
         if event not in self.events:
             return False
         if row._table.name != self.table:
             return False
+        if (event == self.ROW_UPDATE and
+                not self.changes_watched_columns(old)):
+            return False
         if self.conditions and not idlutils.row_match(row, self.conditions):
             return False
         if self.old_conditions:
@@ -71,3 +113,93 @@ class RowEvent(object):
     @abc.abstractmethod
     def run(self, event, row, old):
         """Method to run when the event matches"""
+
+    def run_batch(self, events):
+        """Method to run when the event matches in batching mode
+
+        The default implementation calls run() for every event, subclasses
+        can override it to process the whole batch at once.
+
+        :param events: The net effect of the notifications received for each
+                       row during the batching window
+        :type events:  list of (event, row, old) tuples
+        """
+        for event, row, old in events:
+            self.run(event, row, old)
+
+    def run_initial(self, rows):
+        """Method to run with the rows matching the event at startup
+
+        Called once the initial dump of the database has been received, in
+        place of a ROW_CREATE event per row. The default implementation calls
+        run() for every row, subclasses can override it to reconcile the
+        whole table state at once.
+
+        :param rows: The rows matching the event conditions
+        :type rows:  list of rows
+        """
+        for row in rows:
+            self.run(self.ROW_CREATE, row, None)
+
+
+class WaitEvent(RowEvent):
+    """One-shot event that a caller can block on until it matches"""
+
+    ONETIME = True
+
+    def __init__(self, events, table, conditions, old_conditions=None,
+                 columns=None, update_columns=None):
+        super(WaitEvent, self).__init__(events, table, conditions,
+                                        old_conditions, columns,
+                                        update_columns)
+        self.event_name = 'WaitEvent'
+        self.row = None
+        self._matched = threading.Event()
+
+    def _key(self):
+        # Every caller waits on its own event
+        return (self.__class__, id(self))
+
+    def run(self, event, row, old):
+        self.row = row
+        self._matched.set()
+
+    def wait(self, timeout=None):
+        """Block until the event matches
+
+        :returns: Whether the event matched before the timeout
+        """
+        return self._matched.wait(timeout)
+
+
+class RowEventHandler(object):
+    """Runs the watched row events in the thread notifying them
+
+    The events must be quick, as they hold up the IDL.
+    """
+
+    def __init__(self):
+        self.__watched_events = set()
+        self.__lock = threading.Lock()
+
+    def watch_event(self, event):
+        with self.__lock:
+            self.__watched_events.add(event)
+
+    def unwatch_event(self, event):
+        with self.__lock:
+            self.__watched_events.discard(event)
+
+    def notify(self, event, row, updates=None):
+        with self.__lock:
+            matching = [t for t in self.__watched_events
+                        if t.matches(event, row, updates)]
+            for match in matching:
+                if match.ONETIME:
+                    self.__watched_events.remove(match)
+        for match in matching:
+            try:
+                match.run(event, row, updates)
+            except Exception:
+                LOG.exception(_LE('Unexpected exception in %s'),
+                              match.event_name)
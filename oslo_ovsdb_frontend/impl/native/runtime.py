@@ -0,0 +1,148 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import abc
+import sys
+import threading
+
+from oslo_utils import importutils
+import six
+
+from oslo_ovsdb_frontend._i18n import _
+
+
+@six.add_metaclass(abc.ABCMeta)
+class Runtime(object):
+    """Concurrency primitives used by the notification pipeline
+
+    The notification queues are standard library queues, which the IDL
+    thread can feed whatever the runtime is.
+    """
+
+    name = None
+
+    @abc.abstractmethod
+    def spawn(self, func, *args):
+        """Run func(*args) concurrently with the caller"""
+
+
+class ThreadingRuntime(Runtime):
+    """Runs the workers in native threads"""
+
+    name = 'threading'
+
+    def spawn(self, func, *args):
+        thread = threading.Thread(target=func, args=args)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+
+class EventletRuntime(Runtime):
+    """Runs the workers in green threads
+
+    This requires the thread module to be monkey patched, as the queues
+    are shared with the IDL thread.
+    """
+
+    name = 'eventlet'
+
+    def __init__(self):
+        self._greenthread = importutils.import_module('eventlet.greenthread')
+
+    def spawn(self, func, *args):
+        return self._greenthread.spawn_n(func, *args)
+
+
+class AsyncioRuntime(ThreadingRuntime):
+    """Runs the workers alongside an asyncio event loop
+
+    The workers block on queues for as long as the pipeline runs, so each
+    of them gets its own native thread rather than a thread of the shared
+    executor of the loop, which they could exhaust. The loop, unless one
+    is given, is looked up when a worker is spawned and must be running.
+    Only available on Python 3.
+    """
+
+    name = 'asyncio'
+
+    def __init__(self, loop=None):
+        self._asyncio = importutils.try_import('asyncio')
+        if self._asyncio is None:
+            raise RuntimeError(_("The asyncio runtime requires Python 3"))
+        self._futures = importutils.import_module('concurrent.futures')
+        self.loop = loop
+
+    def spawn(self, func, *args):
+        """Start func(*args) from the running loop
+
+        :returns: a concurrent.futures.Future holding the result or the
+                  exception of func, which callers can wait for
+        """
+        loop = self._running_loop()
+        future = self._futures.Future()
+        loop.call_soon_threadsafe(self._start, future, func, args)
+        return future
+
+    def _running_loop(self):
+        loop = self.loop
+        if loop is None:
+            try:
+                loop = self._asyncio.get_event_loop()
+            except RuntimeError:
+                # No loop is set for the calling thread
+                pass
+        if loop is None or not loop.is_running():
+            raise RuntimeError(_("The asyncio runtime requires a running "
+                                 "event loop"))
+        return loop
+
+    def _start(self, future, func, args):
+        super(AsyncioRuntime, self).spawn(self._run, future, func, args)
+
+    @staticmethod
+    def _run(future, func, args):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            result = func(*args)
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+
+def _eventlet_patched():
+    # Only look at eventlet if the service already imported it
+    patcher = sys.modules.get('eventlet.patcher')
+    return bool(patcher and patcher.is_monkey_patched('thread'))
+
+
+_RUNTIMES = {
+    'threading': ThreadingRuntime,
+    'eventlet': EventletRuntime,
+}
+if six.PY3:
+    _RUNTIMES['asyncio'] = AsyncioRuntime
+
+
+def get_runtime(name='auto'):
+    """Return a runtime by name
+
+    'auto' picks eventlet when the thread module is monkey patched and
+    native threads otherwise, never asyncio which needs a running loop.
+    """
+    if name == 'auto':
+        name = 'eventlet' if _eventlet_patched() else 'threading'
+    if name not in _RUNTIMES:
+        raise RuntimeError(_("Unsupported runtime %s") % name)
+    return _RUNTIMES[name]()
@@ -0,0 +1,196 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import hashlib
+import threading
+import uuid
+
+from oslo_serialization import jsonutils
+
+from oslo_ovsdb_frontend._i18n import _
+from oslo_ovsdb_frontend.impl.native import row_event
+from oslo_ovsdb_frontend.impl import utils
+
+DEFAULT_BUCKETS = 256
+# The digests are 64 bits sums of the 64 bits digests of the rows
+_MODULUS = 2 ** 64
+
+
+def _reference(value):
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if hasattr(value, 'uuid') and hasattr(value, '_table'):
+        return str(value.uuid)
+    return value
+
+
+def _normalize(value):
+    # Sets are unordered and references are compared by UUID, so that
+    # digests computed from the IDL and from plain values agree.
+    return utils.freeze(value, unordered=True, convert=_reference)
+
+
+def _hash(value):
+    data = jsonutils.dumps(value, sort_keys=True, separators=(',', ':'))
+    return int(hashlib.sha1(data.encode('utf-8')).hexdigest()[:16], 16)
+
+
+def bucket_of(key, buckets=DEFAULT_BUCKETS):
+    """Return the bucket of the row with the given key value"""
+    return _hash(_normalize(key)) % buckets
+
+
+def row_digest(key, values):
+    """Return the digest of a row
+
+    :param key:    The value of the key column of the row
+    :param values: The values of the digested columns, in column order
+    """
+    return _hash([_normalize(key)] + [_normalize(v) for v in values])
+
+
+class _DigestEvent(row_event.RowEvent):
+    def __init__(self, digest):
+        super(_DigestEvent, self).__init__(
+            (self.ROW_CREATE, self.ROW_UPDATE, self.ROW_DELETE),
+            digest.table, None,
+            update_columns=(digest.key_column,) + digest.columns)
+        self.event_name = 'TableDigest%sEvent' % digest.table
+        self.digest = digest
+
+    def _key(self):
+        return (self.__class__, id(self.digest))
+
+    def run(self, event, row, old):
+        if event == self.ROW_DELETE:
+            self.digest.remove(row.uuid)
+        else:
+            self.digest.add_row(row)
+
+
+class TableDigest(object):
+    """Rolling digests of a table, per bucket of rows
+
+    Each row gets a digest of its key column and of the digested columns,
+    and is put in a bucket according to its key. The digest of a bucket is
+    the sum modulo 2**64 of the digests of its rows and the digest of the
+    table the sum of the bucket digests, so that they are updated in
+    constant time when a row changes. Unlike a XOR, a sum does not cancel
+    out the digests of identical rows.
+
+    Comparing the digests with ones computed from another source of the
+    same rows, with from_values, costs O(buckets) and narrows any drift
+    down to the buckets to check row by row.
+    """
+
+    def __init__(self, table, key_column, columns, buckets=DEFAULT_BUCKETS):
+        self.table = table
+        self.key_column = key_column
+        self.columns = tuple(columns)
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._digests = [0] * buckets
+        # row id -> (key, bucket, row digest)
+        self._rows = {}
+        # bucket -> set of row ids
+        self._bucket_rows = collections.defaultdict(set)
+
+    @classmethod
+    def from_values(cls, table, key_column, columns, rows,
+                    buckets=DEFAULT_BUCKETS):
+        """Compute the digests of rows given as dictionaries
+
+        :param rows: The rows, as dictionaries of the key column and the
+                     digested columns values
+        :type rows:  iterable of dictionaries
+        """
+        digest = cls(table, key_column, columns, buckets)
+        for row in rows:
+            key = row[key_column]
+            digest.add(key, key, [row[col] for col in digest.columns])
+        return digest
+
+    def start(self, idl):
+        """Maintain the digests from the IDL notifications"""
+        idl.wait_handler.watch_event(_DigestEvent(self))
+        # The IDL may be updated meanwhile, adding a row twice is harmless
+        for row in list(idl.tables[self.table].rows.values()):
+            self.add_row(row)
+
+    def add(self, row_id, key, values):
+        """Add or replace a row
+
+        :param row_id: The identifier of the row, e.g. its UUID
+        :param key:    The value of the key column
+        :param values: The values of the digested columns, in column order
+        """
+        bucket = bucket_of(key, self.buckets)
+        digest = row_digest(key, values)
+        with self._lock:
+            self._remove(row_id)
+            self._rows[row_id] = (key, bucket, digest)
+            self._bucket_rows[bucket].add(row_id)
+            self._digests[bucket] = (self._digests[bucket] + digest) % _MODULUS
+
+    def add_row(self, row):
+        self.add(row.uuid, getattr(row, self.key_column),
+                 [getattr(row, col) for col in self.columns])
+
+    def _remove(self, row_id):
+        entry = self._rows.pop(row_id, None)
+        if entry is None:
+            return
+        _key, bucket, digest = entry
+        self._digests[bucket] = (self._digests[bucket] - digest) % _MODULUS
+        self._bucket_rows[bucket].discard(row_id)
+        if not self._bucket_rows[bucket]:
+            del self._bucket_rows[bucket]
+
+    def remove(self, row_id):
+        with self._lock:
+            self._remove(row_id)
+
+    def digest(self):
+        """Return the digest of the whole table"""
+        with self._lock:
+            return sum(self._digests) % _MODULUS
+
+    def bucket_digests(self):
+        with self._lock:
+            return list(self._digests)
+
+    def bucket_keys(self, bucket):
+        """Return the keys of the rows of a bucket"""
+        with self._lock:
+            return set(self._rows[row_id][0]
+                       for row_id in self._bucket_rows.get(bucket, ()))
+
+    def compare(self, other):
+        """Return the buckets whose digest differ from the other digests
+
+        :param other: The digests of the same rows from another source
+        :type other:  :class:`TableDigest` or list of bucket digests
+        :returns:     The sorted list of the differing buckets
+        """
+        if isinstance(other, TableDigest):
+            if (other.buckets != self.buckets or
+                    other.columns != self.columns or
+                    other.key_column != self.key_column):
+                raise RuntimeError(_("Digests of different columns or "
+                                     "buckets"))
+            other = other.bucket_digests()
+        if len(other) != self.buckets:
+            raise RuntimeError(_("Digests of different buckets"))
+        return [bucket for bucket, (mine, theirs) in
+                enumerate(zip(self.bucket_digests(), other))
+                if mine != theirs]
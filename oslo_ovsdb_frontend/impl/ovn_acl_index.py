@@ -0,0 +1,171 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+
+from oslo_ovsdb_frontend.impl.native import row_event
+
+LPORT_EXT_ID_KEY = 'neutron:lport'
+_ALL_EVENTS = (row_event.RowEvent.ROW_CREATE,
+               row_event.RowEvent.ROW_UPDATE,
+               row_event.RowEvent.ROW_DELETE)
+
+
+def _uuids(row, column):
+    # Read the referenced UUIDs without resolving them, the referenced rows
+    # may not be in the IDL yet while an update is being processed.
+    datum = row._data.get(column)
+    if datum is None:
+        return []
+    return datum.to_python(lambda atom, base: atom)
+
+
+class _IndexEvent(row_event.RowEvent):
+    def __init__(self, index, table, handler):
+        super(_IndexEvent, self).__init__(_ALL_EVENTS, table, None)
+        self.event_name = 'AclIndex%sEvent' % table
+        self.index = index
+        self.handler = handler
+
+    def _key(self):
+        return (self.__class__, id(self.index), self.table)
+
+    def run(self, event, row, old):
+        self.handler(event, row, old)
+
+
+class AclIndex(object):
+    """ACLs of the logical switches indexed by port and by match
+
+    The index is kept up to date from the notifications of the IDL, in its
+    thread, so lookups do not walk the ACLs of the switches. The ACL values
+    are the dictionaries get_acls_for_lswitches returns: the ACL columns,
+    plus the lport and lswitch names.
+
+    The index reflects the database, not the changes pending in a
+    transaction.
+    """
+
+    def __init__(self, idl):
+        self.idl = idl
+        self._lock = threading.Lock()
+        # switch uuid -> (switch name, set of acl uuids)
+        self._switches = {}
+        # switch name -> switch uuid
+        self._switch_by_name = {}
+        # acl uuid -> switch uuid
+        self._acl_switch = {}
+        # acl uuid -> (switch name, lport, match, acl value)
+        self._acls = {}
+        # (switch name, lport) -> set of acl uuids
+        self._by_port = {}
+        # (switch name, match) -> set of acl uuids
+        self._by_match = {}
+
+    def start(self):
+        """Watch the IDL notifications and index its current content"""
+        for table, handler in (('Logical_Switch', self._switch_changed),
+                               ('ACL', self._acl_changed)):
+            self.idl.wait_handler.watch_event(
+                _IndexEvent(self, table, handler))
+        # The IDL may be updated meanwhile, indexing a row twice is harmless
+        for row in list(self.idl.tables['Logical_Switch'].rows.values()):
+            self._switch_changed(row_event.RowEvent.ROW_CREATE, row, None)
+
+    def _unindex_acl(self, acl_uuid):
+        entry = self._acls.pop(acl_uuid, None)
+        if entry is None:
+            return
+        switch_name, lport, match, _value = entry
+        for index, key in ((self._by_port, (switch_name, lport)),
+                           (self._by_match, (switch_name, match))):
+            uuids = index.get(key)
+            if uuids is not None:
+                uuids.discard(acl_uuid)
+                if not uuids:
+                    del index[key]
+
+    def _index_acl(self, acl_uuid):
+        self._unindex_acl(acl_uuid)
+        switch_uuid = self._acl_switch.get(acl_uuid)
+        acl = self.idl.tables['ACL'].rows.get(acl_uuid)
+        if switch_uuid is None or acl is None:
+            return
+        switch_name = self._switches[switch_uuid][0]
+        lport = getattr(acl, 'external_ids', {}).get(LPORT_EXT_ID_KEY)
+        value = {'lport': lport, 'lswitch': switch_name}
+        for column in acl._data:
+            try:
+                value[column] = getattr(acl, column)
+            except AttributeError:
+                pass
+        self._acls[acl_uuid] = (switch_name, lport, value.get('match'),
+                                value)
+        self._by_port.setdefault((switch_name, lport), set()).add(acl_uuid)
+        self._by_match.setdefault((switch_name, value.get('match')),
+                                  set()).add(acl_uuid)
+
+    def _switch_changed(self, event, row, old):
+        with self._lock:
+            name, acls = self._switches.pop(row.uuid, (None, set()))
+            if self._switch_by_name.get(name) == row.uuid:
+                del self._switch_by_name[name]
+            new_acls = set()
+            if event != row_event.RowEvent.ROW_DELETE:
+                new_acls = set(_uuids(row, 'acls'))
+                self._switches[row.uuid] = (row.name, new_acls)
+                self._switch_by_name[row.name] = row.uuid
+            for acl_uuid in acls - new_acls:
+                self._acl_switch.pop(acl_uuid, None)
+                self._unindex_acl(acl_uuid)
+            # Reindex all the ACLs when the switch is renamed
+            changed = new_acls if name != row.name else new_acls - acls
+            for acl_uuid in changed:
+                self._acl_switch[acl_uuid] = row.uuid
+                self._index_acl(acl_uuid)
+
+    def _acl_changed(self, event, row, old):
+        with self._lock:
+            if event == row_event.RowEvent.ROW_DELETE:
+                self._unindex_acl(row.uuid)
+            else:
+                self._index_acl(row.uuid)
+
+    def get_switch_uuid(self, switch_name):
+        """Return the UUID of the named logical switch, or None"""
+        with self._lock:
+            return self._switch_by_name.get(switch_name)
+
+    def get_port_acls(self, switch_name, lport):
+        """Return {acl uuid: acl value} for the ACLs of a port"""
+        with self._lock:
+            return dict((acl_uuid, dict(self._acls[acl_uuid][3]))
+                        for acl_uuid in self._by_port.get((switch_name, lport),
+                                                          ()))
+
+    def get_switch_acls(self, switch_name):
+        """Return {acl uuid: acl value} for the ACLs of a switch"""
+        with self._lock:
+            switch_uuid = self._switch_by_name.get(switch_name)
+            if switch_uuid is None:
+                return {}
+            acls = self._switches[switch_uuid][1]
+            return dict((acl_uuid, dict(self._acls[acl_uuid][3]))
+                        for acl_uuid in acls if acl_uuid in self._acls)
+
+    def get_match_acls(self, switch_name, matches):
+        """Return the UUIDs of the ACLs of a switch with one of the matches"""
+        with self._lock:
+            result = set()
+            for match in matches:
+                result.update(self._by_match.get((switch_name, match), ()))
+            return result
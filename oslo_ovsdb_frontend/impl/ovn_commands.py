@@ -10,6 +10,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+
 import six
 
 
@@ -59,6 +61,27 @@ class DelLSwitchCommand(BaseCommand):
         self.api._tables['Logical_Switch'].rows[lswitch.uuid].delete()
 
 
+class SetLSwitchCommand(BaseCommand):
+    def __init__(self, api, name, if_exists, **columns):
+        super(SetLSwitchCommand, self).__init__(api)
+        self.name = name
+        self.columns = columns
+        self.if_exists = if_exists
+
+    def run_idl(self, txn):
+        try:
+            lswitch = idlutils.row_by_value(self.api.idl, 'Logical_Switch',
+                                            'name', self.name)
+        except idlutils.RowNotFound:
+            if self.if_exists:
+                return
+            msg = _("Logical Switch %s does not exist") % self.name
+            raise RuntimeError(msg)
+
+        for col, val in self.columns.items():
+            setattr(lswitch, col, val)
+
+
 class LSwitchSetExternalIdCommand(BaseCommand):
     def __init__(self, api, name, field, value, if_exists):
         super(LSwitchSetExternalIdCommand, self).__init__(api)
@@ -78,11 +101,7 @@ class LSwitchSetExternalIdCommand(BaseCommand):
             msg = _("Logical Switch %s does not exist") % self.name
             raise RuntimeError(msg)
 
-        lswitch.verify('external_ids')
-
-        external_ids = getattr(lswitch, 'external_ids', {})
-        external_ids[self.field] = self.value
-        lswitch.external_ids = external_ids
+        idlutils.set_map_key(lswitch, 'external_ids', self.field, self.value)
 
 
 class AddLogicalPortCommand(BaseCommand):
@@ -97,7 +116,6 @@ class AddLogicalPortCommand(BaseCommand):
         try:
             lswitch = idlutils.row_by_value(self.api.idl, 'Logical_Switch',
                                             'name', self.lswitch)
-            ports = getattr(lswitch, 'ports', [])
         except idlutils.RowNotFound:
             msg = _("Logical Switch %s does not exist") % self.lswitch
             raise RuntimeError(msg)
@@ -108,15 +126,51 @@ class AddLogicalPortCommand(BaseCommand):
             if port:
                 return
 
-        lswitch.verify('ports')
-
         port = txn.insert(self.api._tables['Logical_Port'])
         port.name = self.lport
         for col, val in self.columns.items():
             setattr(port, col, val)
         # add the newly created port to existing lswitch
-        ports.append(port.uuid)
-        setattr(lswitch, 'ports', ports)
+        idlutils.add_to_set(lswitch, 'ports', port.uuid)
+
+
+class AddLogicalPortsCommand(BaseCommand):
+    def __init__(self, api, lswitch, lports, may_exist):
+        super(AddLogicalPortsCommand, self).__init__(api)
+        self.lswitch = lswitch
+        self.lports = lports
+        self.may_exist = may_exist
+
+    def run_idl(self, txn):
+        try:
+            lswitch = idlutils.row_by_value(self.api.idl, 'Logical_Switch',
+                                            'name', self.lswitch)
+        except idlutils.RowNotFound:
+            msg = _("Logical Switch %s does not exist") % self.lswitch
+            raise RuntimeError(msg)
+        existing = set()
+        if self.may_exist:
+            existing = set(port.name for port in
+                           self.api._tables['Logical_Port'].rows.values())
+
+        new_ports = []
+        for lport, columns in self.lports:
+            if lport in existing:
+                if self.may_exist:
+                    continue
+                msg = _("Logical Port %s is given more than once") % lport
+                raise RuntimeError(msg)
+            existing.add(lport)
+            port = txn.insert(self.api._tables['Logical_Port'])
+            port.name = lport
+            for col, val in columns.items():
+                setattr(port, col, val)
+            new_ports.append(port.uuid)
+        if not new_ports:
+            return
+
+        # add all the newly created ports to the lswitch at once
+        idlutils.add_to_set(lswitch, 'ports', *new_ports)
 
 
 class SetLogicalPortCommand(BaseCommand):
@@ -151,20 +205,53 @@ class DelLogicalPortCommand(BaseCommand):
         try:
             lport = idlutils.row_by_value(self.api.idl, 'Logical_Port',
                                           'name', self.lport)
+            if self.lswitch is not None:
+                lswitch = idlutils.row_by_value(self.api.idl,
+                                                'Logical_Switch',
+                                                'name', self.lswitch)
+        except idlutils.RowNotFound:
+            if self.if_exists:
+                return
+            msg = _("Port %s does not exist") % self.lport
+            raise RuntimeError(msg)
+
+        # Without lswitch, the port is not referenced by any lswitch
+        if self.lswitch is not None:
+            idlutils.remove_from_set(lswitch, 'ports', lport)
+        self.api._tables['Logical_Port'].rows[lport.uuid].delete()
+
+
+class DelLogicalPortsCommand(BaseCommand):
+    def __init__(self, api, lswitch, lports, if_exists):
+        super(DelLogicalPortsCommand, self).__init__(api)
+        self.lswitch = lswitch
+        self.lports = lports
+        self.if_exists = if_exists
+
+    def run_idl(self, txn):
+        try:
             lswitch = idlutils.row_by_value(self.api.idl, 'Logical_Switch',
                                             'name', self.lswitch)
             ports = getattr(lswitch, 'ports', [])
         except idlutils.RowNotFound:
             if self.if_exists:
                 return
-            msg = _("Port %s does not exist") % self.lport
+            msg = _("Logical Switch %s does not exist") % self.lswitch
             raise RuntimeError(msg)
 
-        lswitch.verify('ports')
+        names = set(self.lports)
+        deleted = [port for port in ports if port.name in names]
+        if not self.if_exists and len(deleted) < len(names):
+            missing = names - set(port.name for port in deleted)
+            msg = _("Ports %s do not exist") % ", ".join(sorted(missing))
+            raise RuntimeError(msg)
+        if not deleted:
+            return
 
-        ports.remove(lport)
-        setattr(lswitch, 'ports', ports)
-        self.api._tables['Logical_Port'].rows[lport.uuid].delete()
+        # remove all the ports from the lswitch at once
+        idlutils.remove_from_set(lswitch, 'ports', *deleted)
+        for port in deleted:
+            self.api._tables['Logical_Port'].rows[port.uuid].delete()
 
 
 class AddLRouterCommand(BaseCommand):
@@ -255,11 +342,7 @@ class AddLRouterPortCommand(BaseCommand):
             lrouter_port.name = self.name
             for col, val in self.columns.items():
                 setattr(lrouter_port, col, val)
-            lrouter.verify('ports')
-            lrouter_ports = getattr(lrouter, 'ports', [])
-            if lrouter_port not in lrouter_ports:
-                lrouter_ports.append(lrouter_port)
-                setattr(lrouter, 'ports', lrouter_ports)
+            idlutils.add_to_set(lrouter, 'ports', lrouter_port)
 
 
 class DelLRouterPortCommand(BaseCommand):
@@ -286,11 +369,7 @@ class DelLRouterPortCommand(BaseCommand):
             msg = _("Logical Router %s does not exist") % self.lrouter
             raise RuntimeError(msg)
 
-        lrouter.verify('ports')
-        lrouter_ports = getattr(lrouter, 'ports', [])
-        if (lrouter_port in lrouter_ports):
-            lrouter_ports.remove(lrouter_port)
-            setattr(lrouter, 'ports', lrouter_ports)
+        idlutils.remove_from_set(lrouter, 'ports', lrouter_port)
 
 
 class SetLRouterPortInLPortCommand(BaseCommand):
@@ -331,10 +410,7 @@ class AddACLCommand(BaseCommand):
         for col, val in self.columns.items():
             setattr(row, col, val)
         row.external_ids = {'neutron:lport': self.lport}
-        lswitch.verify('acls')
-        acls = getattr(lswitch, 'acls', [])
-        acls.append(row.uuid)
-        setattr(lswitch, 'acls', acls)
+        idlutils.add_to_set(lswitch, 'acls', row.uuid)
 
 
 class DelACLCommand(BaseCommand):
@@ -345,27 +421,32 @@ class DelACLCommand(BaseCommand):
         self.if_exists = if_exists
 
     def run_idl(self, txn):
-        try:
-            lswitch = idlutils.row_by_value(self.api.idl, 'Logical_Switch',
-                                            'name', self.lswitch)
-        except idlutils.RowNotFound:
+        lswitch = self.api._get_lswitch(self.lswitch)
+        if lswitch is None:
             if self.if_exists:
                 return
             msg = _("Logical Switch %s does not exist") % self.lswitch
             raise RuntimeError(msg)
 
-        lswitch.verify('acls')
-
-        acls_to_del = []
-        acls = getattr(lswitch, 'acls', [])
-        for acl in acls:
-            ext_ids = getattr(acl, 'external_ids', {})
-            if ext_ids.get('neutron:lport') == self.lport:
-                acls_to_del.append(acl)
+        if idlutils.has_pending_change(lswitch, 'acls'):
+            # The ACL index does not know about this transaction
+            acls_to_del = []
+            acls = getattr(lswitch, 'acls', [])
+            for acl in acls:
+                ext_ids = getattr(acl, 'external_ids', {})
+                if ext_ids.get('neutron:lport') == self.lport:
+                    acls_to_del.append(acl)
+        else:
+            acl_rows = self.api._tables['ACL'].rows
+            acls_to_del = [
+                acl_rows[acl_uuid] for acl_uuid in
+                self.api.acl_index.get_port_acls(self.lswitch, self.lport)
+                if acl_uuid in acl_rows]
+        if not acls_to_del:
+            return
+        idlutils.remove_from_set(lswitch, 'acls', *acls_to_del)
         for acl in acls_to_del:
-            acls.remove(acl)
             acl.delete()
-        setattr(lswitch, 'acls', acls)
 
 
 class UpdateACLsCommand(BaseCommand):
@@ -393,32 +474,22 @@ class UpdateACLsCommand(BaseCommand):
         self.need_compare = need_compare
         self.is_add_acl = is_add_acl
 
-    def _acl_list_sub(self, acl_list1, acl_list2):
-        """Compute the elements in acl_list1 but not in acl_list2.
-
-        If acl_list1 and acl_list2 were sets, the result of this routine
-        could be thought of as acl_list1 - acl_list2. Note that acl_list1
-        and acl_list2 cannot actually be sets as they contain dictionary
-        items i.e. set([{'a':1}) doesn't work.
-        """
-        acl_diff = []
-        for acl in acl_list1:
-            if acl not in acl_list2:
-                acl_diff.append(acl)
-        return acl_diff
-
     def _compute_acl_differences(self, port_list, acl_old_values_dict,
                                  acl_new_values_dict, acl_obj_dict):
         """Compute the difference between the new and old sets of acls
 
+        The acls are compared through their utils.acl_key, as sets gathered
+        across all the ports of each lswitch, so the cost is linear in the
+        number of acls.
+
         @param port_list: Iterator of a List of ports
         @type port_list: []
         @param acl_old_values_dict: Dictionary of old acl values indexed
                                     by port id
         @param acl_new_values_dict: Dictionary of new acl values indexed
                                     by port id
-        @param acl_obj_dict: Dictionary of acl objects indexed by the acl
-                             value in string format.
+        @param acl_obj_dict: Dictionary of acl objects indexed by the
+                             utils.acl_key of the acl value.
         @var acl_del_objs_dict: Dictionary of acl objects to be deleted
                                 indexed by the lswitch.
         @var acl_add_values_dict: Dictionary of acl values to be added
@@ -427,43 +498,51 @@ class UpdateACLsCommand(BaseCommand):
         @rtype: ({}, {})
         """
 
-        acl_del_objs_dict = {}
-        acl_add_values_dict = {}
+        old_keys = {}
+        new_acls = {}
         for port in port_list:
             lswitch_name = port['network_id']
-            acls_old = acl_old_values_dict.get(port['id'], [])
-            acls_new = acl_new_values_dict.get(port['id'], [])
-            acls_del = self._acl_list_sub(acls_old, acls_new)
-            acls_add = self._acl_list_sub(acls_new, acls_old)
-            acl_del_objs = acl_del_objs_dict.setdefault(lswitch_name, [])
-            for acl in acls_del:
-                acl_del_objs.append(acl_obj_dict[str(acl)])
+            keys = old_keys.setdefault(lswitch_name, collections.OrderedDict())
+            for acl in acl_old_values_dict.get(port['id'], []):
+                keys[utils.acl_key(acl)] = None
+            acls = new_acls.setdefault(lswitch_name, collections.OrderedDict())
+            for acl in acl_new_values_dict.get(port['id'], []):
+                acls.setdefault(utils.acl_key(acl), acl)
+
+        acl_del_objs_dict = {}
+        acl_add_values_dict = {}
+        for lswitch_name, keys in old_keys.items():
+            acls = new_acls[lswitch_name]
+            acl_del_objs_dict[lswitch_name] = [
+                acl_obj_dict[key] for key in keys if key not in acls]
             acl_add_values = acl_add_values_dict.setdefault(lswitch_name, [])
-            for acl in acls_add:
+            for key, acl in acls.items():
+                if key in keys:
+                    continue
                 # Remove lport and lswitch columns
                 del acl['lswitch']
                 del acl['lport']
                 acl_add_values.append(acl)
         return acl_del_objs_dict, acl_add_values_dict
 
-    def _delete_acls(self, lswitch_name, acls, acls_delete):
+    def _delete_acls(self, lswitch_name, lswitch, acls_delete):
+        acls = getattr(lswitch, 'acls', [])
         for acl_delete in acls_delete:
-            try:
-                acls.remove(acl_delete)
-            except ValueError:
+            if acl_delete not in acls:
                 msg = _("Logical Switch %s missing acl") % lswitch_name
                 raise RuntimeError(msg)
+        idlutils.remove_from_set(lswitch, 'acls', *acls_delete)
+        for acl_delete in acls_delete:
             acl_delete.delete()
 
-    def _add_acls(self, txn, acls, acl_values):
+    def _add_acls(self, txn, lswitch, acl_values):
         rows = []
         for acl_value in acl_values:
             row = txn.insert(self.api._tables['ACL'])
             for col, val in acl_value.items():
                 setattr(row, col, val)
-            rows.append(row)
-        for row in rows:
-            acls.append(row.uuid)
+            rows.append(row.uuid)
+        idlutils.add_to_set(lswitch, 'acls', *rows)
 
     def _get_update_data_without_compare(self):
         lswitch_ovsdb_dict = {}
@@ -487,14 +566,22 @@ class UpdateACLsCommand(BaseCommand):
             del_acl_matches = []
             for acl_dict in self.acl_new_values_dict.values():
                 del_acl_matches.append(acl_dict['match'])
+            acl_rows = self.api._tables['ACL'].rows
             for switch_name, lswitch in six.iteritems(lswitch_ovsdb_dict):
                 if switch_name not in acl_del_objs_dict:
                     acl_del_objs_dict[switch_name] = []
-                lswitch.verify('acls')
-                acls = getattr(lswitch, 'acls', [])
-                for acl in acls:
-                    if getattr(acl, 'match') in del_acl_matches:
-                        acl_del_objs_dict[switch_name].append(acl)
+                if idlutils.has_pending_change(lswitch, 'acls'):
+                    # The ACL index does not know about this transaction
+                    acls = getattr(lswitch, 'acls', [])
+                    for acl in acls:
+                        if getattr(acl, 'match') in del_acl_matches:
+                            acl_del_objs_dict[switch_name].append(acl)
+                    continue
+                for acl_uuid in self.api.acl_index.get_match_acls(
+                        switch_name, del_acl_matches):
+                    if acl_uuid in acl_rows:
+                        acl_del_objs_dict[switch_name].append(
+                            acl_rows[acl_uuid])
         return lswitch_ovsdb_dict, acl_del_objs_dict, acl_add_values_dict
 
     def run_idl(self, txn):
@@ -514,17 +601,104 @@ class UpdateACLsCommand(BaseCommand):
                 self._get_update_data_without_compare()
 
         for lswitch_name, lswitch in six.iteritems(lswitch_ovsdb_dict):
-            lswitch.verify('acls')
-            acls = getattr(lswitch, 'acls', [])
-
             # Delete ACLs
             acl_del_objs = acl_del_objs_dict.get(lswitch_name, [])
             if acl_del_objs:
-                self._delete_acls(lswitch_name, acls, acl_del_objs)
+                self._delete_acls(lswitch_name, lswitch, acl_del_objs)
 
             # Add new ACLs
             acl_add_values = acl_add_values_dict.get(lswitch_name, [])
             if acl_add_values:
-                self._add_acls(txn, acls, acl_add_values)
+                self._add_acls(txn, lswitch, acl_add_values)
+
 
-            setattr(lswitch, 'acls', acls)
+class AddAddrSetCommand(BaseCommand):
+    def __init__(self, api, name, may_exist, **columns):
+        super(AddAddrSetCommand, self).__init__(api)
+        self.name = name
+        self.columns = columns
+        self.may_exist = may_exist
+
+    def run_idl(self, txn):
+        if self.may_exist:
+            addrset = idlutils.row_by_value(self.api.idl, 'Address_Set',
+                                            'name', self.name, None)
+            if addrset:
+                return
+        row = txn.insert(self.api._tables['Address_Set'])
+        row.name = self.name
+        for col, val in self.columns.items():
+            setattr(row, col, val)
+
+
+class AddAddrSetsCommand(BaseCommand):
+    def __init__(self, api, addrsets, may_exist):
+        super(AddAddrSetsCommand, self).__init__(api)
+        self.addrsets = addrsets
+        self.may_exist = may_exist
+
+    def run_idl(self, txn):
+        existing = set()
+        if self.may_exist:
+            existing = set(row.name for row in
+                           self.api._tables['Address_Set'].rows.values())
+        for name, columns in self.addrsets:
+            if name in existing:
+                continue
+            existing.add(name)
+            row = txn.insert(self.api._tables['Address_Set'])
+            row.name = name
+            for col, val in columns.items():
+                setattr(row, col, val)
+
+
+class DelAddrSetCommand(BaseCommand):
+    def __init__(self, api, name, if_exists):
+        super(DelAddrSetCommand, self).__init__(api)
+        self.name = name
+        self.if_exists = if_exists
+
+    def run_idl(self, txn):
+        try:
+            addrset = idlutils.row_by_value(self.api.idl, 'Address_Set',
+                                            'name', self.name)
+        except idlutils.RowNotFound:
+            if self.if_exists:
+                return
+            msg = _("Address set %s does not exist") % self.name
+            raise RuntimeError(msg)
+
+        self.api._tables['Address_Set'].rows[addrset.uuid].delete()
+
+
+class UpdateAddrSetsCommand(BaseCommand):
+    def __init__(self, api, updates, if_exists):
+        """Add and remove addresses of address sets
+
+        @param updates: Dictionary of (addresses to add, addresses to
+                        remove) indexed by address set name
+        @type updates: {}
+        @param if_exists: Do not fail if an address set does not exist
+        @type if_exists: Boolean.
+        """
+        super(UpdateAddrSetsCommand, self).__init__(api)
+        self.updates = updates
+        self.if_exists = if_exists
+
+    def run_idl(self, txn):
+        addrsets = dict((row.name, row) for row in
+                        self.api._tables['Address_Set'].rows.values()
+                        if row.name in self.updates)
+        for name, (addrs_add, addrs_remove) in six.iteritems(self.updates):
+            addrset = addrsets.get(name)
+            if addrset is None:
+                if self.if_exists:
+                    continue
+                msg = _("Address set %s does not exist") % name
+                raise RuntimeError(msg)
+            # Membership changes are sent as mutations when possible, so
+            # they do not carry nor conflict on the whole address set.
+            if addrs_remove:
+                idlutils.remove_from_set(addrset, 'addresses', *addrs_remove)
+            if addrs_add:
+                idlutils.add_to_set(addrset, 'addresses', *addrs_add)
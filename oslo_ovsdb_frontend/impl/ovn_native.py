@@ -15,8 +15,11 @@ import six
 from oslo_ovsdb_frontend._i18n import _
 from oslo_ovsdb_frontend.api import ovn as ovn_api
 from oslo_ovsdb_frontend import config as cfg
+from oslo_ovsdb_frontend.impl.native import commands as ovs_cmd
 from oslo_ovsdb_frontend.impl.native import connection
 from oslo_ovsdb_frontend.impl.native import idlutils
+from oslo_ovsdb_frontend.impl.native import table_digest
+from oslo_ovsdb_frontend.impl import ovn_acl_index
 from oslo_ovsdb_frontend.impl import ovn_commands as cmd
 from oslo_ovsdb_frontend.impl import ovs_native
 from oslo_ovsdb_frontend.impl import ovsdb_monitor
@@ -29,6 +32,7 @@ OVN_PORT_NAME_EXT_ID_KEY = 'neutron:port_name'
 class OvsdbOvnIdl(ovn_api.API):
 
     ovsdb_connection = None
+    acl_index = None
 
     def __init__(self, event_callbacks=None):
         super(OvsdbOvnIdl, self).__init__()
@@ -47,6 +51,9 @@ class OvsdbOvnIdl(ovn_api.API):
         else:
             OvsdbOvnIdl.ovsdb_connection.start()
         self.idl = OvsdbOvnIdl.ovsdb_connection.idl
+        if OvsdbOvnIdl.acl_index is None:
+            OvsdbOvnIdl.acl_index = ovn_acl_index.AclIndex(self.idl)
+            OvsdbOvnIdl.acl_index.start()
         self.ovsdb_timeout = cfg.get_ovn_ovsdb_timeout()
 
     @property
@@ -59,6 +66,31 @@ class OvsdbOvnIdl(ovn_api.API):
                                       self.ovsdb_timeout,
                                       check_error, log_errors)
 
+    def wait_for(self, table, conditions=None, events=None, timeout=None):
+        """Block until a row of the table matches the conditions
+
+        See :meth:`connection.Connection.wait_for`, the timeout defaults to
+        the OVN NB OVSDB timeout.
+        """
+        if timeout is None:
+            timeout = self.ovsdb_timeout
+        return OvsdbOvnIdl.ovsdb_connection.wait_for(table, conditions,
+                                                     events, timeout)
+
+    def table_digest(self, table, key_column, columns,
+                     buckets=table_digest.DEFAULT_BUCKETS):
+        """Return the rolling digests of the columns of a table
+
+        See :meth:`connection.Connection.table_digest`. Compare them with
+        the digests of the expected rows, built with
+        table_digest.TableDigest.from_values, to check for drift.
+        """
+        return OvsdbOvnIdl.ovsdb_connection.table_digest(table, key_column,
+                                                         columns, buckets)
+
+    def prepare(self, template):
+        return ovs_cmd.PreparedDbCommand(self, template)
+
     def create_lswitch(self, lswitch_name, may_exist=True, **columns):
         return cmd.AddLSwitchCommand(self, lswitch_name,
                                      may_exist, **columns)
@@ -70,6 +102,10 @@ class OvsdbOvnIdl(ovn_api.API):
             raise RuntimeError(_("Currently only supports delete "
                                  "by lswitch-name"))
 
+    def set_lswitch(self, lswitch_name, if_exists=True, **columns):
+        return cmd.SetLSwitchCommand(self, lswitch_name, if_exists,
+                                     **columns)
+
     def set_lswitch_ext_id(self, lswitch_id, ext_id, if_exists=True):
         return cmd.LSwitchSetExternalIdCommand(self, lswitch_id,
                                                ext_id[0], ext_id[1],
@@ -80,6 +116,10 @@ class OvsdbOvnIdl(ovn_api.API):
         return cmd.AddLogicalPortCommand(self, lport_name, lswitch_name,
                                          may_exist, **columns)
 
+    def create_lports(self, lswitch_name, lports, may_exist=True):
+        return cmd.AddLogicalPortsCommand(self, lswitch_name, lports,
+                                          may_exist)
+
     def set_lport(self, lport_name, if_exists=True, **columns):
         return cmd.SetLogicalPortCommand(self, lport_name,
                                          if_exists, **columns)
@@ -93,6 +133,10 @@ class OvsdbOvnIdl(ovn_api.API):
             raise RuntimeError(_("Currently only supports "
                                  "delete by lport-name"))
 
+    def delete_lports(self, lswitch_name, lport_names, if_exists=True):
+        return cmd.DelLogicalPortsCommand(self, lswitch_name, lport_names,
+                                          if_exists)
+
     def get_all_logical_switches_ids(self):
         result = {}
         for row in self._tables['Logical_Switch'].rows.values():
@@ -129,6 +173,48 @@ class OvsdbOvnIdl(ovn_api.API):
                            'ports': ports})
         return result
 
+    def _get_lswitch(self, lswitch_name):
+        """Return the named lswitch row, or None
+
+        The lswitch is looked up through the ACL index, or by name when it
+        is not indexed, e.g. when inserted in the transaction in progress.
+        """
+        switch_uuid = self.acl_index.get_switch_uuid(lswitch_name)
+        if switch_uuid is not None:
+            lswitch = self._tables['Logical_Switch'].rows.get(switch_uuid)
+            if lswitch is not None:
+                return lswitch
+        return idlutils.row_by_value(self.idl, 'Logical_Switch', 'name',
+                                     lswitch_name, None)
+
+    def _get_lswitch_acls(self, lswitch_name, lswitch):
+        """Return {acl row: acl value} for the ACLs of an lswitch
+
+        The ACL index reflects the database, so the ACLs are read from the
+        lswitch row when it is not indexed or when its ACLs are changed by
+        the transaction in progress.
+        """
+        if (self.acl_index.get_switch_uuid(lswitch_name) != lswitch.uuid or
+                idlutils.has_pending_change(lswitch, 'acls')):
+            columns = list(self._tables['ACL'].columns)
+            result = {}
+            for acl in getattr(lswitch, 'acls', []):
+                ext_ids = getattr(acl, 'external_ids', {})
+                acl_string = {'lport': ext_ids.get('neutron:lport'),
+                              'lswitch': lswitch_name}
+                for column in columns:
+                    try:
+                        acl_string[column] = getattr(acl, column)
+                    except AttributeError:
+                        pass
+                result[acl] = acl_string
+            return result
+        acl_rows = self._tables['ACL'].rows
+        return dict((acl_rows[acl_uuid], acl_string)
+                    for acl_uuid, acl_string in six.iteritems(
+                        self.acl_index.get_switch_acls(lswitch_name))
+                    if acl_uuid in acl_rows)
+
     def get_acls_for_lswitches(self, lswitch_names):
         """Get the existing set of acls that belong to the logical switches
 
@@ -137,8 +223,9 @@ class OvsdbOvnIdl(ovn_api.API):
         @var acl_values_dict: A dictionary indexed by port_id containing the
                               list of acl values in string format that belong
                               to that port
-        @var acl_obj_dict: A dictionary indexed by acl value containing the
-                           corresponding acl idl object.
+        @var acl_obj_dict: A dictionary indexed by the utils.acl_key of the
+                           acl values containing the corresponding acl idl
+                           object.
         @var lswitch_ovsdb_dict: A dictionary mapping from logical switch
                                  name to lswitch idl object
         @return: (acl_values_dict, acl_obj_dict, lswitch_ovsdb_dict)
@@ -147,34 +234,21 @@ class OvsdbOvnIdl(ovn_api.API):
         acl_obj_dict = {}
         lswitch_ovsdb_dict = {}
         for lswitch_name in lswitch_names:
-            try:
-                lswitch = idlutils.row_by_value(self.idl,
-                                                'Logical_Switch',
-                                                'name',
-                                                utils.ovn_name(lswitch_name))
-            except idlutils.RowNotFound:
+            lswitch = self._get_lswitch(utils.ovn_name(lswitch_name))
+            if lswitch is None:
                 # It is possible for the logical switch to be deleted
                 # while we are searching for it by name in idl.
                 continue
             lswitch_ovsdb_dict[lswitch_name] = lswitch
-            acls = getattr(lswitch, 'acls', [])
 
-            # Iterate over each acl in a lswitch and store the acl in
-            # a key:value representation for e.g. acl_string. This
-            # key:value representation can invoke the code -
-            # self._ovn.add_acl(**acl_string)
-            for acl in acls:
-                ext_ids = getattr(acl, 'external_ids', {})
-                port_id = ext_ids.get('neutron:lport')
-                acl_list = acl_values_dict.setdefault(port_id, [])
-                acl_string = {'lport': port_id,
-                              'lswitch': utils.ovn_name(lswitch_name)}
-                for acl_key in six.iterkeys(getattr(acl, "_data", {})):
-                    try:
-                        acl_string[acl_key] = getattr(acl, acl_key)
-                    except AttributeError:
-                        pass
-                acl_obj_dict[str(acl_string)] = acl
+            # Each acl is held in a key:value representation for e.g.
+            # acl_string. This key:value representation can invoke the
+            # code - self._ovn.add_acl(**acl_string)
+            acls = self._get_lswitch_acls(utils.ovn_name(lswitch_name),
+                                          lswitch)
+            for acl, acl_string in six.iteritems(acls):
+                acl_list = acl_values_dict.setdefault(acl_string['lport'], [])
+                acl_obj_dict[utils.acl_key(acl_string)] = acl
                 acl_list.append(acl_string)
         return acl_values_dict, acl_obj_dict, lswitch_ovsdb_dict
 
@@ -211,3 +285,99 @@ class OvsdbOvnIdl(ovn_api.API):
                                      port_list, acl_new_values_dict,
                                      need_compare=need_compare,
                                      is_add_acl=is_add_acl)
+
+    def _check_address_set_support(self):
+        if 'Address_Set' not in self._tables:
+            raise RuntimeError(_("The OVN Northbound schema does not "
+                                 "support address sets"))
+
+    def create_address_set(self, name, may_exist=True, **columns):
+        self._check_address_set_support()
+        return cmd.AddAddrSetCommand(self, name, may_exist, **columns)
+
+    def create_address_sets(self, address_sets, may_exist=True):
+        self._check_address_set_support()
+        return cmd.AddAddrSetsCommand(self, address_sets, may_exist)
+
+    def delete_address_set(self, name, if_exists=True):
+        self._check_address_set_support()
+        return cmd.DelAddrSetCommand(self, name, if_exists)
+
+    def update_address_set(self, name, addrs_add=None, addrs_remove=None,
+                           if_exists=True):
+        self._check_address_set_support()
+        return cmd.UpdateAddrSetsCommand(
+            self, {name: (addrs_add or [], addrs_remove or [])}, if_exists)
+
+    def update_address_sets(self, updates, if_exists=True):
+        self._check_address_set_support()
+        return cmd.UpdateAddrSetsCommand(self, updates, if_exists)
+
+    def get_all_address_sets(self):
+        self._check_address_set_support()
+        result = {}
+        for row in self._tables['Address_Set'].rows.values():
+            result[row.name] = {'addresses': list(row.addresses),
+                                'external_ids': dict(row.external_ids)}
+        return result
+
+
+class OvsdbSbOvnIdl(ovn_api.SbAPI):
+    """Read access to the port bindings and chassis of the OVN SB
+
+    Only the columns listed in SB_TABLES are monitored. With a notify
+    target, the target is told about the port bindings as soon as
+    ovn-controller claims or releases the ports.
+    """
+
+    SB_TABLES = {
+        'Chassis': ('name', 'hostname', 'encaps', 'external_ids'),
+        'Encap': ('type', 'ip', 'options'),
+        'Port_Binding': ('logical_port', 'chassis', 'datapath', 'mac',
+                         'type', 'parent_port', 'tag', 'tunnel_key'),
+    }
+
+    ovsdb_connection = None
+
+    def __init__(self, notify_target=None):
+        super(OvsdbSbOvnIdl, self).__init__()
+        if OvsdbSbOvnIdl.ovsdb_connection is None:
+            OvsdbSbOvnIdl.ovsdb_connection = ovsdb_monitor.OvnSbConnection(
+                cfg.get_ovn_sb_connection(),
+                cfg.get_ovs_ovsdb_timeout(),
+                'OVN_Southbound', self.SB_TABLES)
+        OvsdbSbOvnIdl.ovsdb_connection.start(notify_target)
+        self.idl = OvsdbSbOvnIdl.ovsdb_connection.idl
+        self.ovsdb_timeout = cfg.get_ovn_ovsdb_timeout()
+
+    @property
+    def _tables(self):
+        return self.idl.tables
+
+    def wait_for(self, table, conditions=None, events=None, timeout=None):
+        if timeout is None:
+            timeout = self.ovsdb_timeout
+        return OvsdbSbOvnIdl.ovsdb_connection.wait_for(table, conditions,
+                                                       events, timeout)
+
+    def get_all_chassis(self):
+        result = {}
+        for row in self._tables['Chassis'].rows.values():
+            result[row.name] = {
+                'hostname': row.hostname,
+                'external_ids': dict(getattr(row, 'external_ids', {}))}
+        return result
+
+    def get_chassis_for_port(self, lport_name):
+        for row in self._tables['Port_Binding'].rows.values():
+            if row.logical_port == lport_name:
+                return row.chassis[0].name if row.chassis else None
+        return None
+
+    def get_port_bindings(self, chassis=None):
+        result = {}
+        for row in self._tables['Port_Binding'].rows.values():
+            chassis_name = row.chassis[0].name if row.chassis else None
+            if chassis is None or chassis_name == chassis:
+                result[row.logical_port] = chassis_name
+        return result
@@ -0,0 +1,219 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+
+from oslo_log import log
+import six
+
+from oslo_ovsdb_frontend._i18n import _LW
+from oslo_ovsdb_frontend import config as cfg
+from oslo_ovsdb_frontend.impl import utils
+
+LOG = log.getLogger(__name__)
+
+SYNC_MODE_OFF = 'off'
+SYNC_MODE_LOG = 'log'
+SYNC_MODE_REPAIR = 'repair'
+
+DEFAULT_CHUNK_SIZE = 100
+
+
+def _digest(value):
+    # OVSDB sets are unordered, so sequences are compared as sets
+    return utils.freeze(value, unordered=True)
+
+
+def _row_digest(row, columns):
+    return tuple((col, _digest(getattr(row, col))) for col in columns)
+
+
+def _columns_digest(columns):
+    return tuple((col, _digest(columns[col])) for col in sorted(columns))
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class SyncReport(object):
+    """Differences between the desired state and the OVN NB database
+
+    :ivar create: The desired rows missing from OVN, as (name, columns)
+                  pairs, or (lswitch name, name, columns) for lports
+    :ivar update: The rows whose columns differ, same format as create
+    :ivar delete: The names of the OVN rows not in the desired state, or
+                  (lswitch name, name) pairs for lports
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.create = []
+        self.update = []
+        self.delete = []
+
+    def in_sync(self):
+        return not (self.create or self.update or self.delete)
+
+    def log(self):
+        for item in self.create:
+            LOG.warning(_LW("%(table)s %(name)s found in Neutron but not "
+                            "in OVN"),
+                        {'table': self.table, 'name': item[-2]})
+        for item in self.update:
+            LOG.warning(_LW("%(table)s %(name)s differs between Neutron "
+                            "and OVN"),
+                        {'table': self.table, 'name': item[-2]})
+        for item in self.delete:
+            LOG.warning(_LW("%(table)s %(name)s found in OVN but not "
+                            "in Neutron"),
+                        {'table': self.table,
+                         'name': (item if isinstance(item, six.string_types)
+                                  else item[-1])})
+
+
+class OvnNbSynchronizer(object):
+    """Synchronizes the OVN NB lswitches and lports with a desired state
+
+    The desired state is compared with the IDL cache in a single pass over
+    each table, through hashable digests of the desired columns, rather
+    than by looking rows up one at a time. In 'log' mode the differences
+    are logged; in 'repair' mode they are also fixed with transactions of
+    at most chunk_size commands.
+
+    Only the columns given in the desired state are compared. When
+    owner_key is set, only the OVN rows with this key in their external_ids
+    are deleted, so that rows created by others are left alone.
+    """
+
+    def __init__(self, ovn_api, mode=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                 owner_key=None):
+        self.ovn_api = ovn_api
+        self.mode = mode or cfg.get_ovn_neutron_sync_mode()
+        self.chunk_size = chunk_size
+        self.owner_key = owner_key
+
+    def _owned(self, row):
+        return (self.owner_key is None or
+                self.owner_key in row.external_ids)
+
+    def diff_lswitches(self, lswitches):
+        """Compare the desired lswitches with the OVN ones
+
+        :param lswitches: The desired lswitches, as (name, columns) pairs
+        :type lswitches:  iterable of (string, dictionary) pairs
+        :returns:         :class:`SyncReport`
+        """
+        report = SyncReport('Logical_Switch')
+        desired = collections.OrderedDict(
+            (name, columns) for name, columns in lswitches)
+        actual = {}
+        for row in self.ovn_api._tables['Logical_Switch'].rows.values():
+            columns = desired.get(row.name)
+            if columns is None:
+                if self._owned(row):
+                    report.delete.append(row.name)
+                continue
+            actual[row.name] = _row_digest(row, sorted(columns))
+        for name, columns in desired.items():
+            if name not in actual:
+                report.create.append((name, columns))
+            elif actual[name] != _columns_digest(columns):
+                report.update.append((name, columns))
+        return report
+
+    def diff_lports(self, lports):
+        """Compare the desired lports with the OVN ones
+
+        An lport found on another lswitch is deleted and created again.
+
+        :param lports: The desired lports, as (lswitch name, name, columns)
+                       triples
+        :type lports:  iterable of (string, string, dictionary) triples
+        :returns:      :class:`SyncReport`
+        """
+        report = SyncReport('Logical_Port')
+        desired = collections.OrderedDict(
+            (name, (lswitch, columns)) for lswitch, name, columns in lports)
+        port_lswitch = {}
+        for row in self.ovn_api._tables['Logical_Switch'].rows.values():
+            for port in row.ports:
+                port_lswitch[port.uuid] = row.name
+        actual = {}
+        for row in self.ovn_api._tables['Logical_Port'].rows.values():
+            lswitch = port_lswitch.get(row.uuid)
+            lswitch_columns = desired.get(row.name)
+            if lswitch_columns is None or lswitch_columns[0] != lswitch:
+                if self._owned(row):
+                    report.delete.append((lswitch, row.name))
+                continue
+            actual[row.name] = _row_digest(row, sorted(lswitch_columns[1]))
+        for name, (lswitch, columns) in desired.items():
+            if name not in actual:
+                report.create.append((lswitch, name, columns))
+            elif actual[name] != _columns_digest(columns):
+                report.update.append((lswitch, name, columns))
+        return report
+
+    def _execute(self, commands):
+        for chunk in _chunks(commands, self.chunk_size):
+            with self.ovn_api.transaction(check_error=True) as txn:
+                for command in chunk:
+                    txn.add(command)
+
+    def repair(self, lswitch_report, lport_report):
+        """Apply the differences of the reports to the OVN NB database"""
+        api = self.ovn_api
+        commands = []
+        lport_deletes = collections.defaultdict(list)
+        for lswitch, name in lport_report.delete:
+            if lswitch is None:
+                commands.append(api.delete_lport(name))
+            else:
+                lport_deletes[lswitch].append(name)
+        for lswitch, names in lport_deletes.items():
+            for chunk in _chunks(names, self.chunk_size):
+                commands.append(api.delete_lports(lswitch, chunk))
+        commands.extend(api.delete_lswitch(name)
+                        for name in lswitch_report.delete)
+        commands.extend(api.create_lswitch(name, **columns)
+                        for name, columns in lswitch_report.create)
+        commands.extend(api.set_lswitch(name, **columns)
+                        for name, columns in lswitch_report.update)
+        lport_creates = collections.OrderedDict()
+        for lswitch, name, columns in lport_report.create:
+            lport_creates.setdefault(lswitch, []).append((name, columns))
+        for lswitch, lports in lport_creates.items():
+            for chunk in _chunks(lports, self.chunk_size):
+                commands.append(api.create_lports(lswitch, chunk))
+        commands.extend(api.set_lport(name, **columns)
+                        for _lswitch, name, columns in lport_report.update)
+        self._execute(commands)
+
+    def sync(self, lswitches, lports):
+        """Synchronize OVN with the desired state according to the mode
+
+        :param lswitches: The desired lswitches, see diff_lswitches
+        :param lports:    The desired lports, see diff_lports
+        :returns:         (lswitch report, lport report), or None when the
+                          synchronization is off
+        """
+        if self.mode == SYNC_MODE_OFF:
+            return None
+        lswitch_report = self.diff_lswitches(lswitches)
+        lport_report = self.diff_lports(lports)
+        lswitch_report.log()
+        lport_report.log()
+        if self.mode == SYNC_MODE_REPAIR:
+            self.repair(lswitch_report, lport_report)
+        return lswitch_report, lport_report
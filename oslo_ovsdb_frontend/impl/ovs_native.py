@@ -26,6 +26,7 @@ from oslo_ovsdb_frontend.api import ovs as ovsapi
 from oslo_ovsdb_frontend.impl.native import commands as cmd
 from oslo_ovsdb_frontend.impl.native import connection
 from oslo_ovsdb_frontend.impl.native import idlutils
+from oslo_ovsdb_frontend.impl.native import table_digest
 
 
 LOG = logging.getLogger(__name__)
@@ -130,6 +131,28 @@ class OvsdbIdl(ovsapi.API):
                            self.context.vsctl_timeout,
                            check_error, log_errors)
 
+    def wait_for(self, table, conditions=None, events=None, timeout=None):
+        """Block until a row of the table matches the conditions
+
+        See :meth:`connection.Connection.wait_for`, the timeout defaults to
+        the vsctl timeout.
+        """
+        if timeout is None:
+            timeout = self.context.vsctl_timeout
+        return OvsdbIdl.ovsdb_connection.wait_for(table, conditions, events,
+                                                  timeout)
+
+    def table_digest(self, table, key_column, columns,
+                     buckets=table_digest.DEFAULT_BUCKETS):
+        """Return the rolling digests of the columns of a table
+
+        See :meth:`connection.Connection.table_digest`. Compare them with
+        the digests of the expected rows, built with
+        table_digest.TableDigest.from_values, to check for drift.
+        """
+        return OvsdbIdl.ovsdb_connection.table_digest(table, key_column,
+                                                      columns, buckets)
+
     def add_br(self, name, may_exist=True, datapath_type=None):
         return cmd.AddBridgeCommand(self, name, may_exist, datapath_type)
 
@@ -160,21 +183,52 @@ class OvsdbIdl(ovsapi.API):
     def db_destroy(self, table, record):
         return cmd.DbDestroyCommand(self, table, record)
 
+    def prepare(self, template):
+        return cmd.PreparedDbCommand(self, template)
+
     def db_set(self, table, record, *col_values):
         return cmd.DbSetCommand(self, table, record, *col_values)
 
+    def db_set_keys(self, table, record, *col_key_values):
+        return cmd.DbSetKeysCommand(self, table, record, col_key_values)
+
+    def db_create_many(self, table, rows):
+        return cmd.DbCreateManyCommand(self, table, rows)
+
+    def db_destroy_many(self, table, records, if_exists=False):
+        return cmd.DbDestroyManyCommand(self, table, records, if_exists)
+
+    def db_set_many(self, table, updates):
+        return cmd.DbSetManyCommand(self, table, updates)
+
     def db_clear(self, table, record, column):
         return cmd.DbClearCommand(self, table, record, column)
 
     def db_get(self, table, record, column):
         return cmd.DbGetCommand(self, table, record, column)
 
-    def db_list(self, table, records=None, columns=None, if_exists=False):
-        return cmd.DbListCommand(self, table, records, columns, if_exists)
+    def db_get_many(self, table, records, columns, if_exists=False):
+        return cmd.DbGetManyCommand(self, table, records, columns, if_exists)
+
+    def db_list(self, table, records=None, columns=None, if_exists=False,
+                limit=None, offset=0, row_views=False, columnar=False):
+        return cmd.DbListCommand(self, table, records, columns, if_exists,
+                                 limit, offset, row_views=row_views,
+                                 columnar=columnar)
+
+    def db_list_iter(self, table, records=None, columns=None,
+                     if_exists=False, limit=None, offset=0, row_views=False):
+        return cmd.DbListCommand(self, table, records, columns, if_exists,
+                                 limit, offset, iterate=True,
+                                 row_views=row_views)
 
     def db_find(self, table, *conditions, **kwargs):
         return cmd.DbFindCommand(self, table, *conditions, **kwargs)
 
+    def db_find_iter(self, table, *conditions, **kwargs):
+        return cmd.DbFindCommand(self, table, *conditions, iterate=True,
+                                 **kwargs)
+
     def set_controller(self, bridge, controllers):
         return cmd.SetControllerCommand(self, bridge, controllers)
 
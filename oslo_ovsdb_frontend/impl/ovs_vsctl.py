@@ -13,14 +13,19 @@
 #    under the License.
 
 import itertools
+import json
 
 from oslo_log import log as logging
 from oslo_serialization import jsonutils
 from oslo_utils import excutils
+from oslo_utils import uuidutils
+import six
+from six.moves import collections_abc
 
 from oslo_ovsdb_frontend._i18n import _LE
 from oslo_ovsdb_frontend import api
 from oslo_ovsdb_frontend.api import ovs
+from oslo_ovsdb_frontend.impl import prepared
 from oslo_ovsdb_frontend.impl import utils
 
 LOG = logging.getLogger(__name__)
@@ -30,6 +35,7 @@ class Transaction(api.Transaction):
     def __init__(self, context, execute_func,
                  check_error=False, log_errors=True, opts=None):
         self.context = context
+        self.execute_func = execute_func
         self.check_error = check_error
         self.log_errors = log_errors
         self.opts = ["--timeout=%d" % self.context.vsctl_timeout,
@@ -45,14 +51,24 @@ class Transaction(api.Transaction):
     def commit(self):
         args = []
         for cmd in self.commands:
+            cmd.check_error = self.check_error
+            cmd.log_errors = self.log_errors
             cmd.result = None
             args += cmd.vsctl_args()
         res = self.run_vsctl(args)
         if res is None:
             return
         res = res.replace(r'\\', '\\').splitlines()
-        for i, record in enumerate(res):
-            self.commands[i].result = record
+        # Bulk commands output one line per ovs-vsctl command they run
+        i = 0
+        for cmd in self.commands:
+            if i >= len(res):
+                break
+            if cmd.num_results == 1:
+                cmd.result = res[i]
+            else:
+                cmd.result = res[i:i + cmd.num_results]
+            i += cmd.num_results
         return [cmd.result for cmd in self.commands]
 
     def run_vsctl(self, args):
@@ -72,6 +88,11 @@ class Transaction(api.Transaction):
 
 
 class BaseCommand(api.Command):
+    num_results = 1
+    # The error handling of the transaction running the command
+    check_error = False
+    log_errors = True
+
     def __init__(self, context, cmd, execute_func, opts=None, args=None):
         self.context = context
         self.cmd = cmd
@@ -90,6 +111,37 @@ class BaseCommand(api.Command):
         return itertools.chain(('--',), self.opts, (self.cmd,), self.args)
 
 
+class BulkCommand(BaseCommand):
+    """Command running the same ovs-vsctl command for many arguments
+
+    The result is the list of the outputs of the commands.
+    """
+
+    def __init__(self, context, cmd, execute_func, args_list, opts=None):
+        super(BulkCommand, self).__init__(context, cmd, execute_func, opts)
+        self.args_list = [list(args) for args in args_list]
+
+    @property
+    def num_results(self):
+        return len(self.args_list)
+
+    @property
+    def result(self):
+        return self._result
+
+    @result.setter
+    def result(self, raw_result):
+        # Empty trailing lines are stripped from the output of ovs-vsctl
+        raw_result = list(raw_result or [])
+        missing = self.num_results - len(raw_result)
+        self._result = raw_result + [''] * missing
+
+    def vsctl_args(self):
+        return itertools.chain.from_iterable(
+            itertools.chain(('--',), self.opts, (self.cmd,), args)
+            for args in self.args_list)
+
+
 class MultiLineCommand(BaseCommand):
     """Command for ovs-vsctl commands that return multiple lines"""
     @property
@@ -101,16 +153,116 @@ class MultiLineCommand(BaseCommand):
         self._result = raw_result.split(r'\n') if raw_result else []
 
 
+class RecordView(collections_abc.Mapping):
+    """Read-only mapping of the columns of an ovs-vsctl JSON record
+
+    The values are converted with val_to_py only when they are accessed.
+    Use to_dict() for a copy.
+    """
+
+    __slots__ = ('_index', '_record')
+
+    def __init__(self, index, record):
+        # index maps the headings to their position, shared by the records
+        self._index = index
+        self._record = record
+
+    def __getitem__(self, column):
+        return utils.val_to_py(self._record[self._index[column]])
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __repr__(self):
+        return "RecordView(%s)" % self.to_dict()
+
+
+def _record_result(headings, index, record, row_views):
+    if row_views:
+        return RecordView(index, record)
+    return dict((heading, utils.val_to_py(record[pos]))
+                for pos, heading in enumerate(headings))
+
+
+def _parse_error(command, raw_result, exception, ctxt):
+    # Parse errors are handled as run_vsctl handles the execution errors
+    if command.log_errors:
+        LOG.error(_LE("Could not parse: %(raw_result)s. "
+                      "Exception: %(exception)s"),
+                  {'raw_result': raw_result, 'exception': exception})
+    if not command.check_error:
+        ctxt.reraise = False
+
+
+def _iter_json_rows(command, raw_result):
+    """Return an iterator over the records of an ovs-vsctl JSON table
+
+    ovs-vsctl outputs {"data":[[...], ...],"headings":[...]}, the headings
+    are decoded at once, so that an invalid output is handled here, and the
+    records as they are consumed rather than all at once. The parse errors
+    are handled as the ones of the whole output in DbCommand: they are
+    raised with check_error, otherwise the result is None, or the iteration
+    stops at the invalid record.
+    """
+    def skip(pos, chars=' \t\r\n'):
+        while raw_result[pos] in chars:
+            pos += 1
+        return pos
+
+    decoder = json.JSONDecoder()
+    try:
+        pos = raw_result.rindex('"headings":') + len('"headings":')
+        headings = decoder.raw_decode(raw_result, skip(pos))[0]
+        pos = raw_result.index('[', raw_result.index('"data":')) + 1
+    except (ValueError, IndexError) as e:
+        with excutils.save_and_reraise_exception() as ctxt:
+            _parse_error(command, raw_result, e, ctxt)
+        return None
+    index = dict((heading, pos) for pos, heading in enumerate(headings))
+
+    def records(pos):
+        while True:
+            try:
+                pos = skip(pos, ' \t\r\n,')
+                if raw_result[pos] == ']':
+                    return
+                record, pos = decoder.raw_decode(raw_result, pos)
+            except (ValueError, IndexError) as e:
+                with excutils.save_and_reraise_exception() as ctxt:
+                    _parse_error(command, raw_result, e, ctxt)
+                return
+            yield _record_result(headings, index, record, command.row_views)
+    return records(pos)
+
+
 class DbCommand(BaseCommand):
     def __init__(self, context, cmd, execute_func,
-                 opts=None, args=None, columns=None):
+                 opts=None, args=None, columns=None,
+                 limit=None, offset=0, iterate=False, row_views=False,
+                 columnar=False):
         if opts is None:
             opts = []
         if columns:
             opts += ['--columns=%s' % ",".join(columns)]
+        self.limit = limit
+        self.offset = offset
+        self.iterate = iterate
+        self.row_views = row_views
+        self.columnar = columnar
         super(DbCommand, self).__init__(context, cmd, execute_func,
                                         opts, args)
 
+    def _paginate(self, rows):
+        return itertools.islice(
+            rows, self.offset,
+            None if self.limit is None else self.offset + self.limit)
+
     @property
     def result(self):
         return self._result
@@ -122,25 +274,33 @@ class DbCommand(BaseCommand):
             self._result = None
             return
 
+        if self.iterate and not self.columnar:
+            rows = _iter_json_rows(self, raw_result)
+            self._result = None if rows is None else self._paginate(rows)
+            return
+
         try:
             json = jsonutils.loads(raw_result)
         except (ValueError, TypeError) as e:
             # This shouldn't happen, but if it does and we check_errors
             # log and raise.
-            with excutils.save_and_reraise_exception():
-                LOG.error(_LE("Could not parse: %(raw_result)s. "
-                              "Exception: %(exception)s"),
-                          {'raw_result': raw_result, 'exception': e})
+            with excutils.save_and_reraise_exception() as ctxt:
+                _parse_error(self, raw_result, e, ctxt)
+            self._result = None
+            return
 
         headings = json['headings']
         data = json['data']
-        results = []
-        for record in data:
-            obj = {}
-            for pos, heading in enumerate(headings):
-                obj[heading] = utils.val_to_py(record[pos])
-            results.append(obj)
-        self._result = results
+        index = dict((heading, pos) for pos, heading in enumerate(headings))
+        if self.limit is not None or self.offset:
+            data = list(self._paginate(data))
+        if self.columnar:
+            self._result = utils.to_columnar(
+                headings, data,
+                lambda record, col: utils.val_to_py(record[index[col]]))
+            return
+        self._result = [_record_result(headings, index, record, self.row_views)
+                        for record in data]
 
 
 class DbGetCommand(DbCommand):
@@ -153,6 +313,65 @@ class DbGetCommand(DbCommand):
             self._result = list(self._result[0].values())[0]
 
 
+class DbGetManyCommand(DbCommand):
+    """Command getting columns of many records in a single ovs-vsctl call
+
+    ovs-vsctl lists the records in the order they are given. With
+    if_exists, the missing records are skipped and the found ones can only
+    be matched by UUID, as the tables such as QoS, Queue or Flow_Table have
+    no name column. So unless all the records are UUIDs, one --if-exists
+    list command is run per record.
+    """
+
+    def __init__(self, context, execute_func, table, records, columns,
+                 if_exists):
+        self.records = list(records)
+        self.requested = list(columns)
+        self.per_record = if_exists and not all(
+            uuidutils.is_uuid_like(str(record)) for record in self.records)
+        opts = ['--if-exists'] if if_exists else None
+        super(DbGetManyCommand, self).__init__(
+            context, 'list', execute_func, opts=opts,
+            args=[table] + [str(record) for record in self.records],
+            columns=self.requested + ['_uuid'])
+
+    @property
+    def num_results(self):
+        return len(self.records) if self.per_record else 1
+
+    def vsctl_args(self):
+        if not self.per_record:
+            return super(DbGetManyCommand, self).vsctl_args()
+        table = self.args[0]
+        return itertools.chain.from_iterable(
+            itertools.chain(('--',), self.opts, (self.cmd, table, record))
+            for record in self.args[1:])
+
+    @DbCommand.result.setter
+    def result(self, val):
+        if self.per_record:
+            pairs = []
+            # Empty trailing lines are stripped from the output of ovs-vsctl
+            for record, raw_result in zip(self.records, val or []):
+                DbCommand.result.fset(self, raw_result)
+                if self._result:
+                    pairs.append((record, self._result[0]))
+        else:
+            DbCommand.result.fset(self, val)
+            rows = self._result or []
+            if len(rows) == len(self.records):
+                pairs = zip(self.records, rows)
+            else:
+                by_uuid = dict((str(row['_uuid']), row) for row in rows)
+                pairs = [(record, by_uuid[str(record)])
+                         for record in self.records
+                         if str(record) in by_uuid]
+        self._result = dict(
+            (record, dict((column, row[column])
+                          for column in self.requested))
+            for record, row in pairs)
+
+
 class BrExistsCommand(DbCommand):
     @DbCommand.result.setter
     def result(self, val):
@@ -163,6 +382,37 @@ class BrExistsCommand(DbCommand):
                                                     log_errors=False)
 
 
+class PreparedDbCommand(prepared.PreparedCommand):
+    """Prepared ovs-vsctl command
+
+    Without a schema, only the syntax of the template is validated. The
+    arguments are built from the bound values directly, set_colval_args is
+    only used for bound sets and maps.
+    """
+
+    def _command(self, record, args):
+        if self.verb == 'get':
+            # As db_get, see there
+            return DbGetCommand(self.api.context, 'list',
+                                self.api.execute_func,
+                                args=[self.table, record],
+                                columns=[args[0][0]])
+        cmd_args = [self.table, record]
+        for column, key, value in args:
+            if key is not None:
+                column = '%s:%s' % (column, key)
+            if value is None:
+                cmd_args.append(column)
+            elif (isinstance(value, collections_abc.Mapping) or
+                  (isinstance(value, collections_abc.Sequence) and
+                   not isinstance(value, six.string_types))):
+                cmd_args += utils.set_colval_args((column, value))
+            else:
+                cmd_args.append('%s=%s' % (column, utils.py_to_val(value)))
+        return BaseCommand(self.api.context, self.verb, self.api.execute_func,
+                           args=cmd_args)
+
+
 class OvsdbVsctl(ovs.API):
 
     def __init__(self, context, execute_func):
@@ -217,12 +467,42 @@ class OvsdbVsctl(ovs.API):
         return BaseCommand(self.context, 'destroy', self.execute_func,
                            args=args)
 
+    def prepare(self, template):
+        return PreparedDbCommand(self, template)
+
     def db_set(self, table, record, *col_values):
         args = [table, record]
         args += utils.set_colval_args(*col_values)
         return BaseCommand(self.context, 'set', self.execute_func,
                            args=args)
 
+    def db_set_keys(self, table, record, *col_key_values):
+        args = [table, record]
+        for col, key, val in col_key_values:
+            if key is None:
+                args += utils.set_colval_args((col, val))
+            else:
+                args.append('%s:%s=%s' % (col, key, utils.py_to_val(val)))
+        return BaseCommand(self.context, 'set', self.execute_func,
+                           args=args)
+
+    def db_create_many(self, table, rows):
+        args_list = [[table] + utils.set_colval_args(*columns.items())
+                     for columns in rows]
+        return BulkCommand(self.context, 'create', self.execute_func,
+                           args_list)
+
+    def db_destroy_many(self, table, records, if_exists=False):
+        opts = ['--if-exists'] if if_exists else None
+        return BulkCommand(self.context, 'destroy', self.execute_func,
+                           [[table, record] for record in records], opts)
+
+    def db_set_many(self, table, updates):
+        args_list = [[table, record] + utils.set_colval_args(*col_values)
+                     for record, col_values in updates]
+        return BulkCommand(self.context, 'set', self.execute_func,
+                           args_list)
+
     def db_clear(self, table, record, column):
         return BaseCommand(self.context, 'clear', self.execute_func,
                            args=[table, record, column])
@@ -236,13 +516,31 @@ class OvsdbVsctl(ovs.API):
         return DbGetCommand(self.context, 'list', self.execute_func,
                             args=[table, record], columns=[column])
 
-    def db_list(self, table, records=None, columns=None, if_exists=False):
+    def db_get_many(self, table, records, columns, if_exists=False):
+        # A single 'list' command, see db_get
+        return DbGetManyCommand(self.context, self.execute_func, table,
+                                records, columns, if_exists)
+
+    def _db_list(self, table, records, columns, if_exists, limit, offset,
+                 iterate, row_views, columnar=False):
         opts = ['--if-exists'] if if_exists else None
         args = [table]
         if records:
             args += records
         return DbCommand(self.context, 'list', self.execute_func,
-                         opts=opts, args=args, columns=columns)
+                         opts=opts, args=args, columns=columns,
+                         limit=limit, offset=offset, iterate=iterate,
+                         row_views=row_views, columnar=columnar)
+
+    def db_list(self, table, records=None, columns=None, if_exists=False,
+                limit=None, offset=0, row_views=False, columnar=False):
+        return self._db_list(table, records, columns, if_exists, limit,
+                             offset, False, row_views, columnar)
+
+    def db_list_iter(self, table, records=None, columns=None,
+                     if_exists=False, limit=None, offset=0, row_views=False):
+        return self._db_list(table, records, columns, if_exists, limit,
+                             offset, True, row_views)
 
     def db_find(self, table, *conditions, **kwargs):
         columns = kwargs.pop('columns', None)
@@ -250,7 +548,15 @@ class OvsdbVsctl(ovs.API):
                                *[utils.set_colval_args(c)
                                  for c in conditions])
         return DbCommand(self.context, 'find', self.execute_func,
-                         args=args, columns=columns)
+                         args=args, columns=columns,
+                         limit=kwargs.pop('limit', None),
+                         offset=kwargs.pop('offset', 0),
+                         iterate=kwargs.pop('iterate', False),
+                         row_views=kwargs.pop('row_views', False),
+                         columnar=kwargs.pop('columnar', False))
+
+    def db_find_iter(self, table, *conditions, **kwargs):
+        return self.db_find(table, *conditions, iterate=True, **kwargs)
 
     def set_controller(self, bridge, controllers):
         return BaseCommand(self.context, 'set-controller', self.execute_func,
@@ -13,20 +13,24 @@
 #    under the License.
 
 import atexit
-from eventlet import greenthread
-import Queue
+import collections
 import threading
+import time
 
 from oslo_log import log
 from ovs.db import idl
 from ovs import poller
-import retrying
+from six.moves import queue as Queue
 
-from oslo_ovsdb_frontend._i18n import _LE
+from oslo_ovsdb_frontend._i18n import _LE, _LW
+from oslo_ovsdb_frontend import config as cfg
 from oslo_ovsdb_frontend.impl.native import connection
-from oslo_ovsdb_frontend.impl.native import helpers
+from oslo_ovsdb_frontend.impl.native import event_executor
+from oslo_ovsdb_frontend.impl.native import event_lock
+from oslo_ovsdb_frontend.impl.native import event_metrics
 from oslo_ovsdb_frontend.impl.native import idlutils
 from oslo_ovsdb_frontend.impl.native import row_event
+from oslo_ovsdb_frontend.impl.native import runtime as runtime_
 
 LOG = log.getLogger(__name__)
 
@@ -44,12 +48,19 @@ class LogicalPortCreateUpEvent(row_event.RowEvent):
         table = 'Logical_Port'
         events = (self.ROW_CREATE)
         super(LogicalPortCreateUpEvent, self).__init__(
-            events, table, (('up', '=', True),))
+            events, table, (('up', '=', True),), columns=('name',))
         self.event_name = 'LogicalPortCreateUpEvent'
 
     def run(self, event, row, old):
         self.plugin.set_port_status_up(row.name)
 
+    def run_initial(self, rows):
+        set_ports_status_up = getattr(self.plugin, 'set_ports_status_up',
+                                      None)
+        if set_ports_status_up is None:
+            return super(LogicalPortCreateUpEvent, self).run_initial(rows)
+        set_ports_status_up([row.name for row in rows])
+
 
 class LogicalPortCreateDownEvent(row_event.RowEvent):
     """Row create event - Logical_Port 'up' = False
@@ -63,12 +74,19 @@ class LogicalPortCreateDownEvent(row_event.RowEvent):
         table = 'Logical_Port'
         events = (self.ROW_CREATE)
         super(LogicalPortCreateDownEvent, self).__init__(
-            events, table, (('up', '=', False),))
+            events, table, (('up', '=', False),), columns=('name',))
         self.event_name = 'LogicalPortCreateDownEvent'
 
     def run(self, event, row, old):
         self.plugin.set_port_status_down(row.name)
 
+    def run_initial(self, rows):
+        set_ports_status_down = getattr(self.plugin, 'set_ports_status_down',
+                                        None)
+        if set_ports_status_down is None:
+            return super(LogicalPortCreateDownEvent, self).run_initial(rows)
+        set_ports_status_down([row.name for row in rows])
+
 
 class LogicalPortUpdateUpEvent(row_event.RowEvent):
     """Row update event - Logical_Port 'up' going from False to True
@@ -83,7 +101,8 @@ class LogicalPortUpdateUpEvent(row_event.RowEvent):
         events = (self.ROW_UPDATE)
         super(LogicalPortUpdateUpEvent, self).__init__(
             events, table, (('up', '=', True),),
-            old_conditions=(('up', '=', False),))
+            old_conditions=(('up', '=', False),),
+            columns=('name',), update_columns=('up',))
         self.event_name = 'LogicalPortUpdateUpEvent'
 
     def run(self, event, row, old):
@@ -103,29 +122,325 @@ class LogicalPortUpdateDownEvent(row_event.RowEvent):
         events = (self.ROW_UPDATE)
         super(LogicalPortUpdateDownEvent, self).__init__(
             events, table, (('up', '=', False),),
-            old_conditions=(('up', '=', True),))
+            old_conditions=(('up', '=', True),),
+            columns=('name',), update_columns=('up',))
         self.event_name = 'LogicalPortUpdateDownEvent'
 
     def run(self, event, row, old):
         self.plugin.set_port_status_down(row.name)
 
 
+class PortBindingChassisUpdateEvent(row_event.RowEvent):
+    """Row update event - Port_Binding 'chassis' changed
+
+    ovn-controller sets the chassis of the port binding when it claims the
+    port and clears it when the port goes away, which is known before
+    ovn-northd copies it to the Logical_Port 'up' column of the NB.
+    """
+    def __init__(self, plugin):
+        self.plugin = plugin
+        table = 'Port_Binding'
+        events = (self.ROW_UPDATE)
+        super(PortBindingChassisUpdateEvent, self).__init__(
+            events, table, None, columns=('logical_port', 'chassis'),
+            update_columns=('chassis',))
+        self.event_name = 'PortBindingChassisUpdateEvent'
+
+    def run(self, event, row, old):
+        if row.chassis:
+            self.plugin.set_port_status_up(row.logical_port)
+        else:
+            self.plugin.set_port_status_down(row.logical_port)
+
+
+def _merge_old(old, new_old):
+    """Merge the old rows of two consecutive updates of the same row
+
+    The result holds, for every column changed by either update, the value
+    the column had before the first of them.
+    """
+    if old is None:
+        return new_old
+    if new_old is None:
+        return old
+    data = dict(new_old._data)
+    data.update(old._data)
+    if isinstance(old, idlutils.RowSnapshot):
+        return idlutils.create_snapshot(old.uuid, old._table, data)
+    return idl.Row(old._idl, old._table, old.uuid, data)
+
+
+class RowChanges(object):
+    """Net effect of the notifications received for a row in a batch"""
+
+    def __init__(self):
+        self.event = None
+        self.row = None
+        self.old = None
+        self.deleted = False
+
+    def add(self, event, row, old):
+        self.row = row
+        if self.event is None:
+            self.event, self.old = event, old
+        elif event == row_event.RowEvent.ROW_DELETE:
+            # A row created and deleted within the batch never existed
+            # as far as the handlers are concerned.
+            self.deleted = self.event == row_event.RowEvent.ROW_CREATE
+            self.event, self.old = event, None
+        elif (event == row_event.RowEvent.ROW_UPDATE and
+                self.event == row_event.RowEvent.ROW_UPDATE):
+            self.old = _merge_old(self.old, old)
+        # A create followed by updates is still a create of the latest row
+
+
+class NotificationQueue(object):
+    """Notification queue with an overflow policy
+
+    When the queue holds maxsize notifications, putting a new one:
+
+    - block: blocks the caller, i.e. the IDL thread, until there is room
+    - merge: merges the notification with the last queued notification of
+             the same row, and blocks if there is none. Only unmatched
+             notifications, i.e. queued with a None event, are merged.
+    - drop-oldest: drops the oldest notification and hands its
+                   (event, row, old) to resync_callback, which runs in the
+                   IDL thread and must not block. Entries without a row,
+                   like the STOP_EVENT of the handler, are never dropped.
+
+    It implements the subset of the Queue.Queue interface used by the
+    notify handler on top of threading primitives, as the Queue module may
+    be replaced by eventlet.
+    """
+
+    BLOCK = 'block'
+    MERGE = 'merge'
+    DROP_OLDEST = 'drop-oldest'
+
+    def __init__(self, maxsize=0, policy=BLOCK, resync_callback=None):
+        self.maxsize = maxsize
+        self.policy = policy
+        self.resync_callback = resync_callback
+        self.merges = 0
+        self.drops = 0
+        self.queue = collections.deque()
+        self.unfinished_tasks = 0
+        self.mutex = threading.Lock()
+        self.not_empty = threading.Condition(self.mutex)
+        self.not_full = threading.Condition(self.mutex)
+        self.all_tasks_done = threading.Condition(self.mutex)
+
+    def _full(self):
+        return 0 < self.maxsize <= len(self.queue)
+
+    def put(self, item):
+        dropped = None
+        with self.not_full:
+            if self._full() and self.policy == NotificationQueue.MERGE:
+                if self._merge(item):
+                    self.merges += 1
+                    return
+            elif self._full() and self.policy == self.DROP_OLDEST:
+                dropped = self._drop_oldest()
+            while self._full():
+                self.not_full.wait()
+            self.queue.append((item, time.time()))
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+        if dropped is not None:
+            LOG.warning(_LW("Notification queue full, dropped the "
+                            "%(event)s notification of row %(row)s"),
+                        {'event': dropped[1], 'row': dropped[2].uuid})
+            if self.resync_callback:
+                self.resync_callback(*dropped[1:])
+
+    def get(self, timeout=None):
+        return self.get_entry(timeout)[0]
+
+    def get_entry(self, timeout=None):
+        """Remove and return a notification along with its enqueue time
+
+        :returns: (notification, time.time() at which it was queued)
+        """
+        with self.not_empty:
+            if timeout is not None:
+                deadline = time.time() + timeout
+            while not self.queue:
+                if timeout is None:
+                    self.not_empty.wait()
+                    continue
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise Queue.Empty()
+                self.not_empty.wait(remaining)
+            entry = self.queue.popleft()
+            self.not_full.notify()
+            return entry
+
+    def task_done(self):
+        with self.all_tasks_done:
+            self._task_removed()
+
+    def join(self):
+        with self.all_tasks_done:
+            while self.unfinished_tasks:
+                self.all_tasks_done.wait()
+
+    def qsize(self):
+        with self.mutex:
+            return len(self.queue)
+
+    def _drop_oldest(self):
+        # Must be called with the mutex held
+        for index, (item, _enqueued) in enumerate(self.queue):
+            if item[2] is not None:
+                del self.queue[index]
+                self._task_removed()
+                self.drops += 1
+                return item
+
+    def _task_removed(self):
+        # Must be called with the mutex held
+        self.unfinished_tasks -= 1
+        if not self.unfinished_tasks:
+            self.all_tasks_done.notify_all()
+
+    def _merge(self, item):
+        match, event, row, old = item
+        if match is not None:
+            return False
+        for index in range(len(self.queue) - 1, -1, -1):
+            queued, enqueued = self.queue[index]
+            if queued[0] is not None or queued[2] is None:
+                continue
+            if queued[2].uuid != row.uuid:
+                continue
+            changes = RowChanges()
+            changes.add(*queued[1:])
+            changes.add(event, row, old)
+            if changes.deleted:
+                del self.queue[index]
+                self._task_removed()
+                self.not_full.notify()
+            else:
+                self.queue[index] = ((None, changes.event, row, changes.old),
+                                     enqueued)
+            return True
+        return False
+
+    def stats(self):
+        """Return the queue depth, and the merged and dropped counters"""
+        with self.mutex:
+            return {'depth': len(self.queue),
+                    'merges': self.merges,
+                    'drops': self.drops}
+
+
 class OvnNbNotifyHandler(object):
 
     STOP_EVENT = ("STOP", None, None, None)
 
-    def __init__(self, plugin):
+    def __init__(self, plugin, batch_window=None, executor=None,
+                 runtime=None, queue_size=0,
+                 queue_policy=NotificationQueue.BLOCK, resync_callback=None,
+                 snapshot_rows=False, metrics=None):
+        """Dispatches the OVN NB notifications to the watched row events
+
+        :param plugin:       The plugin the row events report to
+        :param batch_window: When set, notifications are collected during
+                             batch_window seconds, coalesced by row and
+                             delivered through RowEvent.run_batch()
+        :type batch_window:  float
+        :param executor:     Runs the row events, defaults to running them
+                             in the notify loop
+        :type executor:      :class:`event_executor.Executor`
+        :param runtime:      Runs the notify loop, defaults to green threads
+                             if eventlet monkey patched the thread module and
+                             to native threads otherwise
+        :type runtime:       :class:`runtime.Runtime`
+        :param queue_size:   Maximum number of queued notifications, 0 means
+                             unbounded
+        :type queue_size:    int
+        :param queue_policy: What to do when the queue is full, see
+                             :class:`NotificationQueue`
+        :type queue_policy:  string
+        :param resync_callback: Called with (event, row, old) for each
+                                notification dropped by the drop-oldest
+                                policy
+        :type resync_callback:  callable
+        :param snapshot_rows: Deliver read-only snapshots holding the columns
+                              the row events declare, rather than the live
+                              IDL rows, see :func:`idlutils.snapshot_row`
+        :type snapshot_rows:  bool
+        :param metrics:       Collects the pipeline counters and latencies
+        :type metrics:        :class:`event_metrics.EventMetrics`
+        """
         self.plugin = plugin
+        self.batch_window = batch_window
+        self.executor = executor or event_executor.InlineExecutor()
+        self.runtime = runtime or runtime_.get_runtime()
+        self.snapshot_rows = snapshot_rows
+        self.metrics = metrics
+        self._metrics_stop = threading.Event()
+        self._metrics_reporter_done = None
         self.__watched_events = set()
         self.__lock = threading.Lock()
-        self.notifications = Queue.Queue()
-        self.notify_thread = greenthread.spawn_n(self.notify_loop)
+        self.notifications = NotificationQueue(queue_size, queue_policy,
+                                               resync_callback)
+        # Merged notifications are matched once their net effect is known
+        self._defer_matching = (bool(batch_window) or
+                                queue_policy == NotificationQueue.MERGE)
+        if batch_window:
+            self.notify_thread = self.runtime.spawn(self.notify_batch_loop)
+        else:
+            self.notify_thread = self.runtime.spawn(self.notify_loop)
         atexit.register(self.shutdown)
 
     def matching_events(self, event, row, updates):
         with self.__lock:
-            return tuple(t for t in self.__watched_events
-                         if t.matches(event, row, updates))
+            if self.metrics is None:
+                return tuple(t for t in self.__watched_events
+                             if t.matches(event, row, updates))
+            matching = []
+            for t in self.__watched_events:
+                start = time.time()
+                matched = t.matches(event, row, updates)
+                self.metrics.observe(t.event_name, 'match_time',
+                                     time.time() - start)
+                if matched:
+                    self.metrics.increment(t.event_name, 'matched')
+                    matching.append(t)
+            return tuple(matching)
+
+    def watches_change(self, event, row, updates):
+        """Return whether a watched event may match the notification
+
+        Updates which only changed columns no event of the table watches
+        can be dropped before being queued. They are kept while events other
+        than updates are watched, as they may be merged with a creation.
+        """
+        table = row._table.name
+        with self.__lock:
+            return any(t.table == table and
+                       (event != t.ROW_UPDATE or
+                        t.changes_watched_columns(updates))
+                       for t in self.__watched_events)
+
+    def table_columns(self, table):
+        """Return the columns the events watching the table are reading
+
+        :returns: A set of column names, or None for all the columns
+        """
+        columns = set()
+        with self.__lock:
+            for watched in self.__watched_events:
+                if watched.table != table:
+                    continue
+                watched_columns = watched.snapshot_columns()
+                if watched_columns is None:
+                    return None
+                columns.update(watched_columns)
+        return columns
 
     def watch_event(self, event):
         with self.__lock:
@@ -156,46 +471,235 @@ class OvnNbNotifyHandler(object):
 
     def shutdown(self):
         self.notifications.put(OvnNbNotifyHandler.STOP_EVENT)
+        self._metrics_stop.set()
+        if self._metrics_reporter_done is not None:
+            # Whatever the runtime, wait for the reporter to return
+            self._metrics_reporter_done.wait()
+
+    def _dispatch(self, match, row_uuid, enqueued, func, *args):
+        # ONETIME events are unwatched before being handed to the executor
+        # so that a concurrent worker cannot run them a second time.
+        if match.ONETIME:
+            self.unwatch_event(match)
+        if self.metrics is None:
+            self.executor.submit(row_uuid, func, *args)
+        else:
+            self.executor.submit(row_uuid, self._run_measured,
+                                 match.event_name, enqueued, func, *args)
+
+    def _run_measured(self, name, enqueued, func, *args):
+        start = time.time()
+        self.metrics.observe(name, 'queue_wait', start - enqueued)
+        try:
+            func(*args)
+        except Exception:
+            self.metrics.increment(name, 'errors')
+            raise
+        finally:
+            self.metrics.increment(name, 'runs')
+            self.metrics.observe(name, 'run_time', time.time() - start)
+
+    def get_metrics(self):
+        """Return the pipeline metrics
+
+        :returns: {'events': per event metrics, see
+                   :meth:`event_metrics.EventMetrics.snapshot`,
+                   'queue': the notification queue stats,
+                   'executor_depth': work waiting in the executor}
+        """
+        return {'events': self.metrics.snapshot() if self.metrics else {},
+                'queue': self.notifications.stats(),
+                'executor_depth': self.executor.depth()}
+
+    def start_metrics_reporter(self, exporter, interval):
+        """Hand the metrics to exporter every interval seconds
+
+        The per event metrics get a run_rate, the runs per second since the
+        previous report. The reporter stops on shutdown().
+        """
+        self._metrics_reporter_done = threading.Event()
+        self.runtime.spawn(self._report_metrics, exporter, interval)
+
+    def _report_metrics(self, exporter, interval):
+        previous = {}
+        try:
+            while not self._metrics_stop.wait(interval):
+                try:
+                    metrics = self.get_metrics()
+                    event_metrics.add_rates(metrics['events'], previous,
+                                            interval)
+                    previous = metrics['events']
+                    exporter(metrics)
+                except Exception:
+                    LOG.exception(_LE('Unexpected exception exporting the '
+                                      'notification metrics'))
+        finally:
+            self._metrics_reporter_done.set()
 
     def notify_loop(self):
         while True:
             try:
-                match, event, row, updates = self.notifications.get()
-                if (not isinstance(match, row_event.RowEvent) and
-                        (match, event, row, updates) == (
-                            OvnNbNotifyHandler.STOP_EVENT)):
+                notification, enqueued = self.notifications.get_entry()
+                match, event, row, updates = notification
+                if self._is_stop_event(notification):
                     self.notifications.task_done()
+                    self.executor.shutdown()
                     break
-                match.run(event, row, updates)
-                if match.ONETIME:
-                    self.unwatch_event(match)
+                if match is None:
+                    matching = self.matching_events(event, row, updates)
+                else:
+                    matching = (match,)
+                for match in matching:
+                    self._dispatch(match, row.uuid, enqueued, match.run,
+                                   event, row, updates)
                 self.notifications.task_done()
             except Exception:
                 # If any unexpected exception happens we don't want the
                 # notify_loop to exit.
                 LOG.exception(_LE('Unexpected exception in notify_loop'))
 
+    def _is_stop_event(self, notification):
+        return (not isinstance(notification[0], row_event.RowEvent) and
+                notification == OvnNbNotifyHandler.STOP_EVENT)
+
+    def _get_batch(self):
+        """Collect the notifications received during the batch window
+
+        :returns: (notifications, enqueued, stop) where enqueued maps the
+                  row UUIDs to the time their first notification was
+                  queued, and stop tells whether the STOP_EVENT was received
+        """
+        notification, queued_at = self.notifications.get_entry()
+        batch = []
+        enqueued = {}
+        deadline = time.time() + self.batch_window
+        while True:
+            if self._is_stop_event(notification):
+                self.notifications.task_done()
+                return batch, enqueued, True
+            batch.append(notification)
+            enqueued.setdefault(notification[2].uuid, queued_at)
+            timeout = deadline - time.time()
+            if timeout <= 0:
+                return batch, enqueued, False
+            try:
+                notification, queued_at = self.notifications.get_entry(
+                    timeout=timeout)
+            except Queue.Empty:
+                return batch, enqueued, False
+
+    def run_batch(self, notifications, enqueued=None):
+        changes = collections.OrderedDict()
+        for _match, event, row, updates in notifications:
+            row_changes = changes.setdefault(row.uuid, RowChanges())
+            row_changes.add(event, row, updates)
+
+        batches = collections.OrderedDict()
+        for row_changes in changes.values():
+            if row_changes.deleted:
+                continue
+            for match in self.matching_events(row_changes.event,
+                                              row_changes.row,
+                                              row_changes.old):
+                batches.setdefault(match, []).append(
+                    (row_changes.event, row_changes.row, row_changes.old))
+
+        now = time.time()
+        for match, events in batches.items():
+            if match.ONETIME:
+                events = events[:1]
+            # Split the batch by executor shard so that the events of a row
+            # keep running in order on the same worker.
+            shards = collections.OrderedDict()
+            for event in events:
+                shard = self.executor.shard(event[1].uuid)
+                shards.setdefault(shard, []).append(event)
+            for shard_events in shards.values():
+                # The batch waited as long as its oldest row
+                queued_at = min((enqueued or {}).get(event[1].uuid, now)
+                                for event in shard_events)
+                self._dispatch(match, shard_events[0][1].uuid, queued_at,
+                               match.run_batch, shard_events)
+
+    def notify_batch_loop(self):
+        while True:
+            try:
+                batch, enqueued, stop = self._get_batch()
+                try:
+                    self.run_batch(batch, enqueued)
+                finally:
+                    for notification in batch:
+                        self.notifications.task_done()
+                if stop:
+                    self.executor.shutdown()
+                    break
+            except Exception:
+                # If any unexpected exception happens we don't want the
+                # notify_batch_loop to exit.
+                LOG.exception(_LE('Unexpected exception in '
+                                  'notify_batch_loop'))
+
     def notify(self, event, row, updates=None):
+        if self._defer_matching:
+            # Matching is done on the net effect of the notifications, so
+            # every notification of a watched table has to be queued.
+            if self.watches_change(event, row, updates):
+                if self.snapshot_rows:
+                    # The snapshot must hold the columns of every event
+                    # the net effect may match.
+                    row = idlutils.snapshot_row(
+                        row, self.table_columns(row._table.name))
+                    updates = idlutils.snapshot_row(updates)
+                self.notifications.put((None, event, row, updates))
+            return
         matching = self.matching_events(
             event, row, updates)
+        if matching and self.snapshot_rows:
+            # The old row only holds the columns changed by the update
+            updates = idlutils.snapshot_row(updates)
         for match in matching:
-            self.notifications.put((match, event, row, updates))
+            if self.snapshot_rows:
+                self.notifications.put(
+                    (match, event,
+                     idlutils.snapshot_row(row, match.snapshot_columns()),
+                     updates))
+            else:
+                self.notifications.put((match, event, row, updates))
+
 
+def _log_metrics(metrics):
+    LOG.info("OVN NB notification metrics: %s", metrics)
 
-class OvnIdl(idl.Idl):
+
+class OvnIdl(connection.EventIdl):
 
     def __init__(self, plugin, remote, schema):
         super(OvnIdl, self).__init__(remote, schema)
-        self._lp_update_up_event = LogicalPortUpdateUpEvent(plugin)
-        self._lp_update_down_event = LogicalPortUpdateDownEvent(plugin)
-        self._lp_create_up_event = LogicalPortCreateUpEvent(plugin)
-        self._lp_create_down_event = LogicalPortCreateDownEvent(plugin)
-
-        self.notify_handler = OvnNbNotifyHandler(plugin)
-        self.notify_handler.watch_events([self._lp_create_up_event,
-                                          self._lp_create_down_event,
-                                          self._lp_update_up_event,
-                                          self._lp_update_down_event])
+        self.remote = remote
+        self.event_lock = None
+        runtime = runtime_.get_runtime(cfg.get_ovn_notify_runtime())
+        metrics_interval = cfg.get_ovn_notify_metrics_interval()
+        queue_size = cfg.get_ovn_notify_queue_size()
+
+        self.notify_handler = OvnNbNotifyHandler(
+            plugin, batch_window=cfg.get_ovn_notify_batch_window(),
+            # The workers get the same bound as the notification queue,
+            # which they are fed from
+            executor=event_executor.get_executor(
+                cfg.get_ovn_notify_workers(), runtime, queue_size),
+            runtime=runtime,
+            queue_size=queue_size,
+            queue_policy=cfg.get_ovn_notify_queue_policy(),
+            resync_callback=getattr(plugin, 'resync_dropped_notification',
+                                    None),
+            snapshot_rows=cfg.get_ovn_notify_row_snapshots(),
+            metrics=event_metrics.EventMetrics() if metrics_interval else None)
+        if metrics_interval:
+            self.notify_handler.start_metrics_reporter(
+                getattr(plugin, 'export_notify_metrics', None) or
+                _log_metrics, metrics_interval)
+        self._initial_events = []
+        self._watch_default_events(plugin)
         # ovsdb lock name to acquire.
         # This event lock is used to handle the notify events sent by idl.Idl
         # idl.Idl will call notify function for the "update" rpc method it
@@ -212,16 +716,90 @@ class OvnIdl(idl.Idl):
         #    will assign the lock to one of the other servers.
         self.event_lock_name = "ovn_event_lock"
 
+    def _watch_default_events(self, plugin):
+        self._lp_update_up_event = LogicalPortUpdateUpEvent(plugin)
+        self._lp_update_down_event = LogicalPortUpdateDownEvent(plugin)
+        self._lp_create_up_event = LogicalPortCreateUpEvent(plugin)
+        self._lp_create_down_event = LogicalPortCreateDownEvent(plugin)
+        self._initial_events = [self._lp_create_up_event,
+                                self._lp_create_down_event]
+        self.notify_handler.watch_events([self._lp_create_up_event,
+                                          self._lp_create_down_event,
+                                          self._lp_update_up_event,
+                                          self._lp_update_down_event])
+
+    def set_event_lock(self, shards=1, servers=1):
+        """Request the event lock
+
+        :param shards:  When greater than 1, the rows are split in shards by
+                        UUID and each shard is protected by its own lock, so
+                        that the events are handled by all the servers.
+        :param servers: Expected number of servers sharing the shards
+        """
+        if shards > 1:
+            self.event_lock = event_lock.ShardedLock(
+                self.remote, self.event_lock_name, shards, servers)
+        else:
+            self.set_lock(self.event_lock_name)
+
+    def close(self):
+        if self.event_lock is not None:
+            self.event_lock.close()
+        super(OvnIdl, self).close()
+
+    def run(self):
+        if self.event_lock is not None:
+            self.event_lock.run()
+        return super(OvnIdl, self).run()
+
+    def wait(self, poller):
+        super(OvnIdl, self).wait(poller)
+        if self.event_lock is not None:
+            self.event_lock.wait(poller)
+
+    def _handles(self, row):
+        if self.event_lock is not None:
+            return self.event_lock.owns(row.uuid)
+        return not (self.is_lock_contended and not self.has_lock)
+
     def notify(self, event, row, updates=None):
+        # The waiters are local to this server, whoever owns the lock.
+        super(OvnIdl, self).notify(event, row, updates)
         # Do not handle the notification if the event lock is requested,
         # but not granted by the ovsdb-server.
-        if (self.is_lock_contended and not self.has_lock):
+        if not self._handles(row):
             LOG.debug("Don't have the event lock to handle the notify"
                       " events. Ignoring the event : %s", event)
             return
         LOG.debug("Have the event lock to handle the notify events")
         self.notify_handler.notify(event, row, updates)
 
+    def initial_sync(self):
+        """Hand the current state of the database to the initial events
+
+        Every initial event gets, in a single run_initial() call, the rows of
+        its table matching its conditions. This is meant to be called once
+        the initial dump has been received, with the logical port create
+        events unwatched so that they do not also run for every row.
+        """
+        if (self.event_lock is None and
+                self.is_lock_contended and not self.has_lock):
+            LOG.debug("Don't have the event lock to handle the initial "
+                      "sync. Skipping it.")
+            return
+        for event in self._initial_events:
+            rows = [row for row in self.tables[event.table].rows.values()
+                    if self._handles(row) and
+                    event.matches(event.ROW_CREATE, row)]
+            if self.notify_handler.snapshot_rows:
+                columns = event.snapshot_columns()
+                rows = [idlutils.snapshot_row(row, columns) for row in rows]
+            try:
+                event.run_initial(rows)
+            except Exception:
+                LOG.exception(_LE('Unexpected exception in the initial sync '
+                                  'of %s'), event.event_name)
+
     def unwatch_logical_port_create_events(self):
         """Unwatch the logical port create events.
 
@@ -246,29 +824,94 @@ class OvnConnection(connection.Connection):
             if self.idl is not None:
                 return
 
-            try:
-                helper = idlutils.get_schema_helper(self.connection,
-                                                    self.schema_name)
-            except Exception:
-                # We may have failed do to set-manager not being called
-                helpers.enable_connection_uri(self.connection)
-
-                # There is a small window for a race, so retry up to a second
-                @retrying.retry(wait_exponential_multiplier=10,
-                                stop_max_delay=1000)
-                def do_get_schema_helper():
-                    return idlutils.get_schema_helper(self.connection,
-                                                      self.schema_name)
-                helper = do_get_schema_helper()
-
+            helper = self.get_schema_helper()
             helper.register_all()
             self.idl = OvnIdl(plugin, self.connection, helper)
-            self.idl.set_lock(self.idl.event_lock_name)
+            self.idl.set_event_lock(cfg.get_ovn_event_lock_shards(),
+                                    cfg.get_ovn_event_lock_servers())
+            bulk_initial_sync = cfg.get_ovn_bulk_initial_sync()
+            if bulk_initial_sync:
+                # Hand the initial dump of all the logical ports to the
+                # plugin at once rather than as one create event per port.
+                self.idl.unwatch_logical_port_create_events()
+                idlutils.wait_for_change(self.idl, self.timeout)
+            else:
+                idlutils.wait_for_change(self.idl, self.timeout)
+                # We would have received the initial dump of all the logical
+                # ports as events by now. Unwatch the create events for
+                # logical ports as it is no longer necessary.
+                self.idl.unwatch_logical_port_create_events()
+            self.poller = poller.Poller()
+        # The initial sync may take long with many logical ports, so it runs
+        # without holding the lock. The IDL is only run by the connection
+        # thread, which is started once the sync is done.
+        if bulk_initial_sync:
+            self.idl.initial_sync()
+        self.thread = threading.Thread(target=self.run)
+        self.thread.setDaemon(True)
+        self.thread.start()
+
+
+class OvnSbIdl(OvnIdl):
+    """IDL of the OVN SB, notifying the plugin of the port bindings"""
+
+    def __init__(self, plugin, remote, schema):
+        super(OvnSbIdl, self).__init__(plugin, remote, schema)
+        self.event_lock_name = "ovn_sb_event_lock"
+
+    def _watch_default_events(self, plugin):
+        self.notify_handler.watch_event(PortBindingChassisUpdateEvent(plugin))
+
+
+class OvnSbConnection(connection.Connection):
+    """Connection to the OVN SB monitoring only the given tables
+
+    :param tables:     The columns to monitor indexed by table name, the
+                       columns missing from the schema are skipped
+    :param conditions: The conditions the monitored rows must match indexed
+                       by table name, in the OVSDB monitor_cond format.
+                       They require conditional monitoring support from
+                       the ovs library; without it all the rows are
+                       monitored.
+    """
+
+    def __init__(self, connection, timeout, schema_name, tables,
+                 conditions=None):
+        super(OvnSbConnection, self).__init__(connection, timeout,
+                                              schema_name)
+        self.tables = tables
+        self.conditions = conditions or {}
+
+    def _register_tables(self, helper):
+        schema_tables = helper.schema_json['tables']
+        for table, columns in self.tables.items():
+            helper.register_columns(
+                table, [column for column in columns
+                        if column in schema_tables[table]['columns']])
+
+    def start(self, plugin=None):
+        with self.lock:
+            if self.idl is not None:
+                return
+
+            helper = self.get_schema_helper()
+            self._register_tables(helper)
+            if plugin is None:
+                self.idl = connection.EventIdl(self.connection, helper)
+            else:
+                self.idl = OvnSbIdl(plugin, self.connection, helper)
+                self.idl.set_event_lock(cfg.get_ovn_event_lock_shards(),
+                                        cfg.get_ovn_event_lock_servers())
+            if self.conditions:
+                if hasattr(self.idl, 'cond_change'):
+                    for table, conditions in self.conditions.items():
+                        self.idl.cond_change(table, conditions)
+                else:
+                    LOG.warning(_LW("The ovs library does not support "
+                                    "conditional monitoring, monitoring all "
+                                    "the rows of %s"),
+                                ', '.join(sorted(self.conditions)))
             idlutils.wait_for_change(self.idl, self.timeout)
-            # We would have received the initial dump of all the logical
-            # ports as events by now. Unwatch the create events for
-            # logical ports as it is no longer necessary.
-            self.idl.unwatch_logical_port_create_events()
             self.poller = poller.Poller()
             self.thread = threading.Thread(target=self.run)
             self.thread.setDaemon(True)
@@ -0,0 +1,142 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import abc
+import operator
+import string
+
+import six
+
+from oslo_ovsdb_frontend._i18n import _
+
+_FORMATTER = string.Formatter()
+
+# verb -> (minimum, maximum) number of column arguments
+VERBS = {
+    'set': (1, None),
+    'get': (1, 1),
+    'clear': (1, 1),
+    'destroy': (0, 0),
+}
+
+
+@six.add_metaclass(abc.ABCMeta)
+class PreparedCommand(object):
+    """A command template compiled once and then bound to parameters
+
+    Templates use the ovs-vsctl database command syntax, with {name}
+    placeholders for the record, the map keys and the values:
+
+        set Interface {name} external_ids:iface-id={id} tag=5
+        get Bridge {bridge} external_ids
+        clear Port {port} tag
+        destroy QoS {uuid}
+
+    The template is parsed and validated when the command is prepared, so
+    that bind() only substitutes the parameters and creates the command.
+    As with ovs-vsctl, setting map keys leaves the other keys unchanged.
+    A value made of a single placeholder is bound as is, a value mixing
+    text and placeholders is formatted as a string.
+    """
+
+    def __init__(self, api, template):
+        self.api = api
+        self.template = template
+        self.params = set()
+        tokens = template.split()
+        if len(tokens) < 3 or tokens[0] not in VERBS:
+            self._invalid(_("expected '<verb> <table> <record> ...' with "
+                            "one of the verbs %s") % ', '.join(sorted(VERBS)))
+        self.verb, self.table = tokens[:2]
+        minimum, maximum = VERBS[self.verb]
+        args = tokens[3:]
+        if len(args) < minimum or (maximum is not None and
+                                   len(args) > maximum):
+            self._invalid(_("wrong number of arguments for %s") % self.verb)
+        self._validate_table()
+        self._record = self._compile(tokens[2])
+        self._args = [self._compile_arg(arg) for arg in args]
+
+    def _invalid(self, reason):
+        raise RuntimeError(_("Invalid command template '%(template)s': "
+                             "%(reason)s") % {'template': self.template,
+                                              'reason': reason})
+
+    def _compile(self, token, convert=None):
+        """Return a function of the parameters returning the token value"""
+        names = [name for _text, name, _spec, _conversion
+                 in _FORMATTER.parse(token) if name is not None]
+        if not names:
+            value = convert(token) if convert else token
+            return lambda params: value
+        if any(not name for name in names):
+            self._invalid(_("placeholders must be named"))
+        self.params.update(names)
+        if len(names) == 1 and token == '{%s}' % names[0]:
+            return operator.itemgetter(names[0])
+        return lambda params: token.format(**params)
+
+    def _compile_arg(self, arg):
+        column, value = arg, None
+        if self.verb == 'set':
+            column, sep, value = arg.partition('=')
+            if not sep:
+                self._invalid(_("expected column[:key]=value, got %s") % arg)
+        column, _sep, key = column.partition(':')
+        if key and self.verb != 'set':
+            self._invalid(_("map keys are only supported by set"))
+        self._validate_column(column, bool(key))
+        if key:
+            key = self._compile(key)
+        if value is not None:
+            value = self._compile(value, self._converter(column, bool(key)))
+        return column, key or None, value
+
+    def _validate_table(self):
+        """Check the table of the template, no schema by default"""
+
+    def _validate_column(self, column, has_key):
+        """Check a column of the template, no schema by default"""
+
+    def _converter(self, column, has_key):
+        """Return the conversion of the literal values of a column"""
+        return None
+
+    def bind(self, **params):
+        """Return the command of the template with the given parameters"""
+        missing = self.params.difference(params)
+        if missing:
+            raise RuntimeError(_("Missing parameters %(missing)s for "
+                                 "'%(template)s'") % {
+                                     'missing': ', '.join(sorted(missing)),
+                                     'template': self.template})
+        return self._command(
+            self._record(params),
+            [(column,
+              None if key is None else key(params),
+              None if value is None else value(params))
+             for column, key, value in self._args])
+
+    def execute(self, check_error=False, log_errors=True, **params):
+        """Bind the parameters and execute the command immediately"""
+        return self.bind(**params).execute(check_error=check_error,
+                                           log_errors=log_errors)
+
+    @abc.abstractmethod
+    def _command(self, record, args):
+        """Create the command
+
+        :param record: The bound record
+        :param args:   The bound (column, key, value) arguments, key and
+                       value are None when not in the template
+        :returns:      :class:`Command`
+        """
@@ -10,10 +10,13 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import collections
 import uuid
 
+from oslo_utils import importutils
 import six
+from six.moves import collections_abc
+
+numpy = importutils.try_import('numpy')
 
 
 def ovn_name(id):
@@ -36,9 +39,67 @@ def ovn_lrouter_port_name(id):
     return 'lrp-%s' % id
 
 
+def ovn_addrset_name(sg_id, ip_version):
+    # The name of the address set for the given security group id and
+    # ip version. The format is:
+    #   as-<ip version>-<security group uuid>
+    # with all '-' replaced with '_', as address set names can only contain
+    # letters, digits, '_' and '.' to be referenced from ACL matches.
+    return ('as-%s-%s' % (ip_version, sg_id)).replace('-', '_')
+
+
+def ovn_addrset_match(field, addrset_name):
+    """Return an ACL match on the addresses of an address set
+
+    :param field:        The match field, e.g. 'ip4.src'
+    :param addrset_name: The name of the address set
+    """
+    return '%s == $%s' % (field, addrset_name)
+
+
+def _sort_key(value):
+    # Values of different types do not compare on python 3, so they are
+    # ordered by type first
+    if isinstance(value, tuple):
+        return (type(value).__name__, tuple(_sort_key(v) for v in value))
+    return (type(value).__name__, value)
+
+
+def freeze(value, unordered=False, convert=None):
+    """Return a hashable copy of a value made of mappings and sequences
+
+    Mappings become tuples of (key, value) pairs sorted by key, sequences
+    become tuples. The items are sorted by type first, so that values of
+    mixed types can be sorted.
+
+    :param unordered: Sort the sequences too, as for OVSDB sets
+    :param convert:   Function applied to the other values
+    """
+    if isinstance(value, collections_abc.Mapping):
+        return tuple(sorted(((freeze(k, unordered, convert),
+                              freeze(v, unordered, convert))
+                             for k, v in value.items()), key=_sort_key))
+    if (isinstance(value, collections_abc.Sequence)
+            and not isinstance(value, six.string_types)):
+        values = (freeze(v, unordered, convert) for v in value)
+        if unordered:
+            return tuple(sorted(values, key=_sort_key))
+        return tuple(values)
+    return value if convert is None else convert(value)
+
+
+def acl_key(acl):
+    """Return a hashable key identifying an ACL dictionary
+
+    Two ACL dictionaries have the same key if and only if they are equal,
+    whatever the order of their items.
+    """
+    return freeze(acl)
+
+
 def val_to_py(val):
     """Convert a json ovsdb return value to native python object"""
-    if isinstance(val, collections.Sequence) and len(val) == 2:
+    if isinstance(val, collections_abc.Sequence) and len(val) == 2:
         if val[0] == "uuid":
             return uuid.UUID(val[1])
         elif val[0] == "set":
@@ -67,10 +128,10 @@ def set_colval_args(*col_values):
             col, op, val = entry[0], '=', entry[1]
         else:
             col, op, val = entry
-        if isinstance(val, collections.Mapping):
+        if isinstance(val, collections_abc.Mapping):
             args += ["%s:%s%s%s" % (
                 col, k, op, py_to_val(v)) for k, v in val.items()]
-        elif (isinstance(val, collections.Sequence)
+        elif (isinstance(val, collections_abc.Sequence)
                 and not isinstance(val, six.string_types)):
             if len(val) == 0:
                 args.append("%s%s%s" % (col, op, "[]"))
@@ -80,3 +141,36 @@ def set_colval_args(*col_values):
         else:
             args.append("%s%s%s" % (col, op, py_to_val(val)))
     return args
+
+
+def _is_number(value):
+    return (isinstance(value, six.integer_types + (float,))
+            and not isinstance(value, bool))
+
+
+def to_columnar(columns, rows, get_value, numeric=None):
+    """Return the values of rows as one sequence per column
+
+    :param columns:   The columns to return
+    :param rows:      The rows, in any form get_value reads
+    :param get_value: Called with a row and a column, returns the value
+    :param numeric:   The columns holding numbers, or None to consider the
+                      columns whose values are all numbers
+    :returns:         {column: list of values}, with the numeric columns as
+                      NumPy arrays when NumPy is installed
+    """
+    result = dict((col, []) for col in columns)
+    appends = [(col, result[col].append) for col in columns]
+    for row in rows:
+        for col, append in appends:
+            append(get_value(row, col))
+    if numpy is None:
+        return result
+    for col, values in result.items():
+        if numeric is None:
+            is_numeric = bool(values) and all(_is_number(v) for v in values)
+        else:
+            is_numeric = col in numeric
+        if is_numeric:
+            result[col] = numpy.array(values)
+    return result
@@ -0,0 +1,66 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from ovs.db import idl as ovs_idl
+
+# Port table of the Open_vSwitch schema, with a few of its columns
+OVS_PORT_SCHEMA = {
+    "name": "Open_vSwitch", "version": "7.12.1",
+    "tables": {
+        "Port": {
+            "columns": {"name": {"type": "string"},
+                        "tag": {"type": "integer"},
+                        "external_ids": {"type": {
+                            "key": "string", "value": "string",
+                            "min": 0, "max": "unlimited"}}},
+            "indexes": [["name"]],
+            "isRoot": True,
+        }
+    }
+}
+
+# Address_Set table of the OVN_Northbound schema
+OVN_ADDRESS_SET_SCHEMA = {
+    "name": "OVN_Northbound", "version": "2.1.0",
+    "tables": {
+        "Address_Set": {
+            "columns": {"name": {"type": "string"},
+                        "addresses": {"type": {
+                            "key": "string", "min": 0, "max": "unlimited"}},
+                        "external_ids": {"type": {
+                            "key": "string", "value": "string",
+                            "min": 0, "max": "unlimited"}}},
+            "indexes": [["name"]],
+            "isRoot": True,
+        }
+    }
+}
+
+
+def create_idl(schema, idl_class=ovs_idl.Idl, *args):
+    """Return an IDL of all the tables of a schema, not connected"""
+    helper = ovs_idl.SchemaHelper(schema_json=schema)
+    helper.register_all()
+    return idl_class(*(args or ("remote",)) + (helper,))
+
+
+def create_row(idl, table, row_uuid, row_json, insert=False):
+    """Return a row of an IDL table built from its OVSDB JSON
+
+    :param insert: Also add the row to the rows of the table, as if it had
+                   been received from the server
+    """
+    table = idl.tables[table]
+    row = ovs_idl.Row.from_json(idl, table, row_uuid, row_json)
+    if insert:
+        table.rows[row_uuid] = row
+    return row
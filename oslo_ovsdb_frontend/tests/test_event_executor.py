@@ -0,0 +1,77 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+
+from oslotest import base
+
+from oslo_ovsdb_frontend.impl.native import event_executor
+from oslo_ovsdb_frontend.impl.native import runtime
+
+
+class TestShardedExecutor(base.BaseTestCase):
+
+    def test_queue_size_shared_by_workers(self):
+        executor = event_executor.get_executor(3, runtime.ThreadingRuntime(),
+                                               queue_size=2)
+        release = threading.Event()
+        running = threading.Event()
+
+        def work():
+            running.set()
+            release.wait(5)
+
+        # Keep the worker of the key busy, so the following work stays queued
+        executor.submit('key', work)
+        self.assertTrue(running.wait(5))
+        executor.submit('key', work)
+        executor.submit('key', work)
+        submitted = threading.Event()
+
+        def submit():
+            # Whatever worker handles the key, all the slots are taken
+            executor.submit('other', lambda: None)
+            submitted.set()
+        threading.Thread(target=submit).start()
+        self.assertFalse(submitted.wait(0.2))
+        self.assertEqual(2, executor.depth())
+        release.set()
+        self.assertTrue(submitted.wait(5))
+        executor.shutdown()
+        executor.wait()
+
+    def test_submit_blocks_when_worker_queue_full(self):
+        executor = event_executor.ShardedExecutor(
+            1, runtime.ThreadingRuntime(), queue_size=1)
+        release = threading.Event()
+        running = threading.Event()
+
+        def work():
+            running.set()
+            release.wait(5)
+
+        executor.submit('key', work)
+        self.assertTrue(running.wait(5))
+        # The worker is busy, one more piece of work fits in its queue
+        executor.submit('key', work)
+        submitted = threading.Event()
+
+        def submit():
+            executor.submit('key', work)
+            submitted.set()
+        threading.Thread(target=submit).start()
+        self.assertFalse(submitted.wait(0.2))
+        self.assertEqual(1, executor.depth())
+        release.set()
+        self.assertTrue(submitted.wait(5))
+        executor.shutdown()
+        executor.wait()
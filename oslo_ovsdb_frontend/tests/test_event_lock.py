@@ -0,0 +1,104 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import uuid
+
+import mock
+from oslotest import base
+
+from oslo_ovsdb_frontend.impl.native import event_lock
+
+Message = event_lock.jsonrpc.Message
+
+
+class TestShardedLock(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestShardedLock, self).setUp()
+        self.session = mock.Mock()
+        self.session.is_connected.return_value = True
+        self.session.get_seqno.return_value = 1
+        self.session.recv.return_value = None
+        mock.patch.object(event_lock.jsonrpc.Session, 'open',
+                          return_value=self.session).start()
+        self.addCleanup(mock.patch.stopall)
+
+    def _create(self, shards=2, servers=1):
+        self.lock = event_lock.ShardedLock('remote', 'ovn_event_lock',
+                                           shards, servers)
+        self.lock.run()
+
+    def _sent(self):
+        return [(c[0][0].method, c[0][0].params)
+                for c in self.session.send.call_args_list]
+
+    def _request(self, method, name):
+        return next(c[0][0]
+                    for c in reversed(self.session.send.call_args_list)
+                    if c[0][0].method == method and c[0][0].params == [name])
+
+    def _reply(self, method, name, locked):
+        return Message.create_reply({'locked': locked},
+                                    self._request(method, name).id)
+
+    def _receive(self, *msgs):
+        self.session.recv.side_effect = list(msgs) + [None]
+        self.lock.run()
+
+    def test_shard_ownership(self):
+        self._create()
+        self.assertEqual([('lock', ['ovn_event_lock_0']),
+                          ('lock', ['ovn_event_lock_1'])], self._sent())
+        self._receive(self._reply('lock', 'ovn_event_lock_0', True),
+                      self._reply('lock', 'ovn_event_lock_1', False))
+        self.assertTrue(self.lock.owns(uuid.UUID(int=2)))
+        self.assertFalse(self.lock.owns(uuid.UUID(int=3)))
+        self._receive(Message.create_notify('locked', ['ovn_event_lock_1']))
+        self.assertTrue(self.lock.owns(uuid.UUID(int=3)))
+
+    def test_steal_fair_share(self):
+        self._create(shards=4, servers=2)
+        self._receive(*[self._reply('lock', name, False)
+                        for name in self.lock.names])
+        stolen = [params[0] for method, params in self._sent()[4:]]
+        self.assertEqual(2, len(stolen))
+        self.assertTrue(all(method == 'steal'
+                            for method, _params in self._sent()[4:]))
+        self._receive(*[self._reply('steal', name, True)
+                        for name in stolen])
+        self.assertEqual(set(stolen), self.lock.owned_shards())
+        # The shards are stolen once per session
+        self._receive(Message.create_notify('stolen', stolen[:1]))
+        self.assertEqual(set(stolen[1:]), self.lock.owned_shards())
+        self.assertEqual(6, self.session.send.call_count)
+
+    def test_no_steal_with_fair_share(self):
+        self._create(shards=4, servers=2)
+        self._receive(self._reply('lock', 'ovn_event_lock_0', True),
+                      self._reply('lock', 'ovn_event_lock_1', True),
+                      self._reply('lock', 'ovn_event_lock_2', False),
+                      self._reply('lock', 'ovn_event_lock_3', False))
+        self.assertEqual(4, self.session.send.call_count)
+
+    def test_error_reply(self):
+        self._create(shards=2, servers=2)
+        error = Message.create_error(
+            'failed', self._request('lock', 'ovn_event_lock_0').id)
+        self._receive(error, self._reply('lock', 'ovn_event_lock_1', False))
+        self.assertFalse(self.lock.owns(uuid.UUID(int=0)))
+        # The failed request does not prevent stealing the fair share
+        self.assertEqual('steal', self._sent()[-1][0])
+
+    def test_close(self):
+        self._create()
+        self.lock.close()
+        self.session.close.assert_called_once_with()
@@ -0,0 +1,64 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import uuid
+
+import mock
+from oslotest import base
+
+from oslo_ovsdb_frontend import exceptions
+from oslo_ovsdb_frontend.impl.native import connection
+from oslo_ovsdb_frontend.impl.native import idlutils
+from oslo_ovsdb_frontend.tests import helpers
+
+
+class TestMutationHelpers(base.BaseTestCase):
+
+    def test_add_to_set_mutation(self):
+        row = mock.Mock()
+        with mock.patch.object(idlutils, '_HAS_SET_MUTATIONS', True):
+            idlutils.add_to_set(row, 'ports', 'a', 'b')
+        row.addvalue.assert_has_calls([mock.call('ports', 'a'),
+                                       mock.call('ports', 'b')])
+        self.assertFalse(row.verify.called)
+
+    def test_remove_from_set_rewrite(self):
+        port_a, port_b = mock.Mock(uuid=1), mock.Mock(uuid=2)
+        row = mock.Mock(ports=[port_a, port_b])
+        with mock.patch.object(idlutils, '_HAS_SET_MUTATIONS', False):
+            idlutils.remove_from_set(row, 'ports', 1)
+        row.verify.assert_called_once_with('ports')
+        self.assertEqual([port_b], row.ports)
+
+    def test_set_map_key(self):
+        row = mock.Mock(external_ids={'a': '1'})
+        with mock.patch.object(idlutils, '_HAS_MAP_MUTATIONS', False):
+            idlutils.set_map_key(row, 'external_ids', 'b', '2')
+        self.assertEqual({'a': '1', 'b': '2'}, row.external_ids)
+        with mock.patch.object(idlutils, '_HAS_MAP_MUTATIONS', True):
+            idlutils.set_map_key(row, 'external_ids', 'c', '3')
+        row.setkey.assert_called_once_with('external_ids', 'c', '3')
+
+
+class TestRowsByRecords(base.BaseTestCase):
+
+    def test_rows_by_records(self):
+        idl = helpers.create_idl(helpers.OVS_PORT_SCHEMA, connection.EventIdl)
+        rows = dict((name, helpers.create_row(idl, 'Port', uuid.uuid4(),
+                                              {"name": name}, insert=True))
+                    for name in ('p1', 'p2'))
+        result = idlutils.rows_by_records(
+            idl, 'Port', ['p1', str(rows['p2'].uuid), 'p3'], if_exists=True)
+        self.assertEqual({'p1': rows['p1'],
+                          str(rows['p2'].uuid): rows['p2']}, result)
+        self.assertRaises(exceptions.RowNotFound, idlutils.rows_by_records,
+                          idl, 'Port', ['p3'])
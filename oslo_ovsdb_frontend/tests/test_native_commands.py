@@ -0,0 +1,88 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import uuid
+
+import mock
+from oslotest import base
+
+from oslo_ovsdb_frontend.impl.native import commands
+from oslo_ovsdb_frontend.impl.native import connection
+from oslo_ovsdb_frontend.impl.native import idlutils
+from oslo_ovsdb_frontend.impl import utils
+from oslo_ovsdb_frontend.tests import helpers
+
+
+class TestDbCommands(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestDbCommands, self).setUp()
+        self.api = mock.Mock(idl=helpers.create_idl(helpers.OVS_PORT_SCHEMA,
+                                                    connection.EventIdl))
+        self.api._tables = self.api.idl.tables
+
+    def _add_port(self, row_json):
+        return helpers.create_row(self.api.idl, 'Port', uuid.uuid4(),
+                                  row_json, insert=True)
+
+    def test_db_find_iter(self):
+        for name in ('a1', 'a2', 'b1', 'a3'):
+            self._add_port({"name": name})
+        command = commands.DbFindCommand(
+            self.api, 'Port', ('name', '!=', 'b1'), columns=['name'],
+            limit=2, iterate=True)
+        command.run_idl(None)
+        self.assertEqual(2, len(list(command.result)))
+
+    def test_db_find_iter_matches_within_txn(self):
+        ports = [self._add_port({"name": name}) for name in ('a1', 'b1')]
+        command = commands.DbFindCommand(
+            self.api, 'Port', ('name', '=', 'a1'), columns=['name'],
+            iterate=True)
+        command.run_idl(None)
+        # Changes after the transaction do not change the matching rows
+        # The IDL updates its rows in place
+        ports[1]._data.update(self._add_port({"name": "a1"})._data)
+        self.assertEqual([{'name': 'a1'}], list(command.result))
+
+    def test_db_list_iter_skips_deleted_rows(self):
+        ports = [self._add_port({"name": name}) for name in ('p1', 'p2')]
+        command = commands.DbListCommand(self.api, 'Port', None, ['name'],
+                                         False, iterate=True)
+        command.run_idl(None)
+        del self.api.idl.tables['Port'].rows[ports[0].uuid]
+        self._add_port({"name": "p3"})
+        self.assertEqual([{'name': 'p2'}], list(command.result))
+
+    def test_row_views(self):
+        self._add_port({"name": "p1"})
+        command = commands.DbListCommand(self.api, 'Port', None, ['name'],
+                                         False, row_views=True)
+        command.run_idl(None)
+        view = command.result[0]
+        self.assertIsInstance(view, idlutils.RowView)
+        self.assertEqual('p1', view['name'])
+        self.assertRaises(KeyError, view.__getitem__, 'tag')
+        self.assertEqual({'name': 'p1'}, view.to_dict())
+
+    def test_columnar(self):
+        for tag in range(3):
+            self._add_port({"name": "p%d" % tag, "tag": tag})
+        with mock.patch.object(utils, 'numpy') as numpy:
+            command = commands.DbFindCommand(
+                self.api, 'Port', ('name', '!=', 'p0'),
+                columns=['name', 'tag'], columnar=True)
+            command.run_idl(None)
+            numpy.array.assert_called_once_with(mock.ANY)
+        self.assertEqual(numpy.array.return_value, command.result['tag'])
+        self.assertEqual([1, 2], sorted(numpy.array.call_args[0][0]))
+        self.assertEqual(['p1', 'p2'], sorted(command.result['name']))
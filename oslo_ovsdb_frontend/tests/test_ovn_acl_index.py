@@ -0,0 +1,97 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import uuid
+
+from oslotest import base
+
+from oslo_ovsdb_frontend.impl.native import connection
+from oslo_ovsdb_frontend.impl import ovn_acl_index
+from oslo_ovsdb_frontend.tests import helpers
+
+
+class TestAclIndex(base.BaseTestCase):
+
+    SCHEMA = {
+        "name": "OVN_Northbound", "version": "2.0.1",
+        "tables": {
+            "ACL": {
+                "columns": {
+                    "match": {"type": "string"},
+                    "external_ids": {"type": {"key": "string",
+                                              "value": "string",
+                                              "min": 0,
+                                              "max": "unlimited"}}},
+                "isRoot": False,
+            },
+            "Logical_Switch": {
+                "columns": {
+                    "name": {"type": "string"},
+                    "acls": {"type": {"key": {"type": "uuid",
+                                              "refTable": "ACL",
+                                              "refType": "strong"},
+                                      "min": 0,
+                                      "max": "unlimited"}}},
+                "isRoot": True,
+            }
+        }
+    }
+
+    def setUp(self):
+        super(TestAclIndex, self).setUp()
+        self.idl = helpers.create_idl(self.SCHEMA, connection.EventIdl)
+        self.index = ovn_acl_index.AclIndex(self.idl)
+        self.index.start()
+        self.switch_uuid = uuid.uuid4()
+
+    def _notify(self, table, event, row_uuid, row_json):
+        row = helpers.create_row(self.idl, table, row_uuid, row_json,
+                                 insert=event != 'delete')
+        if event == 'delete':
+            del self.idl.tables[table].rows[row_uuid]
+        self.idl.notify(event, row)
+
+    def _add_acl(self, lport, match):
+        acl_uuid = uuid.uuid4()
+        # The switch update may be notified before the ACL creation
+        acls = [acl for acl in self.index.get_switch_acls('sw')] + [acl_uuid]
+        self._notify('Logical_Switch', 'update', self.switch_uuid,
+                     {"name": "sw",
+                      "acls": ["set", [["uuid", str(u)] for u in acls]]})
+        self._notify('ACL', 'create', acl_uuid,
+                     {"match": match,
+                      "external_ids": ["map", [["neutron:lport", lport]]]})
+        return acl_uuid
+
+    def test_index(self):
+        self._notify('Logical_Switch', 'create', self.switch_uuid,
+                     {"name": "sw"})
+        acl1 = self._add_acl('p1', 'ip4')
+        acl2 = self._add_acl('p1', 'ip6')
+        acl3 = self._add_acl('p2', 'ip4')
+        self.assertEqual(self.switch_uuid, self.index.get_switch_uuid('sw'))
+        acls = self.index.get_port_acls('sw', 'p1')
+        self.assertEqual(set([acl1, acl2]), set(acls))
+        self.assertEqual({'lport': 'p1', 'lswitch': 'sw', 'match': 'ip4',
+                          'external_ids': {'neutron:lport': 'p1'}},
+                         acls[acl1])
+        self.assertEqual(set([acl1, acl3]),
+                         self.index.get_match_acls('sw', ['ip4']))
+
+        self._notify('Logical_Switch', 'update', self.switch_uuid,
+                     {"name": "sw",
+                      "acls": ["set", [["uuid", str(acl2)],
+                                       ["uuid", str(acl3)]]]})
+        self._notify('ACL', 'delete', acl1, {"match": "ip4"})
+        self.assertEqual([acl2], list(self.index.get_port_acls('sw', 'p1')))
+        self.assertEqual(set([acl3]),
+                         self.index.get_match_acls('sw', ['ip4']))
@@ -0,0 +1,194 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import uuid
+
+import mock
+from oslotest import base
+from ovs.db import idl as ovs_idl
+
+from oslo_ovsdb_frontend.impl import ovn_commands
+from oslo_ovsdb_frontend.impl import utils
+from oslo_ovsdb_frontend.tests import helpers
+
+LPORT_SCHEMA = {
+    "name": "OVN_Northbound", "version": "2.0.1",
+    "tables": {
+        "Logical_Port": {
+            "columns": {
+                "name": {"type": "string"},
+                "addresses": {"type": {"key": "string", "min": 0,
+                                       "max": "unlimited"}}},
+            "isRoot": False,
+        },
+        "Logical_Switch": {
+            "columns": {
+                "name": {"type": "string"},
+                "ports": {"type": {"key": {"type": "uuid",
+                                           "refTable": "Logical_Port",
+                                           "refType": "strong"},
+                                   "min": 0, "max": "unlimited"}}},
+            "isRoot": True,
+        }
+    }
+}
+
+
+class TestACLDiff(base.BaseTestCase):
+
+    def _acl(self, port, match):
+        return {'lswitch': 'neutron-net', 'lport': port, 'priority': 1002,
+                'direction': 'to-lport', 'match': match, 'action': 'allow',
+                'external_ids': {'neutron:lport': port}}
+
+    def test_acl_key_ignores_order(self):
+        acl = self._acl('p1', 'ip4')
+        reordered = dict(reversed(list(acl.items())))
+        self.assertEqual(utils.acl_key(acl), utils.acl_key(reordered))
+        self.assertNotEqual(utils.acl_key(acl),
+                            utils.acl_key(self._acl('p2', 'ip4')))
+
+    def test_compute_acl_differences(self):
+        kept, old, new = (self._acl('p1', 'ip4'), self._acl('p1', 'ip6'),
+                          self._acl('p2', 'tcp'))
+        acl_obj_dict = {utils.acl_key(kept): 'kept-row',
+                        utils.acl_key(old): 'old-row'}
+        command = ovn_commands.UpdateACLsCommand(mock.Mock(), [], [], {})
+        acl_del, acl_add = command._compute_acl_differences(
+            [{'id': 'p1', 'network_id': 'net'},
+             {'id': 'p2', 'network_id': 'net'}],
+            {'p1': [kept, old]},
+            {'p1': [dict(kept)], 'p2': [new]},
+            acl_obj_dict)
+        self.assertEqual({'net': ['old-row']}, acl_del)
+        self.assertEqual(['tcp'], [acl['match'] for acl in acl_add['net']])
+        self.assertNotIn('lport', acl_add['net'][0])
+
+
+class TestLogicalPortsCommands(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestLogicalPortsCommands, self).setUp()
+        self.idl = helpers.create_idl(LPORT_SCHEMA)
+        self.api = mock.Mock(idl=self.idl, _tables=self.idl.tables)
+        self.p1 = self._row('Logical_Port', {"name": "p1",
+                                             "addresses": ["set", []]})
+        self.lswitch = self._row('Logical_Switch', {
+            "name": "sw", "ports": ["set", [["uuid", str(self.p1.uuid)]]]})
+        self.txn = ovs_idl.Transaction(self.idl)
+
+    def _row(self, table, row_json):
+        return helpers.create_row(self.idl, table, uuid.uuid4(), row_json,
+                                  insert=True)
+
+    def _ports(self, name):
+        return [port for port in self.idl.tables['Logical_Port'].rows.values()
+                if port.name == name]
+
+    def _add(self, lports, may_exist=False):
+        ovn_commands.AddLogicalPortsCommand(
+            self.api, 'sw', lports, may_exist).run_idl(self.txn)
+
+    def _delete(self, lports, if_exists=False):
+        ovn_commands.DelLogicalPortsCommand(
+            self.api, 'sw', lports, if_exists).run_idl(self.txn)
+
+    def test_add_lports(self):
+        self._add([('p2', {'addresses': ['a']}), ('p3', {})])
+        self.assertEqual(['p1', 'p2', 'p3'],
+                         sorted(port.name for port in self.lswitch.ports))
+        self.assertEqual(['a'], self._ports('p2')[0].addresses)
+
+    def test_add_lports_may_exist(self):
+        self._add([('p1', {}), ('p2', {}), ('p2', {})], may_exist=True)
+        self.assertEqual(['p1', 'p2'],
+                         sorted(port.name for port in self.lswitch.ports))
+        self.assertEqual(1, len(self._ports('p1')))
+        self.assertEqual(1, len(self._ports('p2')))
+
+    def test_add_lports_repeated_name(self):
+        self.assertRaises(RuntimeError, self._add, [('p2', {}), ('p2', {})])
+
+    def test_add_lports_missing_lswitch(self):
+        self.assertRaises(RuntimeError, ovn_commands.AddLogicalPortsCommand(
+            self.api, 'sw2', [('p2', {})], False).run_idl, self.txn)
+
+    def test_delete_lports(self):
+        self._delete(['p1'])
+        self.assertEqual([], self.lswitch.ports)
+        self.assertEqual([], self._ports('p1'))
+
+    def test_delete_lports_if_exists(self):
+        self.assertRaises(RuntimeError, self._delete, ['p1', 'p2'])
+        self._delete(['p1', 'p2'], if_exists=True)
+        self.assertEqual([], self.lswitch.ports)
+        self.assertEqual([], self._ports('p1'))
+
+
+class TestAddrSetCommands(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestAddrSetCommands, self).setUp()
+        self.idl = helpers.create_idl(helpers.OVN_ADDRESS_SET_SCHEMA)
+        self.api = mock.Mock(idl=self.idl, _tables=self.idl.tables)
+        helpers.create_row(self.idl, 'Address_Set', uuid.uuid4(), {
+            "name": "as1", "addresses": ["set", ["a", "b"]],
+            "external_ids": ["map", []]}, insert=True)
+        self.txn = ovs_idl.Transaction(self.idl)
+
+    def _addrsets(self):
+        return dict((row.name, row) for row in
+                    self.idl.tables['Address_Set'].rows.values())
+
+    def test_add_addrset(self):
+        ovn_commands.AddAddrSetCommand(
+            self.api, 'as2', False, addresses=['c']).run_idl(self.txn)
+        self.assertEqual(['c'], self._addrsets()['as2'].addresses)
+
+    def test_add_addrset_may_exist(self):
+        ovn_commands.AddAddrSetCommand(
+            self.api, 'as1', True, addresses=['c']).run_idl(self.txn)
+        self.assertEqual(1, len(self.idl.tables['Address_Set'].rows))
+        self.assertEqual(['a', 'b'], self._addrsets()['as1'].addresses)
+
+    def test_add_addrsets(self):
+        ovn_commands.AddAddrSetsCommand(
+            self.api, [('as1', {'addresses': ['c']}),
+                       ('as2', {'addresses': ['d']})], True).run_idl(self.txn)
+        addrsets = self._addrsets()
+        self.assertEqual(['as1', 'as2'], sorted(addrsets))
+        self.assertEqual(['a', 'b'], addrsets['as1'].addresses)
+        self.assertEqual(['d'], addrsets['as2'].addresses)
+
+    def test_del_addrset(self):
+        ovn_commands.DelAddrSetCommand(
+            self.api, 'as1', False).run_idl(self.txn)
+        self.assertEqual({}, self._addrsets())
+
+    def test_del_addrset_if_exists(self):
+        ovn_commands.DelAddrSetCommand(
+            self.api, 'as2', True).run_idl(self.txn)
+        self.assertEqual(['as1'], list(self._addrsets()))
+        self.assertRaises(RuntimeError, ovn_commands.DelAddrSetCommand(
+            self.api, 'as2', False).run_idl, self.txn)
+
+    def test_update_addrsets(self):
+        ovn_commands.UpdateAddrSetsCommand(
+            self.api, {'as1': (['c'], ['a']), 'as2': (['d'], [])},
+            True).run_idl(self.txn)
+        self.assertEqual(['b', 'c'],
+                         sorted(self._addrsets()['as1'].addresses))
+        self.assertEqual(['as1'], list(self._addrsets()))
+
+    def test_update_addrsets_missing(self):
+        self.assertRaises(RuntimeError, ovn_commands.UpdateAddrSetsCommand(
+            self.api, {'as2': (['d'], [])}, False).run_idl, self.txn)
@@ -0,0 +1,103 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import uuid
+
+from oslotest import base
+from ovs.db import idl as ovs_idl
+
+from oslo_ovsdb_frontend.impl.native import connection
+from oslo_ovsdb_frontend.impl import ovn_acl_index
+from oslo_ovsdb_frontend.impl import ovn_native
+from oslo_ovsdb_frontend.tests import helpers
+
+ACL_SCHEMA = {
+    "name": "OVN_Northbound", "version": "2.0.1",
+    "tables": {
+        "ACL": {
+            "columns": {
+                "match": {"type": "string"},
+                "external_ids": {"type": {"key": "string",
+                                          "value": "string",
+                                          "min": 0, "max": "unlimited"}}},
+            "isRoot": False,
+        },
+        "Logical_Switch": {
+            "columns": {
+                "name": {"type": "string"},
+                "acls": {"type": {"key": {"type": "uuid",
+                                          "refTable": "ACL",
+                                          "refType": "strong"},
+                                  "min": 0, "max": "unlimited"}}},
+            "isRoot": True,
+        }
+    }
+}
+
+
+def _create_api(schema, idl_class=ovs_idl.Idl):
+    # Only the IDL is needed, not the connection set up by __init__
+    api = ovn_native.OvsdbOvnIdl.__new__(ovn_native.OvsdbOvnIdl)
+    api.idl = helpers.create_idl(schema, idl_class)
+    return api
+
+
+class TestOvsdbOvnIdlAddressSets(base.BaseTestCase):
+
+    def test_get_all_address_sets(self):
+        api = _create_api(helpers.OVN_ADDRESS_SET_SCHEMA)
+        helpers.create_row(api.idl, 'Address_Set', uuid.uuid4(), {
+            "name": "as1", "addresses": ["set", ["a", "b"]],
+            "external_ids": ["map", [["owner", "neutron"]]]}, insert=True)
+        self.assertEqual({'as1': {'addresses': ['a', 'b'],
+                                  'external_ids': {'owner': 'neutron'}}},
+                         api.get_all_address_sets())
+
+    def test_address_sets_not_supported(self):
+        api = _create_api(helpers.OVS_PORT_SCHEMA)
+        self.assertRaises(RuntimeError, api.get_all_address_sets)
+        self.assertRaises(RuntimeError, api.create_address_set, 'as1')
+        self.assertRaises(RuntimeError, api.update_address_sets, {})
+
+
+class TestOvsdbOvnIdlAcls(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestOvsdbOvnIdlAcls, self).setUp()
+        self.api = _create_api(ACL_SCHEMA, connection.EventIdl)
+        acl = helpers.create_row(self.api.idl, 'ACL', uuid.uuid4(), {
+            "match": "ip4",
+            "external_ids": ["map", [["neutron:lport", "p1"]]]}, insert=True)
+        self.lswitch = helpers.create_row(
+            self.api.idl, 'Logical_Switch', uuid.uuid4(),
+            {"name": "neutron-net", "acls": ["uuid", str(acl.uuid)]},
+            insert=True)
+        self.api.acl_index = ovn_acl_index.AclIndex(self.api.idl)
+        self.api.acl_index.start()
+        self.txn = ovs_idl.Transaction(self.api.idl)
+
+    def _update_acls(self, network, port, match):
+        acl = {'lswitch': 'neutron-%s' % network, 'lport': port,
+               'match': match, 'external_ids': {'neutron:lport': port}}
+        self.api.update_acls(
+            [network], [{'id': port, 'network_id': network}],
+            {port: [acl]}).run_idl(self.txn)
+
+    def test_update_acls_with_pending_changes(self):
+        self.api.delete_acl('neutron-net', 'p1').run_idl(self.txn)
+        self._update_acls('net', 'p1', 'tcp')
+        self.assertEqual(['tcp'], [acl.match for acl in self.lswitch.acls])
+        # An lswitch inserted in the same transaction
+        self.api.create_lswitch('neutron-net2').run_idl(self.txn)
+        self._update_acls('net2', 'p2', 'udp')
+        lswitch = self.api._get_lswitch('neutron-net2')
+        self.assertEqual(['udp'], [acl.match for acl in lswitch.acls])
@@ -0,0 +1,132 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import uuid
+
+import mock
+from oslotest import base
+from ovs.db import idl as ovs_idl
+
+from oslo_ovsdb_frontend.impl import ovn_native
+from oslo_ovsdb_frontend.impl import ovn_sync
+from oslo_ovsdb_frontend.tests import helpers
+
+EXTERNAL_IDS = {"type": {"key": "string", "value": "string",
+                         "min": 0, "max": "unlimited"}}
+
+SCHEMA = {
+    "name": "OVN_Northbound", "version": "2.0.1",
+    "tables": {
+        "Logical_Port": {
+            "columns": {
+                "name": {"type": "string"},
+                "external_ids": EXTERNAL_IDS,
+                "addresses": {"type": {"key": "string", "min": 0,
+                                       "max": "unlimited"}}},
+            "isRoot": False,
+        },
+        "Logical_Switch": {
+            "columns": {
+                "name": {"type": "string"},
+                "external_ids": EXTERNAL_IDS,
+                "ports": {"type": {"key": {"type": "uuid",
+                                           "refTable": "Logical_Port",
+                                           "refType": "strong"},
+                                   "min": 0, "max": "unlimited"}}},
+            "isRoot": True,
+        }
+    }
+}
+
+OWNED = ["map", [["owner", "neutron"]]]
+
+
+class TestOvnNbSynchronizer(base.BaseTestCase):
+
+    def _row(self, table, row_json):
+        row_uuid = uuid.uuid4()
+        helpers.create_row(self.idl, table, row_uuid, row_json, insert=True)
+        return ["uuid", str(row_uuid)]
+
+    def setUp(self):
+        super(TestOvnNbSynchronizer, self).setUp()
+        self.idl = helpers.create_idl(SCHEMA)
+        ports = [
+            self._row('Logical_Port', {"name": "p1", "external_ids": OWNED,
+                                       "addresses": ["set", ["b", "a"]]}),
+            self._row('Logical_Port', {"name": "p2", "external_ids": OWNED,
+                                       "addresses": "c"}),
+            self._row('Logical_Port', {"name": "stale", "external_ids": OWNED,
+                                       "addresses": ["set", []]}),
+            self._row('Logical_Port', {"name": "foreign",
+                                       "external_ids": ["map", []],
+                                       "addresses": ["set", []]})]
+        self._row('Logical_Switch', {"name": "sw", "external_ids": OWNED,
+                                     "ports": ["set", ports]})
+        self.api = mock.MagicMock()
+        self.api._tables = self.idl.tables
+        self.sync = ovn_sync.OvnNbSynchronizer(self.api, mode='repair',
+                                               chunk_size=1,
+                                               owner_key='owner')
+        self.lswitches = [('sw', {'external_ids': {'owner': 'neutron'}}),
+                          ('sw2', {'external_ids': {'owner': 'neutron'}})]
+        self.lports = [('sw', 'p1', {'addresses': ['a', 'b']}),
+                       ('sw', 'p2', {'addresses': ['d']}),
+                       ('sw2', 'p3', {'addresses': []})]
+
+    def test_diff(self):
+        lswitch_report, lport_report = (
+            self.sync.diff_lswitches(self.lswitches),
+            self.sync.diff_lports(self.lports))
+        self.assertEqual([('sw2', {'external_ids': {'owner': 'neutron'}})],
+                         lswitch_report.create)
+        self.assertEqual([], lswitch_report.update + lswitch_report.delete)
+        self.assertEqual([('sw2', 'p3', {'addresses': []})],
+                         lport_report.create)
+        self.assertEqual([('sw', 'p2', {'addresses': ['d']})],
+                         lport_report.update)
+        self.assertEqual([('sw', 'stale')], lport_report.delete)
+
+    def test_sync_repair_in_chunks(self):
+        self.sync.sync(self.lswitches, self.lports)
+        self.api.delete_lports.assert_called_once_with('sw', ['stale'])
+        self.api.create_lswitch.assert_called_once_with(
+            'sw2', external_ids={'owner': 'neutron'})
+        self.api.create_lports.assert_called_once_with(
+            'sw2', [('p3', {'addresses': []})])
+        self.api.set_lport.assert_called_once_with('p2', addresses=['d'])
+        self.assertEqual(4, self.api.transaction.call_count)
+
+    def test_sync_log_only(self):
+        self.sync.mode = ovn_sync.SYNC_MODE_LOG
+        self.sync.sync(self.lswitches, self.lports)
+        self.assertFalse(self.api.transaction.called)
+
+    def test_repair_deletes_orphan_lport(self):
+        self._row('Logical_Port', {"name": "orphan", "external_ids": OWNED,
+                                   "addresses": ["set", []]})
+        report = self.sync.diff_lports(self.lports)
+        self.assertIn((None, 'orphan'), report.delete)
+        api = ovn_native.OvsdbOvnIdl.__new__(ovn_native.OvsdbOvnIdl)
+        api.idl = self.idl
+        txn = ovs_idl.Transaction(self.idl)
+        transaction = mock.MagicMock()
+        transaction.return_value.__enter__.return_value.add.side_effect = (
+            lambda command: command.run_idl(txn))
+        orphans = ovn_sync.SyncReport('Logical_Port')
+        orphans.delete.append((None, 'orphan'))
+        with mock.patch.object(api, 'transaction', transaction):
+            ovn_sync.OvnNbSynchronizer(api, mode='repair').repair(
+                ovn_sync.SyncReport('Logical_Switch'), orphans)
+        self.assertEqual(
+            [], [row for row in self.idl.tables['Logical_Port'].rows.values()
+                 if row.name == 'orphan'])
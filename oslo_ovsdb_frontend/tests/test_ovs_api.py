@@ -0,0 +1,154 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import uuid
+
+import mock
+from oslo_serialization import jsonutils
+from oslotest import base
+from ovs.db import idl as ovs_idl
+
+from oslo_ovsdb_frontend.impl import ovs_native
+from oslo_ovsdb_frontend.impl import ovs_vsctl
+from oslo_ovsdb_frontend.tests import helpers
+
+
+def _refs(table):
+    return {"type": {"key": {"type": "uuid", "refTable": table},
+                     "min": 0, "max": "unlimited"}}
+
+
+OVS_SCHEMA = {
+    "name": "Open_vSwitch", "version": "7.12.1",
+    "tables": {
+        "Bridge": {
+            "columns": {"name": {"type": "string"},
+                        "ports": _refs("Port")},
+            "indexes": [["name"]],
+            "isRoot": True,
+        },
+        "Port": {
+            "columns": {"name": {"type": "string"},
+                        "tag": {"type": {"key": "integer",
+                                         "min": 0, "max": 1}},
+                        "interfaces": _refs("Interface")},
+            "indexes": [["name"]],
+            "isRoot": False,
+        },
+        "Interface": {
+            "columns": {"name": {"type": "string"},
+                        "external_ids": {"type": {
+                            "key": "string", "value": "string",
+                            "min": 0, "max": "unlimited"}}},
+            "indexes": [["name"]],
+            "isRoot": False,
+        }
+    }
+}
+
+
+class _Transaction(object):
+    """Run the commands in the IDL transaction in progress on exit"""
+
+    def __init__(self, idl):
+        self.idl = idl
+        self.commands = []
+
+    def add(self, command):
+        self.commands.append(command)
+        return command
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        for command in self.commands:
+            command.run_idl(self.idl.txn)
+
+
+class TestReconcile(base.BaseTestCase):
+
+    def _list(self, headings, *rows):
+        return jsonutils.dumps({'headings': headings, 'data': list(rows)})
+
+    def test_reconcile_applies_differences(self):
+        tap1, tap2, stale = (str(uuid.uuid4()) for _i in range(3))
+        state = '\n'.join([
+            self._list(['name', 'ports', 'fail_mode'],
+                       ['br-int', ['set', [['uuid', tap1], ['uuid', tap2],
+                                           ['uuid', stale]]], 'secure']),
+            self._list(['_uuid', 'name', 'tag'],
+                       [['uuid', tap1], 'tap1', 1],
+                       [['uuid', tap2], 'tap2', ['set', []]],
+                       [['uuid', stale], 'stale', ['set', []]]),
+            self._list(['name', 'external_ids'],
+                       ['tap1', ['map', [['iface-id', 'a'],
+                                         ['attached-mac', 'm']]]],
+                       ['tap2', ['map', []]])])
+        execute = mock.Mock(side_effect=[state, '', ''])
+        vsctl = ovs_vsctl.OvsdbVsctl(mock.Mock(vsctl_timeout=10), execute)
+        report = vsctl.reconcile(
+            {'br-int': {
+                'columns': {'fail_mode': 'secure'},
+                'ports': {
+                    'tap1': {'port': {'tag': 1},
+                             'interface': {'external_ids': {
+                                 'iface-id': 'a'}}},
+                    'tap2': {'port': {'tag': 2}},
+                    'tap3': {'interface': {'external_ids': {
+                        'iface-id': 'c'}}}}}},
+            prune_ports=True)
+        self.assertEqual({'added_bridges': [],
+                          'added_ports': [('br-int', 'tap3')],
+                          'deleted_ports': [('br-int', 'stale')],
+                          'updated': [('Port', 'tap2'),
+                                      ('Interface', 'tap3')]}, report)
+        self.assertEqual(3, execute.call_count)
+        creates = execute.call_args_list[1][0][0]
+        self.assertIn('add-port', creates)
+        self.assertIn('del-port', creates)
+        updates = execute.call_args_list[2][0][0]
+        self.assertIn('tag=2', updates)
+        self.assertIn('external_ids:iface-id=c', updates)
+
+    def test_reconcile_native_sets_map_keys(self):
+        api = ovs_native.OvsdbIdl.__new__(ovs_native.OvsdbIdl)
+        api.idl = helpers.create_idl(OVS_SCHEMA)
+        external_ids = ["map", [["iface-id", "a"], ["attached-mac", "m"]]]
+        iface = helpers.create_row(
+            api.idl, 'Interface', uuid.uuid4(),
+            {"name": "tap1", "external_ids": external_ids}, insert=True)
+        port = helpers.create_row(api.idl, 'Port', uuid.uuid4(), {
+            "name": "tap1", "tag": 1,
+            "interfaces": ["uuid", str(iface.uuid)]}, insert=True)
+        helpers.create_row(api.idl, 'Bridge', uuid.uuid4(), {
+            "name": "br-int", "ports": ["uuid", str(port.uuid)]},
+            insert=True)
+        ovs_idl.Transaction(api.idl)
+        txns = []
+
+        def transaction(**kwargs):
+            txns.append(_Transaction(api.idl))
+            return txns[-1]
+
+        with mock.patch.object(api, 'transaction', side_effect=transaction):
+            report = api.reconcile({'br-int': {'ports': {'tap1': {
+                'port': {'tag': 1},
+                'interface': {'external_ids': {'iface-id': 'b'}}}}}})
+        self.assertEqual([('Interface', 'tap1')], report['updated'])
+        self.assertEqual({'iface-id': 'b', 'attached-mac': 'm'},
+                         iface.external_ids)
+        self.assertEqual([1], port.tag)
+        # Only the changed key is set
+        update, = txns[-1].commands
+        self.assertEqual((('external_ids', 'iface-id', 'b'),),
+                         update.col_key_values)
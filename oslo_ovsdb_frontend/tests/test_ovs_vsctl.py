@@ -0,0 +1,142 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import uuid
+
+import mock
+from oslo_serialization import jsonutils
+from oslotest import base
+
+from oslo_ovsdb_frontend.impl import ovs_vsctl
+from oslo_ovsdb_frontend.impl import utils
+
+
+class TestOvsdbVsctl(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestOvsdbVsctl, self).setUp()
+        self.execute = mock.Mock(return_value='')
+        self.vsctl = ovs_vsctl.OvsdbVsctl(mock.Mock(vsctl_timeout=10),
+                                          self.execute)
+
+    def test_bulk_commands(self):
+        self.execute.return_value = 'uuid1\nuuid2\n\n\n'
+        with self.vsctl.transaction() as txn:
+            created = txn.add(self.vsctl.db_create_many(
+                'Queue', [{'dscp': 1}, {'dscp': 2}]))
+            destroyed = txn.add(self.vsctl.db_destroy_many(
+                'Queue', ['q1', 'q2'], if_exists=True))
+        self.assertEqual(['uuid1', 'uuid2'], created.result)
+        self.assertEqual(['', ''], destroyed.result)
+        self.assertEqual(
+            ['--', 'create', 'Queue', 'dscp=1',
+             '--', 'create', 'Queue', 'dscp=2',
+             '--', '--if-exists', 'destroy', 'Queue', 'q1',
+             '--', '--if-exists', 'destroy', 'Queue', 'q2'],
+            self.execute.call_args[0][0][4:])
+
+    def _list_output(self, headings, *rows):
+        return jsonutils.dumps({'headings': headings, 'data': list(rows)})
+
+    def test_db_get_many(self):
+        p1, p2 = uuid.uuid4(), uuid.uuid4()
+        self.execute.return_value = self._list_output(
+            ['ofport', '_uuid'], [1, ['uuid', str(p1)]],
+            [['set', []], ['uuid', str(p2)]])
+        result = self.vsctl.db_get_many('Interface', ['tap1', p2],
+                                        ['ofport']).execute()
+        self.assertEqual({'tap1': {'ofport': 1}, p2: {'ofport': []}},
+                         result)
+        self.assertEqual(['--', '--columns=ofport,_uuid', 'list',
+                          'Interface', 'tap1', str(p2)],
+                         self.execute.call_args[0][0][4:])
+
+    def test_db_get_many_if_exists_uuids(self):
+        p1, p2 = uuid.uuid4(), uuid.uuid4()
+        self.execute.return_value = self._list_output(
+            ['ofport', '_uuid'], [['set', []], ['uuid', str(p2)]])
+        result = self.vsctl.db_get_many('Interface', [p1, p2], ['ofport'],
+                                        if_exists=True).execute()
+        self.assertEqual({p2: {'ofport': []}}, result)
+        self.assertEqual(['--', '--if-exists', '--columns=ofport,_uuid',
+                          'list', 'Interface', str(p1), str(p2)],
+                         self.execute.call_args[0][0][4:])
+
+    def test_db_get_many_if_exists_per_record(self):
+        q1 = uuid.uuid4()
+        headings = ['max_rate', '_uuid']
+        self.execute.return_value = '\n'.join([
+            self._list_output(headings, ['1000', ['uuid', str(q1)]]),
+            self._list_output(headings)])
+        result = self.vsctl.db_get_many('QoS', ['tap1', 'missing'],
+                                        ['max_rate'], if_exists=True).execute()
+        self.assertEqual({'tap1': {'max_rate': '1000'}}, result)
+        opts = ['--', '--if-exists', '--columns=max_rate,_uuid', 'list',
+                'QoS']
+        self.assertEqual(opts + ['tap1'] + opts + ['missing'],
+                         self.execute.call_args[0][0][4:])
+
+    def test_db_list_iter(self):
+        output = jsonutils.dumps({
+            'data': [['p%d' % i, i] for i in range(5)],
+            'headings': ['name', 'tag']})
+        self.execute.return_value = output
+        result = self.vsctl.db_list_iter('Port', columns=['name', 'tag'],
+                                         limit=2, offset=1).execute()
+        self.assertNotIsInstance(result, list)
+        self.assertEqual([{'name': 'p1', 'tag': 1},
+                          {'name': 'p2', 'tag': 2}], list(result))
+        result = self.vsctl.db_list('Port', limit=2, offset=4).execute()
+        self.assertEqual([{'name': 'p4', 'tag': 4}], result)
+
+    def test_db_list_iter_parse_errors(self):
+        self.execute.return_value = '{"data": [["p0", 0]'
+        with mock.patch.object(ovs_vsctl.LOG, 'error') as log_error:
+            self.assertRaises(ValueError,
+                              self.vsctl.db_list_iter('Port').execute,
+                              check_error=True)
+            self.assertEqual(1, log_error.call_count)
+            self.execute.return_value = (
+                '{"data": [["p0", 0], ["p1", ], "headings": ["name", "tag"]}')
+            result = self.vsctl.db_list_iter('Port').execute(
+                check_error=True)
+            self.assertEqual({'name': 'p0', 'tag': 0}, next(result))
+            self.assertRaises(ValueError, next, result)
+            self.assertEqual(2, log_error.call_count)
+
+    def test_db_list_parse_errors_not_checked(self):
+        with mock.patch.object(ovs_vsctl.LOG, 'error') as log_error:
+            self.execute.return_value = '{"data": [["p0", 0]'
+            self.assertIsNone(self.vsctl.db_list_iter('Port').execute())
+            self.assertIsNone(self.vsctl.db_list('Port').execute())
+            self.assertEqual(2, log_error.call_count)
+            self.execute.return_value = (
+                '{"data": [["p0", 0], ["p1", ], "headings": ["name", "tag"]}')
+            result = self.vsctl.db_list_iter('Port').execute(
+                log_errors=False)
+            self.assertEqual([{'name': 'p0', 'tag': 0}], list(result))
+            self.assertEqual(2, log_error.call_count)
+
+    def test_row_views(self):
+        self.execute.return_value = jsonutils.dumps(
+            {'data': [['p1', 1]], 'headings': ['name', 'tag']})
+        result = self.vsctl.db_find('Port', row_views=True).execute()
+        self.assertIsInstance(result[0], ovs_vsctl.RecordView)
+        self.assertEqual({'name': 'p1', 'tag': 1}, result[0].to_dict())
+
+    def test_columnar(self):
+        self.execute.return_value = jsonutils.dumps(
+            {'data': [['p1', 1], ['p2', 2]], 'headings': ['name', 'tag']})
+        with mock.patch.object(utils, 'numpy', None):
+            result = self.vsctl.db_list('Port', columnar=True,
+                                        offset=1).execute()
+        self.assertEqual({'name': ['p2'], 'tag': [2]}, result)
@@ -12,6 +12,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import functools
+import threading
 import time
 import uuid
 
@@ -21,7 +23,14 @@ import mock
 from oslotest import base
 from ovs.db import idl as ovs_idl
 
+from oslo_ovsdb_frontend import exceptions
+from oslo_ovsdb_frontend.impl.native import connection
+from oslo_ovsdb_frontend.impl.native import event_executor
+from oslo_ovsdb_frontend.impl.native import event_metrics
+from oslo_ovsdb_frontend.impl.native import idlutils
+from oslo_ovsdb_frontend.impl.native import row_event
 from oslo_ovsdb_frontend.impl import ovsdb_monitor
+from oslo_ovsdb_frontend.tests import helpers
 
 
 OVN_NB_SCHEMA = {
@@ -170,3 +179,461 @@ class TestOvnIdlNotifyHandler(base.BaseTestCase):
         self.idl.notify_handler.notify = mock.Mock()
         self.idl.notify("create", mock.ANY)
         self.assertTrue(self.idl.notify_handler.notify.called)
+
+    def _add_lport_rows(self, *rows_json):
+        for row_json in rows_json:
+            helpers.create_row(self.idl, 'Logical_Port', uuid.uuid4(),
+                               row_json, insert=True)
+
+    def test_initial_sync_bulk(self):
+        self._add_lport_rows({"up": True, "name": "foo"},
+                             {"up": False, "name": "bar"},
+                             {"up": True, "name": "baz"})
+        self.idl.initial_sync()
+        names = self.plugin.set_ports_status_up.call_args[0][0]
+        self.assertEqual(["baz", "foo"], sorted(names))
+        self.plugin.set_ports_status_down.assert_called_once_with(["bar"])
+        self.assertFalse(self.plugin.set_port_status_up.called)
+
+    def test_initial_sync_without_bulk_methods(self):
+        self.plugin = mock.Mock(spec=['set_port_status_up',
+                                      'set_port_status_down'])
+        for event in self.idl._initial_events:
+            event.plugin = self.plugin
+        self._add_lport_rows({"up": True, "name": "foo"})
+        self.idl.initial_sync()
+        self.plugin.set_port_status_up.assert_called_once_with("foo")
+        self.assertFalse(self.plugin.set_port_status_down.called)
+
+
+class TestOvnNbNotifyHandlerBatch(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestOvnNbNotifyHandlerBatch, self).setUp()
+        self.plugin = mock.Mock()
+        self.idl = helpers.create_idl(OVN_NB_SCHEMA)
+        self._row = functools.partial(helpers.create_row, self.idl,
+                                      'Logical_Port')
+        self.handler = ovsdb_monitor.OvnNbNotifyHandler(self.plugin,
+                                                        batch_window=0.2)
+        self.addCleanup(self.handler.shutdown)
+        self.handler.watch_events([
+            ovsdb_monitor.LogicalPortCreateUpEvent(self.plugin),
+            ovsdb_monitor.LogicalPortCreateDownEvent(self.plugin),
+            ovsdb_monitor.LogicalPortUpdateUpEvent(self.plugin),
+            ovsdb_monitor.LogicalPortUpdateDownEvent(self.plugin)])
+
+    def _notify(self, notifications):
+        for event, row, old in notifications:
+            self.handler.notify(event, row, old)
+        # sleep so that the notify handler green thread handles the batch
+        time.sleep(1)
+
+    def test_flapping_port_coalesced(self):
+        row_uuid = uuid.uuid4()
+        row = self._row(row_uuid, {"up": True, "name": "foo-name"})
+        self._notify([
+            ('update', row, self._row(row_uuid, {"up": False})),
+            ('update', row, self._row(row_uuid, {"up": True})),
+            ('update', row, self._row(row_uuid, {"up": False}))])
+        self.plugin.set_port_status_up.assert_called_once_with("foo-name")
+        self.assertFalse(self.plugin.set_port_status_down.called)
+
+    def test_flapping_port_no_net_change(self):
+        row_uuid = uuid.uuid4()
+        row = self._row(row_uuid, {"up": False, "name": "foo-name"})
+        self._notify([
+            ('update', row, self._row(row_uuid, {"up": False})),
+            ('update', row, self._row(row_uuid, {"up": True}))])
+        self.assertFalse(self.plugin.set_port_status_up.called)
+        self.assertFalse(self.plugin.set_port_status_down.called)
+
+    def test_created_and_deleted_port_ignored(self):
+        row = self._row(uuid.uuid4(), {"up": True, "name": "foo-name"})
+        self._notify([('create', row, None), ('delete', row, None)])
+        self.assertFalse(self.plugin.set_port_status_up.called)
+
+    def test_run_batch_receives_all_rows(self):
+        event = ovsdb_monitor.LogicalPortUpdateUpEvent(self.plugin)
+        with mock.patch.object(ovsdb_monitor.LogicalPortUpdateUpEvent,
+                               'run_batch') as run_batch:
+            rows = [self._row(uuid.uuid4(), {"up": True, "name": name})
+                    for name in ("foo", "bar")]
+            self._notify([('update', row,
+                           self._row(row.uuid, {"up": False}))
+                          for row in rows])
+        self.assertEqual(1, run_batch.call_count)
+        events = run_batch.call_args[0][0]
+        self.assertEqual(rows, [row for _e, row, _o in events])
+        self.assertTrue(event.matches(*events[0]))
+
+    def test_unwatched_column_update_not_queued(self):
+        self.handler.unwatch_events([
+            ovsdb_monitor.LogicalPortCreateUpEvent(self.plugin),
+            ovsdb_monitor.LogicalPortCreateDownEvent(self.plugin)])
+        row_uuid = uuid.uuid4()
+        self.handler.notify(
+            'update',
+            self._row(row_uuid, {"up": True, "name": "foo",
+                                 "addresses": ["set", ["a"]]}),
+            self._row(row_uuid, {"addresses": ["set", []]}))
+        self.assertEqual(0, self.handler.notifications.qsize())
+
+    def test_update_columns_filter(self):
+        event = row_event.WaitEvent(('update',), 'Logical_Port',
+                                    (('up', '=', True),),
+                                    update_columns=('up',))
+        row_uuid = uuid.uuid4()
+        row = self._row(row_uuid, {"up": True, "name": "foo"})
+        self.assertFalse(event.matches('update', row,
+                                       self._row(row_uuid, {"name": "bar"})))
+        self.assertTrue(event.matches('update', row,
+                                      self._row(row_uuid, {"up": False})))
+
+
+class TestOvnNbNotifyHandlerExecutor(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestOvnNbNotifyHandlerExecutor, self).setUp()
+        self.calls = []
+        self.plugin = mock.Mock()
+        self.plugin.set_port_status_up.side_effect = self._port_up
+        self.plugin.set_port_status_down.side_effect = self._port_down
+        self.idl = helpers.create_idl(OVN_NB_SCHEMA)
+        self.executor = event_executor.ShardedExecutor(4)
+        self.handler = ovsdb_monitor.OvnNbNotifyHandler(
+            self.plugin, executor=self.executor)
+        self.addCleanup(self.handler.shutdown)
+        self.handler.watch_events([
+            ovsdb_monitor.LogicalPortUpdateUpEvent(self.plugin),
+            ovsdb_monitor.LogicalPortUpdateDownEvent(self.plugin)])
+
+    def _port_up(self, name):
+        if name == 'slow':
+            time.sleep(0.5)
+        self.calls.append((name, 'up'))
+
+    def _port_down(self, name):
+        self.calls.append((name, 'down'))
+
+    def _update(self, row_uuid, name, up):
+        row = helpers.create_row(self.idl, 'Logical_Port', row_uuid,
+                                 {"up": up, "name": name})
+        old = helpers.create_row(self.idl, 'Logical_Port', row_uuid,
+                                 {"up": not up})
+        self.handler.notify('update', row, old)
+
+    def _wait(self):
+        self.handler.notifications.join()
+        self.executor.wait()
+
+    def test_slow_handler_does_not_block_other_rows(self):
+        slow_uuid = uuid.uuid4()
+        while True:
+            fast_uuid = uuid.uuid4()
+            if (self.executor.shard(fast_uuid) !=
+                    self.executor.shard(slow_uuid)):
+                break
+        self._update(slow_uuid, 'slow', True)
+        self._update(fast_uuid, 'fast', True)
+        self._wait()
+        self.assertEqual([('fast', 'up'), ('slow', 'up')], self.calls)
+
+    def test_row_events_run_in_order(self):
+        row_uuid = uuid.uuid4()
+        self._update(row_uuid, 'slow', True)
+        self._update(row_uuid, 'slow', False)
+        self._wait()
+        self.assertEqual([('slow', 'up'), ('slow', 'down')], self.calls)
+
+
+class TestOvnNbNotifyHandlerRuntime(base.BaseTestCase):
+
+    def test_handler_runtime(self):
+        plugin = mock.Mock()
+        rt = mock.Mock()
+        handler = ovsdb_monitor.OvnNbNotifyHandler(plugin, runtime=rt)
+        rt.spawn.assert_called_once_with(handler.notify_loop)
+
+
+class TestOvnSb(base.BaseTestCase):
+
+    def test_register_tables_skips_missing_columns(self):
+        helper = mock.Mock(schema_json={'tables': {'Chassis': {
+            'columns': {'name': {}, 'hostname': {}}}}})
+        conn = ovsdb_monitor.OvnSbConnection(
+            'remote', 10, 'OVN_Southbound',
+            {'Chassis': ('name', 'hostname', 'external_ids')})
+        conn._register_tables(helper)
+        helper.register_columns.assert_called_once_with(
+            'Chassis', ['name', 'hostname'])
+
+    def test_port_binding_chassis_event(self):
+        plugin = mock.Mock()
+        event = ovsdb_monitor.PortBindingChassisUpdateEvent(plugin)
+        row = mock.Mock(logical_port='p1', chassis=['chassis-1'])
+        row._table.name = 'Port_Binding'
+        self.assertTrue(event.matches(event.ROW_UPDATE, row,
+                                      mock.Mock(_data={'chassis': None})))
+        self.assertFalse(event.matches(event.ROW_UPDATE, row,
+                                       mock.Mock(_data={'tag': None})))
+        event.run(event.ROW_UPDATE, row, None)
+        plugin.set_port_status_up.assert_called_once_with('p1')
+        row.chassis = []
+        event.run(event.ROW_UPDATE, row, None)
+        plugin.set_port_status_down.assert_called_once_with('p1')
+
+
+class TestNotificationQueue(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestNotificationQueue, self).setUp()
+        self.idl = helpers.create_idl(OVN_NB_SCHEMA)
+        self._row = functools.partial(helpers.create_row, self.idl,
+                                      'Logical_Port')
+
+    def test_drop_oldest(self):
+        callback = mock.Mock()
+        queue = ovsdb_monitor.NotificationQueue(
+            2, ovsdb_monitor.NotificationQueue.DROP_OLDEST, callback)
+        rows = [self._row(uuid.uuid4(), {"name": str(i)}) for i in range(3)]
+        for row in rows:
+            queue.put((None, 'create', row, None))
+        callback.assert_called_once_with('create', rows[0], None)
+        self.assertEqual({'depth': 2, 'merges': 0, 'drops': 1},
+                         queue.stats())
+        self.assertEqual(rows[1], queue.get()[2])
+
+    def test_drop_oldest_keeps_stop_event(self):
+        callback = mock.Mock()
+        queue = ovsdb_monitor.NotificationQueue(
+            2, ovsdb_monitor.NotificationQueue.DROP_OLDEST, callback)
+        row = self._row(uuid.uuid4(), {"name": "foo"})
+        queue.put(ovsdb_monitor.OvnNbNotifyHandler.STOP_EVENT)
+        queue.put((None, 'create', row, None))
+        queue.put((None, 'update', row, None))
+        callback.assert_called_once_with('create', row, None)
+        self.assertEqual(ovsdb_monitor.OvnNbNotifyHandler.STOP_EVENT,
+                         queue.get())
+        self.assertEqual('update', queue.get()[1])
+
+    def test_merge_updates(self):
+        queue = ovsdb_monitor.NotificationQueue(
+            1, ovsdb_monitor.NotificationQueue.MERGE)
+        row_uuid = uuid.uuid4()
+        row = self._row(row_uuid, {"up": True, "name": "foo"})
+        queue.put((None, 'update', row, self._row(row_uuid, {"up": False})))
+        queue.put((None, 'update', row,
+                   self._row(row_uuid, {"up": True, "name": "bar"})))
+        self.assertEqual({'depth': 1, 'merges': 1, 'drops': 0},
+                         queue.stats())
+        _match, event, merged_row, old = queue.get()
+        self.assertEqual('update', event)
+        self.assertEqual([False], old.up)
+        self.assertEqual("bar", old.name)
+
+    def test_merge_create_delete(self):
+        queue = ovsdb_monitor.NotificationQueue(
+            1, ovsdb_monitor.NotificationQueue.MERGE)
+        row = self._row(uuid.uuid4(), {"up": True, "name": "foo"})
+        queue.put((None, 'create', row, None))
+        queue.put((None, 'delete', row, None))
+        self.assertEqual({'depth': 0, 'merges': 1, 'drops': 0},
+                         queue.stats())
+        queue.join()
+
+    def test_handler_merge_policy(self):
+        plugin = mock.Mock()
+        handler = ovsdb_monitor.OvnNbNotifyHandler(
+            plugin, queue_size=10,
+            queue_policy=ovsdb_monitor.NotificationQueue.MERGE)
+        self.addCleanup(handler.shutdown)
+        handler.watch_event(ovsdb_monitor.LogicalPortUpdateUpEvent(plugin))
+        row_uuid = uuid.uuid4()
+        handler.notify('update',
+                       self._row(row_uuid, {"up": True, "name": "foo"}),
+                       self._row(row_uuid, {"up": False}))
+        handler.notifications.join()
+        plugin.set_port_status_up.assert_called_once_with("foo")
+
+
+class TestRowSnapshot(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestRowSnapshot, self).setUp()
+        self.idl = helpers.create_idl(OVN_NB_SCHEMA)
+        self._row = functools.partial(helpers.create_row, self.idl,
+                                      'Logical_Port')
+
+    def test_snapshot_declared_columns(self):
+        row = self._row(uuid.uuid4(), {"up": True, "name": "foo",
+                                       "addresses": ["set", ["a", "b"]]})
+        event = ovsdb_monitor.LogicalPortCreateUpEvent(mock.Mock())
+        snapshot = idlutils.snapshot_row(row, event.snapshot_columns())
+        self.assertEqual(row.uuid, snapshot.uuid)
+        self.assertEqual({'name': 'foo', 'up': [True]}, snapshot._data)
+        self.assertFalse(hasattr(snapshot, 'addresses'))
+        self.assertFalse(hasattr(snapshot, '__dict__'))
+        self.assertTrue(event.matches('create', snapshot))
+
+    def test_snapshot_read_only(self):
+        snapshot = idlutils.snapshot_row(
+            self._row(uuid.uuid4(), {"name": "foo"}))
+        self.assertRaises(AttributeError, setattr, snapshot, 'name', 'bar')
+        self.assertRaises(AttributeError, setattr, snapshot, 'other', 1)
+
+    def test_handler_delivers_snapshots(self):
+        plugin = mock.Mock()
+        handler = ovsdb_monitor.OvnNbNotifyHandler(plugin,
+                                                   snapshot_rows=True)
+        self.addCleanup(handler.shutdown)
+        event = ovsdb_monitor.LogicalPortUpdateUpEvent(plugin)
+        event.run = mock.Mock()
+        handler.watch_event(event)
+        row_uuid = uuid.uuid4()
+        handler.notify('update',
+                       self._row(row_uuid, {"up": True, "name": "foo"}),
+                       self._row(row_uuid, {"up": False}))
+        handler.notifications.join()
+        _event, row, old = event.run.call_args[0]
+        self.assertIsInstance(row, idlutils.RowSnapshot)
+        self.assertEqual({'name': 'foo', 'up': [True]}, row._data)
+        self.assertEqual({'up': [False]}, old._data)
+
+
+class TestConnectionWaitFor(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestConnectionWaitFor, self).setUp()
+        self.conn = connection.Connection("remote", 1, 'OVN_Northbound')
+        self.conn.idl = helpers.create_idl(OVN_NB_SCHEMA,
+                                           connection.EventIdl)
+
+    def _row(self, row_json):
+        return helpers.create_row(self.conn.idl, 'Logical_Port',
+                                  uuid.uuid4(), row_json)
+
+    def test_wait_for_existing_row(self):
+        row = self._row({"up": True, "name": "foo"})
+        self.conn.idl.tables['Logical_Port'].rows[row.uuid] = row
+        self.assertEqual(row, self.conn.wait_for(
+            'Logical_Port', (('name', '=', 'foo'), ('up', '=', True))))
+
+    def test_wait_for_notified_row(self):
+        row = self._row({"up": True, "name": "foo"})
+        eventlet.spawn_after(0.1, self.conn.idl.notify, 'update', row,
+                             self._row({"up": False}))
+        self.assertEqual(row, self.conn.wait_for(
+            'Logical_Port', (('up', '=', True),), timeout=5))
+
+    def test_wait_for_holds_idl_lock(self):
+        results = []
+        with self.conn.lock:
+            # The connection thread is running the IDL
+            waiter = threading.Thread(target=lambda: results.append(
+                self.conn.wait_for('Logical_Port', (('name', '=', 'foo'),),
+                                   timeout=5)))
+            waiter.start()
+            row = self._row({"up": True, "name": "foo"})
+            self.conn.idl.tables['Logical_Port'].rows[row.uuid] = row
+            self.assertFalse(results)
+        waiter.join(5)
+        self.assertEqual([row], results)
+
+    def test_wait_for_timeout(self):
+        self.assertRaises(exceptions.TimeoutException, self.conn.wait_for,
+                          'Logical_Port', (('name', '=', 'foo'),),
+                          timeout=0.1)
+
+
+class TestOvnConnectionStart(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestOvnConnectionStart, self).setUp()
+        self.conn = ovsdb_monitor.OvnConnection("remote", 1, 'OVN_Northbound')
+        mock.patch.object(self.conn, 'get_schema_helper').start()
+        self.idl = mock.Mock()
+        mock.patch.object(ovsdb_monitor, 'OvnIdl',
+                          return_value=self.idl).start()
+        mock.patch.object(idlutils, 'wait_for_change').start()
+        mock.patch.object(ovsdb_monitor.threading, 'Thread').start()
+        self.addCleanup(mock.patch.stopall)
+
+    def _start(self, bulk_initial_sync):
+        with mock.patch.object(ovsdb_monitor.cfg,
+                               'get_ovn_bulk_initial_sync',
+                               return_value=bulk_initial_sync):
+            self.conn.start(mock.Mock())
+
+    def test_start_bulk_initial_sync_outside_lock(self):
+        self.idl.initial_sync.side_effect = (
+            lambda: self.assertFalse(self.conn.lock.locked()))
+        self._start(True)
+        self.idl.initial_sync.assert_called_once_with()
+        self.idl.unwatch_logical_port_create_events.assert_called_once_with()
+
+    def test_start_without_bulk_initial_sync(self):
+        self._start(False)
+        self.assertFalse(self.idl.initial_sync.called)
+        self.idl.unwatch_logical_port_create_events.assert_called_once_with()
+
+    def test_bulk_initial_sync_is_opt_in(self):
+        self.assertFalse(ovsdb_monitor.cfg.get_ovn_bulk_initial_sync())
+
+
+class TestEventMetrics(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestEventMetrics, self).setUp()
+        self.idl = helpers.create_idl(OVN_NB_SCHEMA)
+
+    def test_histogram(self):
+        histogram = event_metrics.Histogram((0.1, 1.0))
+        for value in (0.05, 0.5, 0.7, 3):
+            histogram.observe(value)
+        self.assertEqual({'count': 4, 'sum': 4.25,
+                          'buckets': [(0.1, 1), (1.0, 2), (float('inf'), 1)]},
+                         histogram.to_dict())
+
+    def test_handler_metrics(self):
+        plugin = mock.Mock()
+        plugin.set_port_status_up.side_effect = [None, Exception]
+        handler = ovsdb_monitor.OvnNbNotifyHandler(
+            plugin, metrics=event_metrics.EventMetrics())
+        self.addCleanup(handler.shutdown)
+        handler.watch_events([
+            ovsdb_monitor.LogicalPortUpdateUpEvent(plugin),
+            ovsdb_monitor.LogicalPortUpdateDownEvent(plugin)])
+        row_uuid = uuid.uuid4()
+        for i in range(2):
+            handler.notify(
+                'update',
+                helpers.create_row(self.idl, 'Logical_Port', row_uuid,
+                                   {"up": True, "name": "a"}),
+                helpers.create_row(self.idl, 'Logical_Port', row_uuid,
+                                   {"up": False}))
+        handler.notifications.join()
+        metrics = handler.get_metrics()
+        self.assertEqual({'depth': 0, 'merges': 0, 'drops': 0},
+                         metrics['queue'])
+        up = metrics['events']['LogicalPortUpdateUpEvent']
+        self.assertEqual((2, 2, 1),
+                         (up['matched'], up['runs'], up['errors']))
+        self.assertEqual(2, up['run_time']['count'])
+        self.assertEqual(2, up['queue_wait']['count'])
+        down = metrics['events']['LogicalPortUpdateDownEvent']
+        self.assertEqual((0, 2), (down['matched'],
+                                  down['match_time']['count']))
+
+    def test_metrics_reporter_stops_on_shutdown(self):
+        handler = ovsdb_monitor.OvnNbNotifyHandler(
+            mock.Mock(), metrics=event_metrics.EventMetrics())
+        reported = threading.Event()
+        exporter = mock.Mock(side_effect=lambda metrics: reported.set())
+        handler.start_metrics_reporter(exporter, 0.01)
+        self.assertTrue(reported.wait(5))
+        handler.shutdown()
+        # shutdown() waited for the reporter, which exports no more
+        calls = exporter.call_count
+        time.sleep(0.05)
+        self.assertEqual(calls, exporter.call_count)
@@ -0,0 +1,54 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+from oslotest import base
+
+from oslo_ovsdb_frontend.impl.native import commands
+from oslo_ovsdb_frontend.impl.native import connection
+from oslo_ovsdb_frontend.impl import ovs_vsctl
+from oslo_ovsdb_frontend.tests import helpers
+
+
+class TestPreparedCommand(base.BaseTestCase):
+
+    def test_native(self):
+        api = mock.Mock(idl=helpers.create_idl(helpers.OVS_PORT_SCHEMA,
+                                               connection.EventIdl))
+        api._tables = api.idl.tables
+        prepared = commands.PreparedDbCommand(
+            api, "set Port {name} tag=5 external_ids:iface-id={id}")
+        self.assertEqual(set(['name', 'id']), prepared.params)
+        command = prepared.bind(name='p1', id='x')
+        self.assertIsInstance(command, commands.DbSetKeysCommand)
+        self.assertEqual('p1', command.record)
+        self.assertEqual([('tag', None, 5), ('external_ids', 'iface-id', 'x')],
+                         command.col_key_values)
+        self.assertRaises(RuntimeError, prepared.bind, name='p1')
+        for template in ("set Port {name} foo=1", "set Port {name} tag:a=1",
+                         "get Port {name}", "set Nope {name} tag=1",
+                         "remove Port {name} tag 1"):
+            self.assertRaises(RuntimeError, commands.PreparedDbCommand,
+                              api, template)
+
+    def test_vsctl(self):
+        execute = mock.Mock(return_value='')
+        vsctl = ovs_vsctl.OvsdbVsctl(mock.Mock(vsctl_timeout=10), execute)
+        prepared = vsctl.prepare(
+            "set Interface {name} external_ids:iface-id={id} type=internal")
+        command = prepared.bind(name='tap0', id='port-{1}')
+        self.assertEqual(['Interface', 'tap0',
+                          'external_ids:iface-id=port-{1}', 'type=internal'],
+                         command.args)
+        command = vsctl.prepare("set Port {name} trunks={trunks}").bind(
+            name='p1', trunks=['1', '2'])
+        self.assertEqual(['Port', 'p1', 'trunks=1,2'], command.args)
@@ -0,0 +1,86 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+
+import mock
+from oslotest import base
+import six
+import testtools
+
+from oslo_ovsdb_frontend.impl.native import runtime
+
+
+class TestRuntime(base.BaseTestCase):
+
+    def test_auto_runtime_monkey_patched(self):
+        with mock.patch.object(runtime, '_eventlet_patched',
+                               return_value=True):
+            self.assertIsInstance(runtime.get_runtime('auto'),
+                                  runtime.EventletRuntime)
+
+    def test_auto_runtime_not_monkey_patched(self):
+        with mock.patch.object(runtime, '_eventlet_patched',
+                               return_value=False):
+            self.assertIsInstance(runtime.get_runtime('auto'),
+                                  runtime.ThreadingRuntime)
+
+    @testtools.skipIf(six.PY2, 'asyncio requires Python 3')
+    def test_asyncio_runtime_dedicated_threads(self):
+        loop = mock.Mock()
+        rt = runtime.AsyncioRuntime(loop)
+        started = threading.Event()
+        future = rt.spawn(started.set)
+        self.assertFalse(started.is_set())
+        start, future_, func, args = loop.call_soon_threadsafe.call_args[0]
+        self.assertIs(future, future_)
+        # Called by the loop once it runs
+        with mock.patch.object(runtime.threading, 'Thread',
+                               wraps=threading.Thread) as thread:
+            start(future, func, args)
+        self.assertIsNone(future.result(5))
+        self.assertTrue(started.is_set())
+        self.assertEqual(1, thread.call_count)
+        self.assertFalse(loop.run_in_executor.called)
+
+    @testtools.skipIf(six.PY2, 'asyncio requires Python 3')
+    def test_asyncio_runtime_worker_error(self):
+        import asyncio
+
+        def fail():
+            raise ValueError()
+
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        futures = []
+        # Spawned from a callback of the running loop, which starts the
+        # worker once run again
+        loop.call_soon(
+            lambda: futures.append(runtime.AsyncioRuntime().spawn(fail)))
+        for _i in range(2):
+            loop.call_soon(loop.stop)
+            loop.run_forever()
+        future, = futures
+        self.assertRaises(ValueError, future.result, 5)
+
+    @testtools.skipIf(six.PY2, 'asyncio requires Python 3')
+    def test_asyncio_runtime_requires_running_loop(self):
+        loop = mock.Mock()
+        loop.is_running.return_value = False
+        self.assertRaises(RuntimeError,
+                          runtime.AsyncioRuntime(loop).spawn, mock.Mock())
+        self.assertFalse(loop.call_soon_threadsafe.called)
+
+    @testtools.skipUnless(six.PY2, 'asyncio is only missing on Python 2')
+    def test_asyncio_runtime_unavailable_on_py2(self):
+        self.assertRaises(RuntimeError, runtime.get_runtime, 'asyncio')
+        self.assertRaises(RuntimeError, runtime.AsyncioRuntime)
@@ -0,0 +1,86 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import uuid
+
+import mock
+from oslotest import base
+
+from oslo_ovsdb_frontend.impl.native import connection
+from oslo_ovsdb_frontend.impl.native import table_digest
+from oslo_ovsdb_frontend.tests import helpers
+
+
+class TestTableDigest(base.BaseTestCase):
+
+    SCHEMA = {
+        "name": "OVN_Northbound", "version": "2.0.1",
+        "tables": {
+            "Logical_Port": {
+                "columns": {
+                    "name": {"type": "string"},
+                    "addresses": {"type": {"key": "string", "min": 0,
+                                           "max": "unlimited"}}},
+                "isRoot": True,
+            }
+        }
+    }
+
+    def setUp(self):
+        super(TestTableDigest, self).setUp()
+        self.idl = helpers.create_idl(self.SCHEMA, connection.EventIdl)
+        self.digest = table_digest.TableDigest('Logical_Port', 'name',
+                                               ['addresses'], buckets=8)
+        self.digest.start(self.idl)
+
+    def _notify(self, event, row_uuid, row_json):
+        row = helpers.create_row(self.idl, 'Logical_Port', row_uuid,
+                                 row_json)
+        self.idl.notify(event, row, mock.Mock(_data={'addresses': None}))
+
+    def _expected(self, ports):
+        return table_digest.TableDigest.from_values(
+            'Logical_Port', 'name', ['addresses'],
+            [{'name': name, 'addresses': addrs} for name, addrs in ports],
+            buckets=8)
+
+    def test_incremental_digest_matches_values(self):
+        p1, p2 = uuid.uuid4(), uuid.uuid4()
+        self._notify('create', p1, {"name": "p1",
+                                    "addresses": ["set", ["b", "a"]]})
+        self._notify('create', p2, {"name": "p2", "addresses": "c"})
+        expected = self._expected([('p1', ['a', 'b']), ('p2', ['c'])])
+        self.assertEqual([], self.digest.compare(expected))
+        self.assertEqual(expected.digest(), self.digest.digest())
+
+        self._notify('update', p2, {"name": "p2", "addresses": "d"})
+        drift = self.digest.compare(expected)
+        self.assertEqual([table_digest.bucket_of('p2', 8)], drift)
+        self.assertEqual(set(['p2']), self.digest.bucket_keys(drift[0]))
+
+        self._notify('delete', p1, {"name": "p1",
+                                    "addresses": ["set", ["a", "b"]]})
+        self.assertEqual([], self.digest.compare(
+            self._expected([('p2', ['d'])])))
+        self.assertEqual(0, self._expected([]).digest())
+
+    def test_identical_rows_do_not_cancel_out(self):
+        self.digest.add(uuid.uuid4(), 'p1', [['a']])
+        self.digest.add(uuid.uuid4(), 'p1', [['a']])
+        self.assertNotEqual(0, self.digest.digest())
+        self.assertNotEqual(self._expected([]).bucket_digests(),
+                            self.digest.bucket_digests())
+
+    def test_digest_of_mixed_types(self):
+        self.assertEqual(
+            table_digest.row_digest('p1', [[1, 'a', None], {'k': [2, 'b']}]),
+            table_digest.row_digest('p1', [[None, 'a', 1], {'k': ['b', 2]}]))